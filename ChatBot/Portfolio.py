@@ -1,9 +1,27 @@
 # tools_portfolio.py
+import os
 import logging
 import requests
 
+from portfolio_sources import HttpSource, source_from_env
+
 logging.basicConfig(level=logging.DEBUG)
-BASE_URL = "https://drfapi.pythonanywhere.com"
+BASE_URL = os.getenv("PORTFOLIO_BASE_URL", "https://drfapi.pythonanywhere.com").rstrip("/")
+
+# PORTFOLIO_SOURCE=http|django|sqlite, see portfolio_sources.py
+SOURCE = source_from_env()
+# The overview is an HTML page listing routes; only the HTTP API has it.
+OVERVIEW_SOURCE = SOURCE if isinstance(SOURCE, HttpSource) else HttpSource(BASE_URL)
+
+def _fetch(source, endpoint: str) -> dict:
+    try:
+        data = source.fetch(endpoint)
+        logging.debug("%s /api/%s -> %s", type(source).__name__, endpoint + "/" if endpoint else "", data)
+        return {"status": "success", "report": data}
+    except requests.exceptions.Timeout:
+        return {"status": "error", "report": "The request timed out. Please try again later."}
+    except Exception as e:  # RequestException, DB errors from the direct sources
+        return {"status": "error", "report": f"An error occurred: {e}"}
 
 def get_api_overview(query: str) -> dict:
     """
@@ -12,78 +30,24 @@ def get_api_overview(query: str) -> dict:
         query: Required placeholder string (ignored). ADK uses this to form the tool schema.
     Returns: {"status": "success"|"error", "report": <payload or message>}
     """
-    try:
-        r = requests.get(f"{BASE_URL}/api/", timeout=30)
-        r.raise_for_status()
-        data = r.json()
-        logging.debug("GET /api/ -> %s", data)
-        return {"status": "success", "report": data}
-    except requests.exceptions.Timeout:
-        return {"status": "error", "report": "The request timed out. Please try again later."}
-    except requests.exceptions.RequestException as e:
-        return {"status": "error", "report": f"An error occurred: {e}"}
+    return _fetch(OVERVIEW_SOURCE, "")
 
 def get_home(query: str) -> dict:
     """Fetch Home from GET /api/home/. See get_api_overview for return format."""
-    try:
-        r = requests.get(f"{BASE_URL}/api/home/", timeout=30)
-        r.raise_for_status()
-        data = r.json()
-        logging.debug("GET /api/home/ -> %s", data)
-        return {"status": "success", "report": data}
-    except requests.exceptions.Timeout:
-        return {"status": "error", "report": "The request timed out. Please try again later."}
-    except requests.exceptions.RequestException as e:
-        return {"status": "error", "report": f"An error occurred: {e}"}
+    return _fetch(SOURCE, "home")
 
 def get_about(query: str) -> dict:
     """Fetch About from GET /api/about/. See get_api_overview for return format."""
-    try:
-        r = requests.get(f"{BASE_URL}/api/about/", timeout=30)
-        r.raise_for_status()
-        data = r.json()
-        logging.debug("GET /api/about/ -> %s", data)
-        return {"status": "success", "report": data}
-    except requests.exceptions.Timeout:
-        return {"status": "error", "report": "The request timed out. Please try again later."}
-    except requests.exceptions.RequestException as e:
-        return {"status": "error", "report": f"An error occurred: {e}"}
+    return _fetch(SOURCE, "about")
 
 def get_skilled(query: str) -> dict:
     """Fetch Skilled from GET /api/skilled/. See get_api_overview for return format."""
-    try:
-        r = requests.get(f"{BASE_URL}/api/skilled/", timeout=30)
-        r.raise_for_status()
-        data = r.json()
-        logging.debug("GET /api/skilled/ -> %s", data)
-        return {"status": "success", "report": data}
-    except requests.exceptions.Timeout:
-        return {"status": "error", "report": "The request timed out. Please try again later."}
-    except requests.exceptions.RequestException as e:
-        return {"status": "error", "report": f"An error occurred: {e}"}
+    return _fetch(SOURCE, "skilled")
 
 def get_skills(query: str) -> dict:
     """Fetch Skills from GET /api/skills/. See get_api_overview for return format."""
-    try:
-        r = requests.get(f"{BASE_URL}/api/skills/", timeout=30)
-        r.raise_for_status()
-        data = r.json()
-        logging.debug("GET /api/skills/ -> %s", data)
-        return {"status": "success", "report": data}
-    except requests.exceptions.Timeout:
-        return {"status": "error", "report": "The request timed out. Please try again later."}
-    except requests.exceptions.RequestException as e:
-        return {"status": "error", "report": f"An error occurred: {e}"}
+    return _fetch(SOURCE, "skills")
 
 def get_work(query: str) -> dict:
     """Fetch Work from GET /api/work/. See get_api_overview for return format."""
-    try:
-        r = requests.get(f"{BASE_URL}/api/work/", timeout=30)
-        r.raise_for_status()
-        data = r.json()
-        logging.debug("GET /api/work/ -> %s", data)
-        return {"status": "success", "report": data}
-    except requests.exceptions.Timeout:
-        return {"status": "error", "report": "The request timed out. Please try again later."}
-    except requests.exceptions.RequestException as e:
-        return {"status": "error", "report": f"An error occurred: {e}"}
+    return _fetch(SOURCE, "work")
@@ -0,0 +1,138 @@
+"""
+answer_cache.py
+
+Answer cache for context-free questions ("what are your skills?", "show
+projects"), placed in front of the agent so repeated questions are answered
+without an LLM round trip.
+
+Keys are (normalized query, portfolio data version). The version is a
+fingerprint of the portfolio API payloads, refreshed at most every
+`fingerprint_ttl` seconds, so edits in the backend naturally invalidate old
+answers. Follow-up questions that lean on earlier turns ("tell me more about
+it", "and the second one?") bypass the cache. The caller only stores answers
+produced in a session without earlier turns (see main.ask_agent_async), so
+nothing a chat said before can leak into another chat's answer.
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+_PUNCT = re.compile(r"[^\w\s]", re.UNICODE)
+_SPACES = re.compile(r"\s+")
+
+# Words that carry no meaning for the lookup.
+FILLER_WORDS = {
+    "please", "pls", "plz", "kindly", "hey", "hi", "hello", "bot",
+    "a", "an", "the", "me", "us", "just", "quickly",
+}
+
+# Words that point back at earlier turns; their presence means the answer
+# depends on conversation history.
+FOLLOW_UP_WORDS = {
+    "it", "its", "this", "that", "these", "those", "them", "they", "their",
+    "he", "she", "him", "her", "his", "hers",
+    "more", "else", "also", "again", "another", "other", "same",
+    "above", "previous", "earlier", "before", "last", "next",
+    "first", "second", "third", "one", "ones",
+    "why", "and", "but", "so", "then",
+}
+
+
+def normalize_query(query: str) -> str:
+    text = unicodedata.normalize("NFKC", query or "").lower()
+    text = _PUNCT.sub(" ", text)
+    words = [w for w in _SPACES.split(text) if w and w not in FILLER_WORDS]
+    return " ".join(words)
+
+
+def is_context_free(query: str, max_words: int = 12) -> bool:
+    """Heuristic: short questions without back-references can be answered from cache."""
+    words = normalize_query(query).split()
+    if not words or len(words) > max_words:
+        return False
+    return not any(w in FOLLOW_UP_WORDS for w in words)
+
+
+def fingerprint(payloads) -> str:
+    """Stable hash of JSON-serialisable portfolio payloads."""
+    blob = json.dumps(payloads, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(blob).hexdigest()[:16]
+
+
+class AnswerCache:
+    """Thread-safe LRU + TTL cache of answers keyed by (normalized query, data version)."""
+
+    def __init__(self, version_fn, max_entries: int = 512, ttl: float = 3600.0, fingerprint_ttl: float = 60.0):
+        self.version_fn = version_fn  # () -> str | None; None disables caching
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.fingerprint_ttl = fingerprint_ttl
+
+        self._data = OrderedDict()  # key -> (expires_at, answer)
+        self._lock = threading.Lock()
+        self._version = None
+        self._version_at = 0.0
+        self._version_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+
+    def version(self) -> str:
+        """Current data version, recomputed at most every `fingerprint_ttl` seconds."""
+        now = time.monotonic()
+        if self._version is not None and now - self._version_at < self.fingerprint_ttl:
+            return self._version
+        with self._version_lock:
+            if self._version is None or time.monotonic() - self._version_at >= self.fingerprint_ttl:
+                self._version = self.version_fn()
+                self._version_at = time.monotonic()
+            return self._version
+
+    def key_for(self, query: str):
+        """Cache key for `query`, or None if the query must not use the cache."""
+        if not is_context_free(query):
+            self.bypasses += 1
+            return None
+        version = self.version()
+        if version is None:
+            self.bypasses += 1
+            return None
+        return (normalize_query(query), version)
+
+    def get(self, key):
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, answer: str):
+        if key is None:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, answer)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "bypasses": self.bypasses,
+                "version": self._version,
+            }
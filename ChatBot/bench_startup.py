@@ -0,0 +1,81 @@
+"""
+bench_startup.py
+
+Cold-start benchmark for main.py: runs fresh interpreters and compares
+
+- eager:  CHATBOT_EAGER_INIT=1, i.e. the old path where google.adk, litellm
+          and groq are imported and the agent/runner built at import time
+- lazy:   the default; the module imports without the heavy stacks and
+          warm_up() builds them after the server would have bound
+
+For each mode it reports how long `import main` takes (time until the app
+can bind and answer /healthz) and how long until the agent stack is ready.
+No network access is needed: the outbound sanity check is not run.
+
+Usage:
+    python bench_startup.py --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+PROBE = r"""
+import json, time
+t0 = time.perf_counter()
+import main
+t_import = time.perf_counter() - t0
+with main.app.test_client() as c:
+    assert c.get("/healthz").status_code == 200
+t_live = time.perf_counter() - t0
+main.ensure_agent_stack()
+t_ready = time.perf_counter() - t0
+print(json.dumps({"import": t_import, "live": t_live, "ready": t_ready}))
+"""
+
+
+def run_once(eager: bool) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "TELEGRAM_BOT_TOKEN": env.get("TELEGRAM_BOT_TOKEN", "123456:BENCH"),
+        "GROQ_API_KEY": env.get("GROQ_API_KEY", "gsk_bench"),
+        "PUBLIC_BASE_URL": env.get("PUBLIC_BASE_URL", "http://127.0.0.1"),
+        "CHATBOT_EAGER_INIT": "1" if eager else "0",
+        "LITELLM_LOCAL_MODEL_COST_MAP": "True",
+    })
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=HERE, env=env,
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def summarize(samples, key):
+    values = [s[key] * 1000 for s in samples]
+    return {"median_ms": round(statistics.median(values), 1), "min_ms": round(min(values), 1)}
+
+
+def main_cli(argv=None):
+    p = argparse.ArgumentParser(description="Compare eager vs lazy ChatBot cold start.")
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--json", action="store_true")
+    args = p.parse_args(argv)
+
+    report = {}
+    for mode, eager in (("eager", True), ("lazy", False)):
+        samples = [run_once(eager) for _ in range(args.runs)]
+        report[mode] = {k: summarize(samples, k) for k in ("import", "live", "ready")}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print(f"{'mode':<6} {'import':>12} {'/healthz':>12} {'ready':>12}   (median ms over {args.runs} runs)")
+    for mode, r in report.items():
+        print(f"{mode:<6} {r['import']['median_ms']:>12} {r['live']['median_ms']:>12} {r['ready']['median_ms']:>12}")
+
+
+if __name__ == "__main__":
+    main_cli()
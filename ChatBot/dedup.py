@@ -0,0 +1,106 @@
+"""
+dedup.py
+
+Drops Telegram re-deliveries by update_id before any work is done.
+
+Telegram re-sends an update when the webhook is slow or fails, which would
+otherwise trigger another transcription, another LLM exchange and another
+reply. The in-memory window (bounded, O(1) check-and-insert) covers a single
+process; with `sqlite_path` set, a shared SQLite table also catches
+duplicates that land on another worker process.
+"""
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class UpdateDeduplicator:
+    """Thread-safe record of recently seen update_ids, optionally shared through SQLite."""
+
+    def __init__(self, window: int = 10000, sqlite_path: str = None, ttl: float = 24 * 3600):
+        self.window = window
+        self.ttl = ttl
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.sqlite_path = sqlite_path
+        self.total = 0
+        self.duplicates = 0
+        self._last_prune = 0.0
+        if sqlite_path:
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS seen_updates ("
+                    "update_id INTEGER PRIMARY KEY, seen_at REAL NOT NULL)"
+                )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.sqlite_path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, update_id) -> bool:
+        """Insert into the in-memory window; False if it was already there."""
+        with self._lock:
+            if update_id in self._recent:
+                return False
+            self._recent[update_id] = None
+            if len(self._recent) > self.window:
+                self._recent.popitem(last=False)
+            return True
+
+    def _claim_shared(self, update_id) -> bool:
+        now = time.time()
+        conn = self._connect()
+        cur = conn.execute(
+            "INSERT OR IGNORE INTO seen_updates (update_id, seen_at) VALUES (?, ?)",
+            (update_id, now),
+        )
+        if now - self._last_prune > 600:
+            self._last_prune = now
+            conn.execute("DELETE FROM seen_updates WHERE seen_at < ?", (now - self.ttl,))
+        return cur.rowcount == 1
+
+    def is_duplicate(self, update_id) -> bool:
+        """Record `update_id`; True if it has been seen before. Updates without an id are never duplicates."""
+        if update_id is None:
+            return False
+        fresh = self._remember(update_id)
+        if fresh and self.sqlite_path:
+            try:
+                fresh = self._claim_shared(update_id)
+            except sqlite3.Error:
+                # The shared store is best effort; never drop an update because of it.
+                fresh = True
+        with self._lock:
+            self.total += 1
+            if not fresh:
+                self.duplicates += 1
+        return not fresh
+
+    def forget(self, update_id) -> None:
+        """Un-record `update_id` after its handling failed, so a re-delivery is processed."""
+        if update_id is None:
+            return
+        with self._lock:
+            self._recent.pop(update_id, None)
+        if self.sqlite_path:
+            try:
+                self._connect().execute("DELETE FROM seen_updates WHERE update_id = ?", (update_id,))
+            except sqlite3.Error:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "total": self.total,
+                "duplicates": self.duplicates,
+                "duplicate_ratio": (self.duplicates / self.total) if self.total else 0.0,
+                "window": len(self._recent),
+            }
@@ -0,0 +1,449 @@
+"""
+loadtest.py
+
+Offline load test for main.py. Starts local stand-ins for every external
+dependency, points the bot at them through env vars, serves the Flask app
+and fires concurrent webhook updates at it.
+
+Stand-ins:
+- fake Telegram Bot API: setWebhook, sendMessage, editMessageText, getFile
+  and file downloads; optional 429 injection
+- fake Groq: OpenAI-compatible /openai/v1/chat/completions (answers with a
+  tool call first, then a final text) and /openai/v1/audio/transcriptions,
+  with configurable latency, error rate, rate-limit rate and per-model RPM
+- fake portfolio API: /api/home/, /api/about/, /api/skilled/, /api/skills/, /api/work/
+
+Each virtual user is one Telegram chat that sends an update and waits for the
+bot's reply before sending the next, so end-to-end latency is measured from
+the webhook POST to the first sendMessage for that chat. With
+`--bot-env STREAM_REPLIES=1` that first message is the streaming placeholder,
+so the figure becomes time-to-first-visible-output.
+
+Usage:
+    python loadtest.py --users 20 --updates 200 --llm-latency 0.8 --error-rate 0.05 --rate-limit-rpm 60
+    python loadtest.py --json > bench_output.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import statistics
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+BOT_TOKEN = "123456:LOADTEST"
+QUESTIONS = [
+    "What are your skills?",
+    "show projects",
+    "Tell me about yourself",
+    "What is your github?",
+    "tell me more about it",
+]
+
+PORTFOLIO_DATA = {
+    "home": {"id": 1, "title": "Hi, I'm Vicky", "subtitle": "Developer", "image": None,
+             "github_url": "https://github.com/imvickykumar999", "linkedin_url": None,
+             "email_address": "me@example.com"},
+    "about": {"id": 1, "name": "Vicky", "bio": "Backend developer.", "profile_image": None},
+    "skilled": {"id": 1, "name": "Skills", "bio": "Things I do.", "profile_image": None},
+    "skills": [{"id": i, "skill_name": n, "proficiency": p}
+               for i, (n, p) in enumerate([("Python", 90), ("Django", 85), ("DRF", 80)], 1)],
+    "work": [{"id": i, "project_name": f"Project {i}", "project_image": None,
+              "project_url": f"https://example.com/{i}"} for i in range(1, 7)],
+}
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _json(self, status: int, payload, headers=None):
+        blob = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(blob)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, str(v))
+        self.end_headers()
+        self.wfile.write(blob)
+
+
+def _serve(handler_cls, state):
+    handler = type(handler_cls.__name__, (handler_cls,), {"state": state})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+# ----------------------------
+# Fake Telegram Bot API
+# ----------------------------
+class FakeTelegramState:
+    def __init__(self, rate_limit_rate: float = 0.0):
+        self.rate_limit_rate = rate_limit_rate
+        self.lock = threading.Lock()
+        self.cond = threading.Condition(self.lock)
+        self.messages = defaultdict(list)  # chat_id -> [(t, text)]
+        self.calls = defaultdict(int)
+        self.next_message_id = 1
+
+
+class FakeTelegramHandler(_Handler):
+    state: FakeTelegramState
+
+    def _method(self):
+        m = re.match(r"^/bot[^/]+/(\w+)", self.path.split("?")[0])
+        return m.group(1) if m else None
+
+    def do_GET(self):
+        if self.path.startswith("/file/"):
+            blob = b"OggS" + os.urandom(2048)
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(blob)))
+            self.end_headers()
+            self.wfile.write(blob)
+            return
+        self._dispatch({})
+
+    def do_POST(self):
+        body = self._body()
+        try:
+            payload = json.loads(body) if body else {}
+        except ValueError:
+            payload = {}
+        self._dispatch(payload)
+
+    def _dispatch(self, payload):
+        st = self.state
+        method = self._method()
+        with st.lock:
+            st.calls[method] += 1
+        if method in ("sendMessage", "editMessageText") and random.random() < st.rate_limit_rate:
+            return self._json(429, {"ok": False, "error_code": 429,
+                                    "description": "Too Many Requests: retry after 1",
+                                    "parameters": {"retry_after": 1}})
+        if method == "getFile":
+            return self._json(200, {"ok": True, "result": {
+                "file_id": "x", "file_unique_id": "x", "file_size": 2052, "file_path": "voice/file_0.oga"}})
+        if method in ("sendMessage", "editMessageText"):
+            with st.cond:
+                message_id = payload.get("message_id") or st.next_message_id
+                st.next_message_id += 1
+                if method == "sendMessage":
+                    st.messages[payload.get("chat_id")].append((time.monotonic(), payload.get("text", "")))
+                    st.cond.notify_all()
+            return self._json(200, {"ok": True, "result": {"message_id": message_id}})
+        return self._json(200, {"ok": True, "result": True})
+
+
+# ----------------------------
+# Fake Groq (OpenAI-compatible)
+# ----------------------------
+class FakeLLMState:
+    def __init__(self, latency: float, jitter: float, error_rate: float, rate_limit_rate: float, rpm: int):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.rpm = rpm
+        self.lock = threading.Lock()
+        self.window = defaultdict(list)  # model -> [t]
+        self.counts = defaultdict(int)
+
+
+class FakeLLMHandler(_Handler):
+    state: FakeLLMState
+
+    def _rate_limited(self, model: str):
+        st = self.state
+        now = time.monotonic()
+        with st.lock:
+            if random.random() < st.rate_limit_rate:
+                return 2.0
+            if st.rpm:
+                window = [t for t in st.window[model] if now - t < 60]
+                st.window[model] = window
+                if len(window) >= st.rpm:
+                    return round(60 - (now - window[0]), 2)
+                window.append(now)
+        return None
+
+    def do_POST(self):
+        st = self.state
+        body = self._body()
+        if self.path.endswith("/audio/transcriptions"):
+            with st.lock:
+                st.counts["transcriptions"] += 1
+            time.sleep(max(0.0, random.gauss(st.latency / 2, st.jitter)))
+            return self._json(200, {"text": random.choice(QUESTIONS), "task": "transcribe",
+                                    "language": "english", "duration": 2.0, "segments": []})
+
+        if not self.path.endswith("/chat/completions"):
+            return self._json(404, {"error": {"message": "not found"}})
+
+        req = json.loads(body or b"{}")
+        model = req.get("model", "unknown")
+        wait = self._rate_limited(model)
+        if wait is not None:
+            with st.lock:
+                st.counts["rate_limited"] += 1
+            return self._json(429, {"error": {
+                "message": f"Rate limit reached for model `{model}`. Please try again in {wait}s.",
+                "type": "requests", "code": "rate_limit_exceeded"}}, headers={"retry-after": int(wait) + 1})
+
+        time.sleep(max(0.0, random.gauss(st.latency, st.jitter)))
+        if random.random() < st.error_rate:
+            with st.lock:
+                st.counts["errors"] += 1
+            return self._json(503, {"error": {"message": "Service Unavailable", "type": "internal_server_error"}})
+
+        with st.lock:
+            st.counts["completions"] += 1
+        messages = req.get("messages") or []
+        last = messages[-1] if messages else {}
+        usage = {"prompt_tokens": 600, "completion_tokens": 60, "total_tokens": 660}
+        if req.get("tools") and last.get("role") != "tool":
+            text = json.dumps(last.get("content", "")).lower()
+            tool = ("get_skills" if "skill" in text else "get_work" if "project" in text
+                    else "get_about" if "about" in text else "get_home")
+            message = {"role": "assistant", "content": None, "tool_calls": [{
+                "id": f"call_{uuid.uuid4().hex[:8]}", "type": "function",
+                "function": {"name": tool, "arguments": json.dumps({"query": "loadtest"})}}]}
+            finish = "tool_calls"
+        else:
+            message = {"role": "assistant", "content": "Here is what I found in the portfolio."}
+            finish = "stop"
+        if req.get("stream"):
+            return self._stream(model, message, finish, usage)
+        return self._json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "object": "chat.completion",
+            "created": int(time.time()), "model": model,
+            "choices": [{"index": 0, "message": message, "finish_reason": finish}],
+            "usage": usage, "system_fingerprint": "fp_loadtest", "service_tier": "on_demand",
+        })
+
+    def _stream(self, model, message, finish, usage):
+        """Server-sent events in the OpenAI chunk format (used with STREAM_REPLIES=1)."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": model}
+        if message.get("tool_calls"):
+            call = dict(message["tool_calls"][0], index=0)
+            deltas = [{"role": "assistant", "tool_calls": [call]}]
+        else:
+            words = message["content"].split(" ")
+            deltas = [{"role": "assistant", "content": w + " "} for w in words]
+        for delta in deltas:
+            chunk = dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": None}])
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+            time.sleep(0.02)
+        last = dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": finish}], usage=usage)
+        self.wfile.write(f"data: {json.dumps(last)}\n\ndata: [DONE]\n\n".encode())
+        self.wfile.flush()
+
+
+# ----------------------------
+# Fake portfolio API
+# ----------------------------
+class FakePortfolioHandler(_Handler):
+    state: dict
+
+    def do_GET(self):
+        m = re.match(r"^/api/(\w+)/$", self.path.split("?")[0])
+        if m and m.group(1) in self.state:
+            return self._json(200, self.state[m.group(1)])
+        return self._json(404, {"detail": "Not found."})
+
+
+# ----------------------------
+# Driver
+# ----------------------------
+def start_stubs(args):
+    tg_state = FakeTelegramState(args.telegram_429_rate)
+    llm_state = FakeLLMState(args.llm_latency, args.llm_jitter, args.error_rate,
+                             args.rate_limit_rate, args.rate_limit_rpm)
+    servers = [
+        _serve(FakeTelegramHandler, tg_state),
+        _serve(FakeLLMHandler, llm_state),
+        _serve(FakePortfolioHandler, PORTFOLIO_DATA),
+    ]
+    urls = [url for _, url in servers]
+    return tg_state, llm_state, urls, [s for s, _ in servers]
+
+
+def start_bot(telegram_url, llm_url, portfolio_url, bot_env=()):
+    os.environ.update(dict(item.split("=", 1) for item in bot_env))
+    os.environ.update({
+        "TELEGRAM_BOT_TOKEN": BOT_TOKEN,
+        "GROQ_API_KEY": "gsk_loadtest",
+        "PUBLIC_BASE_URL": "http://127.0.0.1",
+        "WEBHOOK_SECRET": "loadtest-secret",
+        "TELEGRAM_API_BASE": telegram_url,
+        "GROQ_BASE_URL": llm_url,
+        "PORTFOLIO_BASE_URL": portfolio_url,
+        "LITELLM_LOG": "ERROR",
+        "LITELLM_LOCAL_MODEL_COST_MAP": "True",
+        "HF_HUB_OFFLINE": "1",  # litellm may try to fetch tokenizers when streaming
+    })
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import main  # noqa: E402  (env must be set first)
+    from werkzeug.serving import make_server
+
+    # The bot logs every request at INFO/DEBUG; keep the report readable.
+    logging.getLogger().setLevel(logging.WARNING)
+
+    main.ensure_agent_stack()  # measure steady state, not the cold start (see bench_startup.py)
+    server = make_server("127.0.0.1", 0, main.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return main, f"http://127.0.0.1:{server.server_port}"
+
+
+def make_update(update_id: int, chat_id: int, voice_ratio: float) -> dict:
+    message = {"message_id": update_id, "date": int(time.time()),
+               "chat": {"id": chat_id, "type": "private"}, "from": {"id": chat_id, "is_bot": False}}
+    if random.random() < voice_ratio:
+        uid = f"voice-{random.randint(1, 20)}"  # repeats exercise the transcript cache
+        message["voice"] = {"file_id": uid, "file_unique_id": uid, "duration": 2, "file_size": 2052}
+    else:
+        message["text"] = random.choice(QUESTIONS)
+    return {"update_id": update_id, "message": message}
+
+
+def run(args):
+    tg, llm, (tg_url, llm_url, portfolio_url), _servers = start_stubs(args)
+    main, bot_url = start_bot(tg_url, llm_url, portfolio_url, args.bot_env)
+    session = requests.Session()
+    headers = {"X-Telegram-Bot-Api-Secret-Token": "loadtest-secret"}
+
+    e2e, webhook, timeouts = [], [], 0
+    lock = threading.Lock()
+    counter = iter(range(1, args.updates + 1))
+
+    def virtual_user(index: int):
+        nonlocal timeouts
+        chat_id = 10_000 + index
+        while True:
+            with lock:
+                update_id = next(counter, None)
+            if update_id is None:
+                return
+            with tg.cond:
+                seen = len(tg.messages[chat_id])
+            started = time.monotonic()
+            r = session.post(f"{bot_url}/webhook", json=make_update(update_id, chat_id, args.voice_ratio),
+                             headers=headers, timeout=args.timeout)
+            acked = time.monotonic()
+            with tg.cond:
+                ok = tg.cond.wait_for(lambda: len(tg.messages[chat_id]) > seen, timeout=args.timeout)
+                replied = tg.messages[chat_id][seen][0] if ok else None
+            with lock:
+                webhook.append(acked - started)
+                if r.status_code != 200 or replied is None:
+                    timeouts += 1
+                else:
+                    e2e.append(replied - started)
+            # Let the per-chat send spacing pass before the next message.
+            time.sleep(args.think_time)
+
+    t0 = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.users) as pool:
+        list(pool.map(virtual_user, range(args.users)))
+    elapsed = time.monotonic() - t0
+
+    metrics_text = session.get(f"{bot_url}/metrics", timeout=10).text
+
+    def metric_total(name):
+        total = 0.0
+        for line in metrics_text.splitlines():
+            if line.startswith(name) and not line.startswith("#"):
+                total += float(line.rsplit(" ", 1)[1])
+        return total
+
+    ms = lambda v: None if v is None else round(v * 1000, 1)
+    return {
+        "config": vars(args),
+        "elapsed_s": round(elapsed, 2),
+        "throughput_updates_per_s": round(len(e2e) / elapsed, 2) if elapsed else None,
+        "completed": len(e2e),
+        "failed_or_timed_out": timeouts,
+        "e2e_ms": {p: ms(percentile(e2e, int(p[1:]))) for p in ("p50", "p90", "p95", "p99")},
+        "e2e_ms_mean": ms(statistics.mean(e2e)) if e2e else None,
+        "webhook_ack_ms": {p: ms(percentile(webhook, int(p[1:]))) for p in ("p50", "p99")},
+        "bot": {
+            "retries": metric_total("chatbot_retries_total"),
+            "fallbacks": metric_total("chatbot_fallbacks_total"),
+            "errors": metric_total("chatbot_errors_total"),
+            "router": main.model_router.snapshot(),
+            "answer_cache": main.answer_cache.stats(),
+        },
+        "fake_llm": dict(llm.counts),
+        "fake_telegram_calls": dict(tg.calls),
+    }
+
+
+def main_cli(argv=None):
+    p = argparse.ArgumentParser(description="Offline load test for the Telegram ChatBot.")
+    p.add_argument("--users", type=int, default=10, help="concurrent chats (closed loop)")
+    p.add_argument("--updates", type=int, default=100, help="total webhook updates to send")
+    p.add_argument("--voice-ratio", type=float, default=0.1)
+    p.add_argument("--think-time", type=float, default=1.0, help="pause between a reply and the next update")
+    p.add_argument("--timeout", type=float, default=120.0)
+    p.add_argument("--llm-latency", type=float, default=0.5, help="mean fake LLM latency (s)")
+    p.add_argument("--llm-jitter", type=float, default=0.1)
+    p.add_argument("--error-rate", type=float, default=0.0, help="fraction of LLM calls answered with 503")
+    p.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of LLM calls answered with 429")
+    p.add_argument("--rate-limit-rpm", type=int, default=0, help="per-model RPM enforced by the fake LLM (0=off)")
+    p.add_argument("--telegram-429-rate", type=float, default=0.0)
+    p.add_argument("--bot-env", action="append", default=[], metavar="KEY=VALUE",
+                   help="extra env for the bot, e.g. GROQ_70B_TPM=1000000 to lift the free-tier budget")
+    p.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = p.parse_args(argv)
+
+    report = run(args)
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+        return
+    print(f"completed {report['completed']} updates in {report['elapsed_s']}s "
+          f"({report['throughput_updates_per_s']} updates/s), failed/timed out: {report['failed_or_timed_out']}")
+    print("end-to-end ms:", report["e2e_ms"], "mean", report["e2e_ms_mean"])
+    print("webhook ack ms:", report["webhook_ack_ms"])
+    print("retries/fallbacks/errors:", report["bot"]["retries"], report["bot"]["fallbacks"], report["bot"]["errors"])
+    print("answer cache:", report["bot"]["answer_cache"])
+    print("fake LLM:", report["fake_llm"])
+    print("fake Telegram:", report["fake_telegram_calls"])
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -4,10 +4,15 @@ telegram_weather_bot.py
 Telegram webhook that uses:
 - InMemorySessionService for per-chat (and per-topic) sessions
 - ADK Runner to call your blog_agent (with get_weather tool)
-- Groq via LiteLlm (primary + fallbacks)
+- Groq via LiteLlm (primary + fallbacks, routed per request by model_router)
 - Flask (sync) + asyncio to run async ADK code
 - Optional voice transcription via Groq Whisper
 
+The ADK/LiteLLM/Groq stacks are imported lazily: the server binds first and
+a background warm-up builds them (GET /readyz reports when that is done;
+GET /healthz is plain liveness). Set CHATBOT_EAGER_INIT=1 to build
+everything at import time instead. bench_startup.py compares both paths.
+
 Install:
     pip install flask requests python-dotenv
 
@@ -19,33 +24,32 @@ Env (.env):
     GROQ_API_KEY=gsk_...
     PUBLIC_BASE_URL=https://<your-ngrok-or-domain>
     # optional: WEBHOOK_SECRET=some-long-random-string
+    # optional: DEDUP_SQLITE_PATH=/tmp/chatbot-updates.db (share update_id dedup across processes)
 """
 
 import os
-import re
+import sys
 import time
+import threading
 import asyncio
+import functools
 import warnings
 import logging
 import random
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
-from flask import Flask, request, jsonify, abort
-
-# --- Your ADK stack ---
-from google.adk.agents import Agent
-from google.adk.models.lite_llm import LiteLlm
-from google.adk.sessions import InMemorySessionService
-from google.adk.runners import Runner
-from google.genai import types
-from Portfolio import get_home, get_about, get_skilled, get_skills, get_work
-from groq import Groq
+from flask import Flask, Response, request, jsonify, abort
 
-# Optional LiteLLM exceptions
-try:
-    import litellm  # type: ignore
-except Exception:
-    litellm = None
+# --- Your ADK stack (google.adk, litellm, groq) is imported lazily below ---
+from Portfolio import get_home, get_about, get_skilled, get_skills, get_work
+from model_router import ModelRouter
+from rate_limits import RateBudgetTracker, retry_after_from_message
+from voice import VoicePipeline, VoiceTooLarge, VoiceDownloadError
+from telegram_sender import TelegramSender, StreamingMessage, make_session
+from answer_cache import AnswerCache, fingerprint
+from dedup import UpdateDeduplicator
+import metrics
+from metrics import span, start_trace, use_trace, UPDATES, RETRIES, FALLBACKS, ERRORS
 
 # ----------------------------
 # Setup & configuration
@@ -58,6 +62,7 @@ BOT_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
 GROQ_KEY = os.getenv("GROQ_API_KEY")
 PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL")
 WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "change-me-please-32-bytes")
+metrics.TRACE_LOGS = os.getenv("TRACE_UPDATES", "0") == "1"
 
 if not BOT_TOKEN:
     raise RuntimeError("TELEGRAM_BOT_TOKEN is not set")
@@ -67,9 +72,12 @@ if not PUBLIC_BASE_URL:
     raise RuntimeError("PUBLIC_BASE_URL is not set")
 
 os.environ["GROQ_API_KEY"] = GROQ_KEY  # LiteLlm expects it
-groq_client = Groq(api_key=GROQ_KEY)
 
-BASE_URL = f"https://api.telegram.org/bot{BOT_TOKEN}"
+# Endpoint overrides exist for local stand-ins (see loadtest.py).
+TELEGRAM_API_BASE = os.getenv("TELEGRAM_API_BASE", "https://api.telegram.org").rstrip("/")
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL")  # e.g. http://127.0.0.1:9002; default: api.groq.com
+
+BASE_URL = f"{TELEGRAM_API_BASE}/bot{BOT_TOKEN}"
 WEBHOOK_PATH = "/webhook"
 WEBHOOK_URL = f"{PUBLIC_BASE_URL}{WEBHOOK_PATH}"
 
@@ -86,43 +94,142 @@ GROQ_FALLBACKS = [
 
 DEFAULT_MAX_TOKENS = 256
 
-def make_model(model_name: str) -> LiteLlm:
+def make_model(model_name: str):
     """Create a LiteLlm model handle (Groq OpenAI-compatible)."""
+    from google.adk.models.lite_llm import LiteLlm
+
+    extra = {"api_base": f"{GROQ_BASE_URL.rstrip('/')}/openai/v1"} if GROQ_BASE_URL else {}
     return LiteLlm(
         model=model_name,
         api_key=GROQ_KEY,
         max_tokens=DEFAULT_MAX_TOKENS,
         timeout=30,          # a bit generous; we do our own retries/backoff
         num_retries=0,
+        **extra,
     )
 
-blog_agent = Agent(
-    name="blog_agent_v1",
-    model=make_model(GROQ_PRIMARY),
-    description="You are the blog assistant of imvickykumar999 company.",
-    instruction=(
-        "You are a helpful assistant.\n\n"
-        "You have access to the following tools: get_home, get_about, get_skilled, get_skills, get_work.\n"
-        "Each tool takes exactly one argument named 'query' (a string). "
-        "Always call them using only this 'query' parameter. "
-        "Do not invent or pass other arguments such as 'company' or 'name'.\n\n"
-        "When a tool returns, extract the 'report' field from the result and present it to the user clearly and concisely. "
-        "If a tool returns an error, inform the user politely about the issue."
-    ),
-    tools=[get_home, get_about, get_skilled, get_skills, get_work],
+def timed_tool(fn):
+    """Wrap a tool so each call is timed as a 'tool' stage (signature/docstring preserved for ADK)."""
+    @functools.wraps(fn)
+    def wrapper(query: str) -> dict:
+        with span("tool", tool=fn.__name__):
+            result = fn(query)
+        if isinstance(result, dict) and result.get("status") == "error":
+            ERRORS.inc(stage="tool")
+        return result
+    return wrapper
+
+AGENT_TOOLS = [timed_tool(t) for t in (get_home, get_about, get_skilled, get_skills, get_work)]
+
+AGENT_INSTRUCTION = (
+    "You are a helpful assistant.\n\n"
+    "You have access to the following tools: get_home, get_about, get_skilled, get_skills, get_work.\n"
+    "Each tool takes exactly one argument named 'query' (a string). "
+    "Always call them using only this 'query' parameter. "
+    "Do not invent or pass other arguments such as 'company' or 'name'.\n\n"
+    "When a tool returns, extract the 'report' field from the result and present it to the user clearly and concisely. "
+    "If a tool returns an error, inform the user politely about the issue."
 )
 
+def make_agent(model_name: str):
+    """Build the blog agent bound to a single model."""
+    from google.adk.agents import Agent
+
+    return Agent(
+        name="blog_agent_v1",
+        model=make_model(model_name),
+        description="You are the blog assistant of imvickykumar999 company.",
+        instruction=AGENT_INSTRUCTION,
+        tools=AGENT_TOOLS,
+    )
 
 # ----------------------------
-# Session service & runner
+# Session service & runners (built lazily, see ensure_agent_stack)
 # ----------------------------
-session_service = InMemorySessionService()
 APP_NAME = "blog_assistant_app"
 
-runner = Runner(
-    agent=blog_agent,
-    app_name=APP_NAME,
-    session_service=session_service,
+blog_agent = None
+session_service = None
+runner = None
+groq_client = None
+types = None   # google.genai.types
+Event = None   # google.adk.events.Event
+
+# One runner per model, all sharing the same session service so chat history
+# survives a switch between models. Agents are never mutated after creation,
+# which keeps concurrent requests on different models isolated.
+_runners = {}
+_stack_lock = threading.Lock()
+_stack_ready = threading.Event()
+
+def ensure_agent_stack():
+    """Import google.adk/litellm/groq and build the primary agent + runner once."""
+    global blog_agent, session_service, runner, groq_client, types, Event
+    if _stack_ready.is_set():
+        return
+    with _stack_lock:
+        if _stack_ready.is_set():
+            return
+        started = time.monotonic()
+        from google.adk.events import Event as _Event
+        from google.adk.runners import Runner
+        from google.adk.sessions import InMemorySessionService
+        from google.genai import types as _types
+        from groq import Groq
+
+        types, Event = _types, _Event
+        groq_client = Groq(api_key=GROQ_KEY, base_url=GROQ_BASE_URL)
+        session_service = InMemorySessionService()
+        blog_agent = make_agent(GROQ_PRIMARY)
+        runner = Runner(
+            agent=blog_agent,
+            app_name=APP_NAME,
+            session_service=session_service,
+        )
+        _runners[GROQ_PRIMARY] = runner
+        _stack_ready.set()
+        logging.info("Agent stack ready in %.2fs", time.monotonic() - started)
+
+def runner_for(model_name: str):
+    ensure_agent_stack()
+    runner_ = _runners.get(model_name)
+    if runner_ is not None:
+        return runner_
+    with _stack_lock:
+        # Concurrent webhook threads must not each build a fallback runner.
+        if model_name not in _runners:
+            from google.adk.runners import Runner
+
+            _runners[model_name] = Runner(
+                agent=make_agent(model_name),
+                app_name=APP_NAME,
+                session_service=session_service,
+            )
+        return _runners[model_name]
+
+# Groq free-tier limits per model (requests/min, tokens/min); override via env.
+GROQ_RATE_LIMITS = {
+    "groq/llama-3.3-70b-versatile": (
+        int(os.getenv("GROQ_70B_RPM", "30")),
+        int(os.getenv("GROQ_70B_TPM", "12000")),
+    ),
+    "groq/llama-3.1-8b-instant": (
+        int(os.getenv("GROQ_8B_RPM", "30")),
+        int(os.getenv("GROQ_8B_TPM", "6000")),
+    ),
+}
+# One agent run is usually two completions (tool call + answer); budget for both.
+EST_TOKENS_PER_RUN = int(os.getenv("EST_TOKENS_PER_RUN", "2000"))
+# Longest a request waits for budget before trying another model or giving up.
+RATE_BUDGET_MAX_WAIT = float(os.getenv("RATE_BUDGET_MAX_WAIT", "20"))
+
+rate_budget = RateBudgetTracker(GROQ_RATE_LIMITS)
+
+model_router = ModelRouter(
+    GROQ_PRIMARY,
+    GROQ_FALLBACKS,
+    slow_latency=float(os.getenv("MODEL_SLOW_LATENCY", "20")),
+    cooldown=float(os.getenv("MODEL_BREAKER_COOLDOWN", "30")),
 )
 
 # Track sessions if your ADK version lacks get_session()
@@ -130,6 +237,7 @@ _seen_sessions = set()
 
 async def ensure_session(user_id: str, session_id: str):
     """Get-or-create session; avoid resetting history each message."""
+    ensure_agent_stack()
     try:
         sess = await session_service.get_session(
             app_name=APP_NAME,
@@ -156,15 +264,20 @@ async def ensure_session(user_id: str, session_id: str):
 # ----------------------------
 # Helpers: rate limit / transient handling & model fallback
 # ----------------------------
-RATE_LIMIT_PATTERN = re.compile(r"try again in ([\d.]+)s", re.IGNORECASE)
+class ModelCallError(Exception):
+    """A model failure delivered as an ADK error event rather than an exception."""
 
 def _is_rate_limit_error(e: Exception) -> bool:
+    # litellm is only in sys.modules once the stack was built; before that no
+    # litellm exception can exist, so there is nothing to match against.
+    litellm = sys.modules.get("litellm")
     if litellm and isinstance(e, getattr(litellm, "RateLimitError", tuple())):
         return True
     msg = f"{type(e).__name__}: {e}"
     return "rate limit" in msg.lower() or "rate_limit_exceeded" in msg.lower()
 
 def _is_transient_error(e: Exception) -> bool:
+    litellm = sys.modules.get("litellm")
     if litellm:
         transient_types = (
             getattr(litellm.exceptions, "ServiceUnavailableError", tuple()),
@@ -178,64 +291,226 @@ def _is_transient_error(e: Exception) -> bool:
     return any(k in msg for k in ["service unavailable", "503", "bad gateway", "502", "gateway timeout", "504", "temporarily unavailable", "connection reset", "connection aborted"])
 
 async def _backoff_sleep(err_msg: str, attempt: int):
-    # exponential + jitter
+    # Honour the provider's "try again in Xs" hint when present,
+    # otherwise exponential + jitter.
+    hint = retry_after_from_message(err_msg)
+    if hint is not None:
+        await asyncio.sleep(min(hint, 60) + random.uniform(0, 0.25))
+        return
     base = min(2 ** attempt, 20)
     jitter = random.uniform(0, 0.5 * base)
     await asyncio.sleep(base + jitter)
 
-async def _swap_model_to_fallback(agent: Agent, used: set) -> bool:
-    for cand in GROQ_FALLBACKS:
-        if cand not in used:
-            agent.model = make_model(cand)
-            logging.info("[Model Fallback] Switched to: %s", cand)
-            used.add(cand)
-            return True
-    return False
+def _event_text(event) -> str:
+    content = getattr(event, "content", None)
+    if not content or not content.parts:
+        return ""
+    return "".join(p.text for p in content.parts if getattr(p, "text", None))
 
-async def ask_agent_async(query: str, user_id: str, session_id: str) -> str:
+async def run_agent_async(query: str, user_id: str, session_id: str, on_partial=None):
     """
-    Runs the ADK runner with retries + fallbacks.
-    Returns the final response text to send back to Telegram.
+    Runs the ADK runner with retries + per-request model routing.
+    Returns (text, answered); `answered` is False for error/fallback texts.
     Uses InMemorySessionService keyed by (app_name, user_id, session_id).
+
+    With `on_partial(text_so_far)`, the model output is streamed (SSE) and
+    the callback receives the accumulated text of the current model turn.
     """
     await ensure_session(user_id, session_id)
 
     content = types.Content(role="user", parts=[types.Part(text=query)])
+    run_kwargs = {}
+    if on_partial is not None:
+        from google.adk.agents.run_config import RunConfig, StreamingMode
+
+        run_kwargs["run_config"] = RunConfig(streaming_mode=StreamingMode.SSE)
     final_response_text = "I couldn't produce a response."
+    answered = False
     max_attempts = 6
-    used_models = {GROQ_PRIMARY}
+    tried_models = set()
     attempt = 0
 
     while attempt < max_attempts:
         attempt += 1
+        model_name = model_router.pick(
+            exclude=tried_models,
+            delay_of=lambda m: rate_budget.delay(m, EST_TOKENS_PER_RUN),
+        )
+        if model_name is None:
+            # Every breaker is open: wait for the first one to cool down.
+            wait = model_router.seconds_until_available()
+            logging.warning("[Model Router] All models unavailable; waiting %.1fs", wait)
+            await asyncio.sleep(min(wait, 20) + random.uniform(0, 0.5))
+            continue
+
+        if tried_models and model_name not in tried_models:
+            logging.info("[Model Fallback] Using: %s", model_name)
+            FALLBACKS.inc(model=model_name)
+        tried_models.add(model_name)
+
+        # Hold the request until the model's RPM/TPM budget has room,
+        # instead of sending it and eating a 429.
+        delay, reservation = rate_budget.reserve(model_name, EST_TOKENS_PER_RUN, max_delay=RATE_BUDGET_MAX_WAIT)
+        if reservation is None:
+            # Too long to hold the webhook: use another model if one is left,
+            # otherwise tell the user to come back later.
+            model_router.release(model_name)
+            logging.warning("[Rate Budget] %s has no room for %.0fs; not waiting", model_name, delay)
+            if model_router.pick_would_repeat(tried_models):
+                ERRORS.inc(stage="llm")
+                return "The assistant is busy right now. Please try again in a minute.", False
+            continue
+        if delay > 0:
+            logging.info("[Rate Budget] Holding %.1fs for %s", delay, model_name)
+            await asyncio.sleep(delay)
+
+        started = time.monotonic()
+        used_tokens = 0
+        streamed = ""
+        judged = False  # whether the breaker heard about this attempt
         try:
-            async for event in runner.run_async(
-                user_id=user_id,
-                session_id=session_id,
-                new_message=content
-            ):
-                if event.is_final_response():
-                    if getattr(event, "content", None) and event.content.parts:
-                        final_response_text = event.content.parts[0].text
-                    elif getattr(event, "actions", None) and getattr(event.actions, "escalate", None):
-                        final_response_text = f"Agent escalated: {event.error_message or 'No specific message.'}"
-                    break
-            return final_response_text
+            with span("llm", model=model_name, attempt=attempt):
+                async for event in runner_for(model_name).run_async(
+                    user_id=user_id,
+                    session_id=session_id,
+                    new_message=content,
+                    **run_kwargs,
+                ):
+                    # Newer ADK versions report model failures as error events
+                    # instead of raising; surface them so retry/routing applies.
+                    if getattr(event, "error_code", None) and not getattr(event, "content", None):
+                        raise ModelCallError(f"{event.error_code}: {event.error_message or ''}")
+                    if on_partial is not None:
+                        if getattr(event, "partial", False):
+                            chunk = _event_text(event)
+                            if chunk:
+                                streamed += chunk
+                                on_partial(streamed)
+                            continue
+                        # A complete (aggregated) event closes the current model
+                        # turn; the next turn (after a tool call) streams afresh.
+                        streamed = ""
+                    usage = getattr(event, "usage_metadata", None)
+                    if usage is not None and getattr(usage, "total_token_count", None):
+                        used_tokens += usage.total_token_count
+                    if event.is_final_response():
+                        if getattr(event, "content", None) and event.content.parts:
+                            final_response_text = event.content.parts[0].text
+                            answered = bool(final_response_text)
+                        elif getattr(event, "actions", None) and getattr(event.actions, "escalate", None):
+                            final_response_text = f"Agent escalated: {event.error_message or 'No specific message.'}"
+                        break
+            model_router.record_success(model_name, time.monotonic() - started)
+            judged = True
+            rate_budget.settle(reservation, used_tokens or None)
+            return final_response_text, answered
 
         except Exception as e:
             msg = f"{type(e).__name__}: {e}"
-            if _is_rate_limit_error(e) or _is_transient_error(e):
-                logging.warning("[Transient] Attempt %s/%s: %s", attempt, max_attempts, msg)
-                await _backoff_sleep(str(e), attempt)
-                if await _swap_model_to_fallback(runner.agent, used_models):
-                    continue
-                # else: retry same model after backoff
+            if _is_rate_limit_error(e):
+                # Not a health problem: block the model for the hinted time
+                # and let the next pick route around it or wait for it.
+                model_router.release(model_name)
+                judged = True
+                hold = rate_budget.note_rate_limited(model_name, e)
+                logging.warning("[Rate Limit] Attempt %s/%s on %s; holding %.1fs: %s",
+                                attempt, max_attempts, model_name, hold, msg)
+                tried_models.discard(model_name)
+                RETRIES.inc(model=model_name, reason="rate_limit")
+                continue
+
+            if _is_transient_error(e):
+                model_router.record_failure(model_name, time.monotonic() - started)
+                judged = True
+                RETRIES.inc(model=model_name, reason="transient")
+                logging.warning("[Transient] Attempt %s/%s on %s: %s", attempt, max_attempts, model_name, msg)
+                # Another healthy model can be tried right away; only back off
+                # when the next attempt would hit the same model again.
+                if model_router.pick_would_repeat(tried_models):
+                    await _backoff_sleep(str(e), attempt)
                 continue
 
             logging.exception("[Error] Unhandled exception while asking agent")
-            return "Sorry, something went wrong while generating the answer."
+            ERRORS.inc(stage="llm")
+            return "Sorry, something went wrong while generating the answer.", False
+        finally:
+            # Unhandled errors and cancellation say nothing about the model's
+            # health, but a half-open probe slot must not stay claimed.
+            if not judged:
+                model_router.release(model_name)
 
-    return "The assistant is temporarily unavailable (provider error). Please try again shortly."
+    ERRORS.inc(stage="llm")
+    return "The assistant is temporarily unavailable (provider error). Please try again shortly.", False
+
+# ----------------------------
+# Answer cache (context-free questions)
+# ----------------------------
+PORTFOLIO_TOOLS = [get_home, get_about, get_skilled, get_skills, get_work]
+
+def portfolio_version():
+    """Fingerprint of the portfolio data the tools would see; None if unavailable."""
+    payloads = []
+    for tool in PORTFOLIO_TOOLS:
+        result = tool("version")
+        if result.get("status") != "success":
+            return None
+        payloads.append(result["report"])
+    return fingerprint(payloads)
+
+answer_cache = AnswerCache(
+    portfolio_version,
+    max_entries=int(os.getenv("ANSWER_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("ANSWER_CACHE_TTL", "3600")),
+    fingerprint_ttl=float(os.getenv("ANSWER_CACHE_VERSION_TTL", "60")),
+)
+
+async def _record_cached_turn(query: str, answer: str, user_id: str, session_id: str):
+    """Append the cached Q/A to the session so follow-up questions keep their context."""
+    try:
+        await ensure_session(user_id, session_id)
+        sess = await session_service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+        invocation_id = f"cache-{time.time_ns()}"
+        for author, role, text in (("user", "user", query), (blog_agent.name, "model", answer)):
+            await session_service.append_event(sess, Event(
+                invocation_id=invocation_id,
+                author=author,
+                content=types.Content(role=role, parts=[types.Part(text=text)]),
+            ))
+    except Exception:
+        logging.debug("Could not record cached turn in session", exc_info=True)
+
+async def _session_has_history(user_id: str, session_id: str) -> bool:
+    """True if the session already holds turns (or cannot be inspected)."""
+    try:
+        await ensure_session(user_id, session_id)
+        sess = await session_service.get_session(app_name=APP_NAME, user_id=user_id, session_id=session_id)
+    except Exception:
+        logging.debug("Could not inspect session history", exc_info=True)
+        return True
+    return sess is None or bool(getattr(sess, "events", None))
+
+async def ask_agent_async(query: str, user_id: str, session_id: str, on_partial=None) -> str:
+    """
+    Answer `query` for Telegram: from the answer cache when the question is
+    context-free and the portfolio data is unchanged, otherwise via the agent.
+    `on_partial` enables streaming (see run_agent_async).
+    """
+    with span("cache"):
+        key = await asyncio.to_thread(answer_cache.key_for, query)
+        cached = answer_cache.get(key)
+    if cached is not None:
+        logging.info("[Answer Cache] hit for %r", key[0])
+        await _record_cached_turn(query, cached, user_id, session_id)
+        return cached
+
+    # Only an answer from a session with no earlier turns is known not to
+    # draw on the chat's history (names, languages, ...), so only those are
+    # shared with other chats; the query word list alone cannot tell.
+    cacheable = key is not None and not await _session_has_history(user_id, session_id)
+    text, answered = await run_agent_async(query, user_id, session_id, on_partial=on_partial)
+    if answered and cacheable:
+        answer_cache.put(key, text)
+    return text
 
 # ----------------------------
 # Telegram plumbing
@@ -254,6 +529,16 @@ def session_keys(message: dict):
     session_id = f"tg_chat_{chat_id}_{thread_id or 'main'}"
     return user_id, session_id
 
+# One keep-alive session for every Telegram call (sends, getFile, downloads).
+telegram_session = make_session(pool_size=int(os.getenv("TELEGRAM_POOL_SIZE", "16")))
+telegram = TelegramSender(
+    BOT_TOKEN,
+    session=telegram_session,
+    api_base=TELEGRAM_API_BASE,
+    global_rate=float(os.getenv("TELEGRAM_GLOBAL_RATE", "30")),
+    workers=int(os.getenv("TELEGRAM_SEND_WORKERS", "4")),
+)
+
 def set_webhook():
     url = f"{BASE_URL}/setWebhook"
     payload = {
@@ -261,35 +546,88 @@ def set_webhook():
         "secret_token": WEBHOOK_SECRET,     # verifies Telegram origin
         "allowed_updates": ["message"],
     }
-    r = requests.post(url, json=payload, timeout=15)
+    r = telegram_session.post(url, json=payload, timeout=15)
     r.raise_for_status()
     return r.json()
 
-def send_message(chat_id: int, text: str, retries: int = 3):
-    url = f"{BASE_URL}/sendMessage"
-    payload = {"chat_id": chat_id, "text": text}
-    for i in range(retries):
+def send_message(chat_id: int, text: str):
+    """Queue a reply; the sender splits, rate-limits and retries it in order."""
+    telegram.send(chat_id, text)
+
+# STREAM_REPLIES=1: show a placeholder at once and edit it as the model
+# streams, instead of waiting for the whole run before replying.
+STREAM_REPLIES = os.getenv("STREAM_REPLIES", "0") == "1"
+
+def reply_to(chat_id: int, query: str, user_id: str, session_id: str):
+    """Ask the agent and deliver the answer (streamed when enabled)."""
+    if not STREAM_REPLIES:
+        reply = asyncio.run(ask_agent_async(query, user_id=user_id, session_id=session_id))
+        send_message(chat_id, reply)
+        return
+    stream = StreamingMessage(telegram, chat_id)
+    reply = asyncio.run(ask_agent_async(query, user_id=user_id, session_id=session_id, on_partial=stream.update))
+    stream.finish(reply)
+
+def whisper_transcribe(file_name: str, file_content: bytes) -> str:
+    """Groq Whisper transcription; raises on failure so errors are never cached."""
+    ensure_agent_stack()
+    transcription = groq_client.audio.transcriptions.create(
+        file=(file_name, file_content),
+        model="whisper-large-v3",
+        response_format="verbose_json",
+    )
+    return transcription.text
+
+# Voice notes are downloaded and transcribed on a bounded pool, and the agent
+# reply runs on the update pool, so the webhook returns straight away.
+voice_pipeline = VoicePipeline(
+    BOT_TOKEN,
+    transcribe=whisper_transcribe,
+    session=telegram_session,
+    api_base=TELEGRAM_API_BASE,
+    max_bytes=int(os.getenv("VOICE_MAX_BYTES", str(5 * 1024 * 1024))),
+    max_workers=int(os.getenv("VOICE_WORKERS", "4")),
+    cache_size=int(os.getenv("VOICE_CACHE_SIZE", "1024")),
+)
+update_executor = ThreadPoolExecutor(
+    max_workers=int(os.getenv("UPDATE_WORKERS", "8")),
+    thread_name_prefix="update",
+)
+
+def _answer_voice(chat_id: int, user_id: str, session_id: str, transcript_future, trace):
+    with use_trace(trace):
         try:
-            requests.post(url, json=payload, timeout=20)
-            return
-        except requests.RequestException:
-            if i == retries - 1:
-                logging.exception("Failed to send message to Telegram after retries")
-            else:
-                time.sleep(2 * (i + 1))
-
-def transcribe_voice(file_name: str, file_content: bytes) -> str:
-    """Use Groq Whisper to transcribe Telegram OGG voice notes."""
+            _answer_voice_traced(chat_id, user_id, session_id, transcript_future)
+        finally:
+            trace.release()
+
+def _answer_voice_traced(chat_id: int, user_id: str, session_id: str, transcript_future):
     try:
-        transcription = groq_client.audio.transcriptions.create(
-            file=(file_name, file_content),
-            model="whisper-large-v3",
-            response_format="verbose_json",
-        )
-        return transcription.text
+        text = transcript_future.result()
+    except VoiceTooLarge:
+        send_message(chat_id, "Sorry, that voice note is too long for me to process.")
+        return
+    except VoiceDownloadError:
+        send_message(chat_id, "Sorry, could not retrieve the audio file.")
+        return
     except Exception:
-        logging.exception("Groq transcription failed")
-        return "Sorry, I'm having trouble transcribing your audio."
+        logging.exception("Voice handling failed")
+        ERRORS.inc(stage="transcribe")
+        send_message(chat_id, "Sorry, I couldn't process that voice note.")
+        return
+
+    try:
+        reply_to(chat_id, text, user_id, session_id)
+    except Exception:
+        logging.exception("Voice reply failed")
+        ERRORS.inc(stage="llm")
+        send_message(chat_id, "Sorry, something went wrong while generating the answer.")
+
+update_dedup = UpdateDeduplicator(
+    window=int(os.getenv("DEDUP_WINDOW", "10000")),
+    sqlite_path=os.getenv("DEDUP_SQLITE_PATH") or None,  # set when running several processes
+)
+DUPLICATES = metrics.REGISTRY.counter("chatbot_duplicate_updates_total", "Re-delivered updates dropped by update_id.")
 
 @app.route(WEBHOOK_PATH, methods=["POST"])
 def telegram_webhook():
@@ -299,13 +637,30 @@ def telegram_webhook():
         return abort(401)
 
     update = request.get_json(silent=True) or {}
-    message = update.get("message")
-    if not message:
-        return jsonify({"status": "ignored"}), 200
+    # Telegram re-delivers slow/failed updates; drop repeats before any work.
+    if update_dedup.is_duplicate(update.get("update_id")):
+        DUPLICATES.inc()
+        return jsonify({"status": "duplicate"}), 200
 
-    chat = message.get("chat") or {}
-    chat_id = chat.get("id")
-    if not chat_id:
+    trace = start_trace(update.get("update_id"))
+    try:
+        return handle_update(update, trace)
+    except Exception:
+        ERRORS.inc(stage="webhook")
+        # Telegram will re-deliver after the 500; let that attempt through.
+        update_dedup.forget(update.get("update_id"))
+        raise
+    finally:
+        trace.release()
+
+def handle_update(update: dict, trace):
+    with span("receive"):
+        message = update.get("message")
+        chat = (message or {}).get("chat") or {}
+        chat_id = chat.get("id")
+        kind = next((k for k in ("text", "voice", "sticker") if k in (message or {})), "other")
+        UPDATES.inc(kind=kind)
+    if not message or not chat_id:
         return jsonify({"status": "ignored"}), 200
 
     user_id, session_id = session_keys(message)
@@ -313,39 +668,23 @@ def telegram_webhook():
     # TEXT
     if "text" in message:
         text = (message.get("text") or "").strip()
-        reply = asyncio.run(ask_agent_async(text, user_id=user_id, session_id=session_id))
-        send_message(chat_id, reply)
+        reply_to(chat_id, text, user_id, session_id)
         return jsonify({"status": "ok"}), 200
 
-    # VOICE: fetch -> transcribe -> ask agent
+    # VOICE: fetch -> transcribe -> ask agent (in the background)
     if "voice" in message:
-        try:
-            file_id = message["voice"]["file_id"]
-            info = requests.get(f"{BASE_URL}/getFile", params={"file_id": file_id}, timeout=15).json()
-            if not info.get("ok"):
-                send_message(chat_id, "Sorry, could not retrieve the audio file.")
-                return jsonify({"status": "ok"}), 200
-
-            file_path = info["result"]["file_path"]
-            file_url = f"https://api.telegram.org/file/bot{BOT_TOKEN}/{file_path}"
-            ogg = requests.get(file_url, timeout=30).content
-
-            text = transcribe_voice("voice.ogg", ogg)
-            reply = asyncio.run(ask_agent_async(text, user_id=user_id, session_id=session_id))
-            send_message(chat_id, reply)
-            return jsonify({"status": "ok"}), 200
-
-        except Exception:
-            logging.exception("Voice handling failed")
-            send_message(chat_id, "Sorry, I couldn't process that voice note.")
-            return jsonify({"status": "ok"}), 200
+        future = voice_pipeline.submit(message["voice"])
+        trace.hold()
+        future.add_done_callback(
+            lambda f: update_executor.submit(_answer_voice, chat_id, user_id, session_id, f, trace)
+        )
+        return jsonify({"status": "accepted"}), 200
 
     if "sticker" in message:
         sticker_info = message["sticker"]
         emoji = sticker_info.get("emoji", "")
         if emoji:
-            reply = asyncio.run(ask_agent_async(emoji, user_id=user_id, session_id=session_id))
-            send_message(chat_id, reply)
+            reply_to(chat_id, emoji, user_id, session_id)
             return jsonify({"status": "ok"}), 200
         return jsonify({"status": "ignored"}), 200
 
@@ -356,6 +695,40 @@ def telegram_webhook():
 def health():
     return jsonify({"ok": True})
 
+@app.get("/healthz")
+def healthz():
+    """Liveness: the process is up and serving."""
+    return jsonify({"ok": True})
+
+@app.get("/readyz")
+def readyz():
+    """Readiness: the agent stack is built and can take traffic."""
+    ready = _stack_ready.is_set()
+    body = {"ready": ready, "network": _network_ok}
+    if _warmup_error:
+        body["error"] = _warmup_error
+    return jsonify(body), (200 if ready else 503)
+
+def _collect_live_gauges():
+    for model, snap in model_router.snapshot().items():
+        BREAKER_OPEN.set(0 if snap["state"] == "closed" else 1, model=model)
+    for name, stats in (("answer", answer_cache.stats()),
+                        ("voice", {"hits": voice_pipeline.cache.hits, "misses": voice_pipeline.cache.misses})):
+        CACHE_EVENTS.set(stats["hits"], cache=name, result="hit")
+        CACHE_EVENTS.set(stats["misses"], cache=name, result="miss")
+    SEND_QUEUE.set(telegram.pending())
+    DUPLICATE_RATIO.set(update_dedup.stats()["duplicate_ratio"])
+
+BREAKER_OPEN = metrics.REGISTRY.gauge("chatbot_model_breaker_open", "1 if the model's circuit breaker is not closed.", ("model",))
+CACHE_EVENTS = metrics.REGISTRY.gauge("chatbot_cache_lookups", "Cache lookups by outcome since start.", ("cache", "result"))
+SEND_QUEUE = metrics.REGISTRY.gauge("chatbot_send_queue_depth", "Outbound Telegram messages waiting to be sent.")
+DUPLICATE_RATIO = metrics.REGISTRY.gauge("chatbot_duplicate_update_ratio", "Share of received updates that were duplicates.")
+metrics.REGISTRY.add_collector(_collect_live_gauges)
+
+@app.get("/metrics")
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
 @app.get("/install_webhook")
 def install_webhook():
     try:
@@ -365,16 +738,48 @@ def install_webhook():
         logging.exception("Failed to set webhook")
         return jsonify({"ok": False, "error": str(e)}), 500
 
+_network_ok = None      # result of the last sanity_check (None = not run yet)
+_warmup_error = None
+_warmup_started = threading.Event()
+
 def sanity_check():
     """Optional: quick outbound check so failures are obvious at startup."""
+    global _network_ok
     try:
-        requests.get("https://api.groq.com", timeout=10)
-        requests.get("https://api.telegram.org", timeout=10)
+        telegram_session.get(GROQ_BASE_URL or "https://api.groq.com", timeout=10)
+        telegram_session.get(TELEGRAM_API_BASE, timeout=10)
+        _network_ok = True
         logging.info("Network sanity check passed.")
     except Exception as e:
+        _network_ok = False
         logging.error("Network sanity check failed: %s", e)
 
-if __name__ == "__main__":
+def warm_up():
+    """Build the agent stack and check the network without blocking the server."""
+    global _warmup_error
+    try:
+        ensure_agent_stack()
+    except Exception as e:
+        _warmup_error = f"{type(e).__name__}: {e}"
+        logging.exception("Agent stack warm-up failed")
     sanity_check()
+
+def start_warm_up():
+    if not _warmup_started.is_set():
+        _warmup_started.set()
+        threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+
+# Under a WSGI server (gunicorn etc.) there is no __main__: warm up on the
+# first request, which only happens once the worker is listening.
+@app.before_request
+def _warm_up_on_first_request():
+    start_warm_up()
+
+if os.getenv("CHATBOT_EAGER_INIT", "0") == "1":
+    ensure_agent_stack()
+
+if __name__ == "__main__":
+    # Warm up in the background while the server binds and starts listening.
+    start_warm_up()
     # IMPORTANT: single process, no reloader; InMemorySessionService lives in-process
     app.run(host="0.0.0.0", port=8000, debug=False, use_reloader=False)
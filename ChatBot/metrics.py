@@ -0,0 +1,244 @@
+"""
+metrics.py
+
+Minimal Prometheus-compatible metrics and per-update tracing for the bot
+(no client library needed; `render()` emits the text exposition format).
+
+Tracing:
+    trace = start_trace(update_id)        # bind a trace to the current context
+    with span("llm", model="groq/..."):   # time a stage; recorded in the
+        ...                               # chatbot_stage_seconds histogram
+    trace.release()                       # logged as JSON when the last holder releases
+
+Work handed to other threads keeps its trace by running under
+`contextvars.copy_context()` or by calling `trace.hold()` + `use_trace()`.
+"""
+
+import contextvars
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _fmt_labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = []
+    for n, v in zip(names, values):
+        v = str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{n}="{v}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def _fmt_value(v) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, v in items:
+            yield f"{self.name}{_fmt_labels(self.labelnames, key)} {_fmt_value(v)}"
+
+
+class Gauge(Counter):
+    def set(self, value: float, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def render(self):
+        lines = list(super().render())
+        lines[1] = f"# TYPE {self.name} gauge"
+        yield from lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series = {}  # key -> [bucket_counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((k, (list(s[0]), s[1], s[2])) for k, s in self._series.items())
+        for key, (counts, total, count) in items:
+            for bound, c in zip(self.buckets, counts):
+                names = self.labelnames + ("le",)
+                values = key + (_fmt_value(bound),)
+                yield f"{self.name}_bucket{_fmt_labels(names, values)} {c}"
+            yield f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {_fmt_value(total)}"
+            yield f"{self.name}_count{_fmt_labels(self.labelnames, key)} {count}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs) -> Counter:
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs) -> Gauge:
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        return self.register(Histogram(*args, **kwargs))
+
+    def add_collector(self, fn):
+        """`fn()` is called before each render, e.g. to refresh gauges from live state."""
+        self._collectors.append(fn)
+
+    def render(self) -> str:
+        for fn in self._collectors:
+            try:
+                fn()
+            except Exception:
+                logging.exception("Metrics collector failed")
+        lines = []
+        for m in self._metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "chatbot_stage_seconds", "Time spent per processing stage.", ("stage", "model")
+)
+UPDATES = REGISTRY.counter("chatbot_updates_total", "Telegram updates received.", ("kind",))
+RETRIES = REGISTRY.counter("chatbot_retries_total", "Model attempts that were retried.", ("model", "reason"))
+FALLBACKS = REGISTRY.counter("chatbot_fallbacks_total", "Requests routed away from their first model.", ("model",))
+ERRORS = REGISTRY.counter("chatbot_errors_total", "Errors per stage.", ("stage",))
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+# ----------------------------
+# Per-update tracing
+# ----------------------------
+TRACE_LOGS = False  # set by the app (TRACE_UPDATES=1) to log one JSON line per update
+
+_current = contextvars.ContextVar("chatbot_trace", default=None)
+
+
+class Trace:
+    def __init__(self, update_id=None):
+        self.update_id = update_id
+        self.started = time.monotonic()
+        self.spans = []
+        self._holders = 1
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float, **attrs):
+        with self._lock:
+            self.spans.append({
+                "stage": stage,
+                "start_ms": round((time.monotonic() - self.started - seconds) * 1000, 1),
+                "ms": round(seconds * 1000, 1),
+                **attrs,
+            })
+
+    def hold(self):
+        with self._lock:
+            self._holders += 1
+        return self
+
+    def release(self):
+        with self._lock:
+            self._holders -= 1
+            done = self._holders == 0
+        if done and TRACE_LOGS:
+            logging.info("[Trace] %s", json.dumps({
+                "update_id": self.update_id,
+                "total_ms": round((time.monotonic() - self.started) * 1000, 1),
+                "spans": self.spans,
+            }, default=str))
+
+
+def start_trace(update_id=None) -> Trace:
+    trace = Trace(update_id)
+    _current.set(trace)
+    return trace
+
+
+def current_trace():
+    return _current.get()
+
+
+@contextmanager
+def use_trace(trace):
+    token = _current.set(trace)
+    try:
+        yield trace
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(stage: str, **attrs):
+    """Time a stage into chatbot_stage_seconds and the current trace (if any)."""
+    started = time.monotonic()
+    error = None
+    try:
+        yield
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        seconds = time.monotonic() - started
+        STAGE_SECONDS.observe(seconds, stage=stage, model=attrs.get("model", ""))
+        trace = _current.get()
+        if trace is not None:
+            if error:
+                attrs = {**attrs, "error": error}
+            trace.add(stage, seconds, **attrs)
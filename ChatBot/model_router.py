@@ -0,0 +1,237 @@
+"""
+model_router.py
+
+Per-model health tracking and routing for the Groq models used by main.py.
+
+Each model gets its own circuit breaker:
+- CLOSED    -> traffic flows; failures are counted over a sliding window
+- OPEN      -> model is skipped until its cooldown expires
+- HALF_OPEN -> a single probe request is let through; success closes the
+               breaker, failure re-opens it with a longer cooldown
+
+The router never mutates agent state. Callers ask it which model to use for
+*this* request and report the outcome back, so concurrent chats can be routed
+to different models and traffic returns to the primary once it recovers.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Error-rate circuit breaker over a sliding time window."""
+
+    def __init__(
+        self,
+        failure_threshold: float = 0.5,
+        min_requests: int = 3,
+        window: float = 60.0,
+        cooldown: float = 30.0,
+        max_cooldown: float = 300.0,
+    ):
+        self.failure_threshold = failure_threshold
+        self.min_requests = min_requests
+        self.window = window
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+
+        self.state = CLOSED
+        self.cooldown = cooldown
+        self.opened_at = 0.0
+        self.probe_started_at = None
+        self._outcomes = deque()  # (timestamp, ok)
+
+    def _trim(self, now: float):
+        while self._outcomes and now - self._outcomes[0][0] > self.window:
+            self._outcomes.popleft()
+
+    def error_rate(self, now: float = None) -> float:
+        now = now or time.monotonic()
+        self._trim(now)
+        if not self._outcomes:
+            return 0.0
+        failures = sum(1 for _, ok in self._outcomes if not ok)
+        return failures / len(self._outcomes)
+
+    def allows(self, now: float) -> bool:
+        """True if a request may be sent now (without claiming a probe slot)."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return now - self.opened_at >= self.cooldown
+        # HALF_OPEN: one probe at a time; a probe that never reports back
+        # (e.g. the caller crashed) frees its slot after one cooldown period.
+        return self.probe_started_at is None or now - self.probe_started_at >= self.cooldown
+
+    def claim(self, now: float):
+        """Mark a request as sent; moves OPEN -> HALF_OPEN once cooled down."""
+        if self.state == OPEN:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            self.probe_started_at = now
+
+    def record(self, ok: bool, now: float):
+        self._outcomes.append((now, ok))
+        self._trim(now)
+
+        if self.state == HALF_OPEN:
+            self.probe_started_at = None
+            if ok:
+                self.state = CLOSED
+                self.cooldown = self.base_cooldown
+                self._outcomes.clear()
+            else:
+                self._open(now, backoff=True)
+            return
+
+        if self.state == CLOSED and not ok:
+            if len(self._outcomes) >= self.min_requests and self.error_rate(now) >= self.failure_threshold:
+                self._open(now, backoff=False)
+
+    def _open(self, now: float, backoff: bool):
+        if backoff:
+            self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+        self.state = OPEN
+        self.opened_at = now
+
+
+class ModelStats:
+    """Latency (EWMA) and call counters for one model."""
+
+    def __init__(self, alpha: float = 0.3):
+        self.alpha = alpha
+        self.ewma_latency = None
+        self.successes = 0
+        self.failures = 0
+
+    def observe(self, latency: float):
+        if self.ewma_latency is None:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency = self.alpha * latency + (1 - self.alpha) * self.ewma_latency
+
+
+class ModelRouter:
+    """
+    Chooses a model per request.
+
+    Order of preference:
+    1. the primary model, if its breaker allows traffic and it is not slower
+       than `slow_latency` seconds on average
+    2. the remaining allowed models, fastest (EWMA latency) first
+    3. a slow primary, as a last resort among allowed models
+    """
+
+    def __init__(self, primary: str, fallbacks, slow_latency: float = 20.0, **breaker_kwargs):
+        self.primary = primary
+        # De-duplicate while keeping order (fallback lists may repeat the primary).
+        self.models = list(dict.fromkeys([primary, *fallbacks]))
+        self.slow_latency = slow_latency
+        self._breakers = {m: CircuitBreaker(**breaker_kwargs) for m in self.models}
+        self._stats = {m: ModelStats() for m in self.models}
+        self._lock = threading.Lock()
+
+    def _ordered(self, now: float):
+        allowed = [m for m in self.models if self._breakers[m].allows(now)]
+        primary_ok = self.primary in allowed
+        primary_latency = self._stats[self.primary].ewma_latency
+        primary_slow = primary_latency is not None and primary_latency > self.slow_latency
+
+        others = sorted(
+            (m for m in allowed if m != self.primary),
+            key=lambda m: (self._stats[m].ewma_latency is None, self._stats[m].ewma_latency or 0.0),
+        )
+        if not primary_ok:
+            return others
+        if primary_slow and others:
+            return others + [self.primary]
+        return [self.primary] + others
+
+    def pick(self, exclude=(), delay_of=None):
+        """
+        Return the model to use for the next attempt, or None if every
+        breaker is open. Models in `exclude` (already tried by this request)
+        are only reused when nothing else is available.
+
+        `delay_of(model) -> seconds` lets the caller account for rate-limit
+        budgets: a model usable right now beats one that would have to wait,
+        and among waiting models the shortest wait wins.
+        """
+        with self._lock:
+            now = time.monotonic()
+            ordered = self._ordered(now)
+            if not ordered:
+                return None
+            fresh = [m for m in ordered if m not in exclude]
+            candidates = fresh or ordered
+            if delay_of is not None:
+                # sorted() is stable, so health/latency order breaks ties.
+                candidates = sorted(candidates, key=lambda m: max(0.0, delay_of(m)))
+            model = candidates[0]
+            self._breakers[model].claim(now)
+            return model
+
+    def pick_would_repeat(self, exclude) -> bool:
+        """True if no model outside `exclude` currently accepts traffic."""
+        with self._lock:
+            return not [m for m in self._ordered(time.monotonic()) if m not in exclude]
+
+    def release(self, model: str):
+        """Free a half-open probe slot without judging the model (e.g. on a 429)."""
+        with self._lock:
+            self._breakers[model].probe_started_at = None
+
+    def record_success(self, model: str, latency: float):
+        with self._lock:
+            breaker = self._breakers[model]
+            was = breaker.state
+            breaker.record(True, time.monotonic())
+            self._stats[model].observe(latency)
+            self._stats[model].successes += 1
+        if was != CLOSED:
+            logging.info("[Model Router] %s recovered (breaker closed)", model)
+
+    def record_failure(self, model: str, latency: float = None):
+        with self._lock:
+            breaker = self._breakers[model]
+            was = breaker.state
+            breaker.record(False, time.monotonic())
+            if latency is not None:
+                self._stats[model].observe(latency)
+            self._stats[model].failures += 1
+            now_state = breaker.state
+            cooldown = breaker.cooldown
+        if now_state == OPEN and was != OPEN:
+            logging.warning("[Model Router] %s breaker opened for %.0fs", model, cooldown)
+
+    def seconds_until_available(self) -> float:
+        """Shortest wait until some model accepts traffic again (0 if one does now)."""
+        with self._lock:
+            now = time.monotonic()
+            waits = []
+            for b in self._breakers.values():
+                if b.allows(now):
+                    return 0.0
+                start = b.opened_at if b.state == OPEN else (b.probe_started_at or now)
+                waits.append(max(0.0, b.cooldown - (now - start)))
+            return min(waits) if waits else 0.0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            return {
+                m: {
+                    "state": self._breakers[m].state,
+                    "error_rate": round(self._breakers[m].error_rate(now), 3),
+                    "ewma_latency": self._stats[m].ewma_latency,
+                    "successes": self._stats[m].successes,
+                    "failures": self._stats[m].failures,
+                }
+                for m in self.models
+            }
@@ -0,0 +1,181 @@
+"""
+portfolio_sources.py
+
+Where the Portfolio.py tools read their data from, selected by
+PORTFOLIO_SOURCE:
+
+- "http" (default): GET {PORTFOLIO_BASE_URL}/api/<endpoint>/
+- "django": the backend's own API view code (ORM + DRF serializers) imported
+  into this process; for a bot running next to the backend
+- "sqlite": read-only SQLite connection to the backend database, rows shaped
+  like the API serializers; no Django needed
+
+All sources return the same payload as the HTTP API for the same tenant
+(image URLs are made absolute against PORTFOLIO_BASE_URL), so the tools'
+{"status", "report"} output does not depend on the source.
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, urlsplit
+
+import requests
+
+ENDPOINTS = ("home", "about", "skilled", "skills", "work")
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BACKEND_DIR = os.path.join(os.path.dirname(_HERE), "backend")
+
+
+class HttpSource:
+    def __init__(self, base_url: str, timeout: float = 30, session: requests.Session = None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = session or requests.Session()
+
+    def fetch(self, endpoint: str):
+        path = f"/api/{endpoint}/" if endpoint else "/api/"
+        r = self.session.get(f"{self.base_url}{path}", timeout=self.timeout)
+        r.raise_for_status()
+        return r.json()
+
+
+class DjangoSource:
+    """
+    Runs the backend's API view serialization in-process. ORM calls go
+    through one dedicated thread: the tools may be called from inside an
+    asyncio loop, where Django refuses synchronous DB access.
+    """
+
+    def __init__(self, base_url: str, backend_dir: str = DEFAULT_BACKEND_DIR,
+                 settings_module: str = "portfolio_project.settings", tenant: str = "1"):
+        self.base_url = base_url.rstrip("/")
+        self.backend_dir = backend_dir
+        self.settings_module = settings_module
+        self.tenant_ref = tenant
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="portfolio-orm")
+        self._ready = False
+        self._lock = threading.Lock()
+
+    def _setup(self):
+        if self.backend_dir not in sys.path:
+            sys.path.insert(0, self.backend_dir)
+        os.environ.setdefault("DJANGO_SETTINGS_MODULE", self.settings_module)
+        import django
+        django.setup()
+
+        from django.test import RequestFactory
+        from portfolio import api_views
+        from portfolio.models import Tenant
+
+        self._views = {
+            "home": api_views.HomeView, "about": api_views.AboutView, "skilled": api_views.SkilledView,
+            "skills": api_views.SkillView, "work": api_views.WorkView,
+        }
+        lookup = {"pk": int(self.tenant_ref)} if self.tenant_ref.isdigit() else {"slug": self.tenant_ref}
+        self._tenant = Tenant.objects.get(**lookup)
+        url = urlsplit(self.base_url)
+        self._factory = RequestFactory()
+        self._request_kwargs = {"HTTP_HOST": url.netloc, "secure": url.scheme == "https"}
+        self._ready = True
+
+    def _fetch(self, endpoint: str):
+        if not self._ready:
+            self._setup()
+        request = self._factory.get(f"/api/{endpoint}/", **self._request_kwargs)
+        request.tenant = self._tenant
+        data, _keys = self._views[endpoint]().serialize(request)
+        return data
+
+    def fetch(self, endpoint: str):
+        if endpoint not in ENDPOINTS:
+            raise ValueError(f"unsupported endpoint {endpoint!r} for the django source")
+        return self._executor.submit(self._fetch, endpoint).result()
+
+
+class SqliteSource:
+    """Read-only queries against the backend's SQLite file."""
+
+    # endpoint -> (table, many, image column)
+    TABLES = {
+        "home": ("portfolio_home", False, "image"),
+        "about": ("portfolio_about", False, "profile_image"),
+        "skilled": ("portfolio_skilled", False, "profile_image"),
+        "skills": ("portfolio_skill", True, None),
+        "work": ("portfolio_work", True, "project_image"),
+    }
+    HIDDEN = {"tenant_id", "pending_image", "image_status"}
+    READ_ONLY = {"id"}
+
+    def __init__(self, base_url: str, db_path: str, tenant: str = "1"):
+        self.media_url = base_url.rstrip("/") + "/media/"
+        self.db_path = db_path
+        self.tenant_ref = tenant
+        self._local = threading.local()
+        self._tenant_id = None
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{quote(self.db_path)}?mode=ro", uri=True, timeout=5)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _tenant(self, conn) -> int:
+        if self._tenant_id is None:
+            column = "id" if self.tenant_ref.isdigit() else "slug"
+            row = conn.execute(f"SELECT id FROM portfolio_tenant WHERE {column} = ?", (self.tenant_ref,)).fetchone()
+            if row is None:
+                raise LookupError(f"unknown tenant {self.tenant_ref!r}")
+            self._tenant_id = row[0]
+        return self._tenant_id
+
+    def _shape(self, row, image_column):
+        data = {}
+        for key in row.keys():
+            if key in self.HIDDEN:
+                continue
+            value = row[key]
+            if key == image_column:
+                # Same quoting as Django's FileSystemStorage.url().
+                value = self.media_url + quote(value, safe="/~!*()'") if value else None
+            data[key] = value
+        return data
+
+    def _empty(self, conn, table, image_column):
+        # What the API serializer returns when there is no row: writable fields, blank.
+        columns = [c[1] for c in conn.execute(f"PRAGMA table_info({table})")]
+        return {c: "" for c in columns if c not in self.HIDDEN | self.READ_ONLY and c != image_column}
+
+    def fetch(self, endpoint: str):
+        if endpoint not in self.TABLES:
+            raise ValueError(f"unsupported endpoint {endpoint!r} for the sqlite source")
+        table, many, image_column = self.TABLES[endpoint]
+        conn = self._conn()
+        tenant_id = self._tenant(conn)
+        sql = f"SELECT * FROM {table} WHERE tenant_id = ? ORDER BY id"
+        if many:
+            return [self._shape(row, image_column) for row in conn.execute(sql, (tenant_id,))]
+        row = conn.execute(sql + " LIMIT 1", (tenant_id,)).fetchone()
+        return self._shape(row, image_column) if row is not None else self._empty(conn, table, image_column)
+
+
+def source_from_env():
+    kind = os.getenv("PORTFOLIO_SOURCE", "http").lower()
+    base_url = os.getenv("PORTFOLIO_BASE_URL", "https://drfapi.pythonanywhere.com").rstrip("/")
+    tenant = os.getenv("PORTFOLIO_TENANT", "1")
+    backend_dir = os.getenv("PORTFOLIO_BACKEND_DIR", DEFAULT_BACKEND_DIR)
+    if kind == "django":
+        return DjangoSource(
+            base_url, backend_dir,
+            os.getenv("PORTFOLIO_DJANGO_SETTINGS", "portfolio_project.settings"), tenant,
+        )
+    if kind == "sqlite":
+        return SqliteSource(base_url, os.getenv("PORTFOLIO_SQLITE_PATH", os.path.join(backend_dir, "db.sqlite3")), tenant)
+    if kind != "http":
+        raise ValueError(f"PORTFOLIO_SOURCE must be http, django or sqlite (got {kind!r})")
+    return HttpSource(base_url)
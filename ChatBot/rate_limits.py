@@ -0,0 +1,202 @@
+"""
+rate_limits.py
+
+Shared requests-per-minute / tokens-per-minute budget for each Groq model.
+
+Every Flask request runs its own asyncio loop (asyncio.run per update), so the
+tracker is guarded by a threading lock and works with *reservations*: a caller
+asks for a slot, gets back how long to wait before using it, and sleeps in its
+own loop. Reservations are granted in arrival order, which keeps queued
+requests flowing at the provider limit instead of bursting into 429s and then
+stalling on blind backoff.
+
+Provider hints ("Please try again in 7.5s", Retry-After and x-ratelimit-*
+headers) block a model until the hinted time.
+"""
+
+import re
+import threading
+import time
+from collections import deque
+
+WINDOW = 60.0
+# Longest a provider hint may block a model; a webhook must not hang for minutes.
+MAX_HOLD = 60.0
+
+RATE_LIMIT_PATTERN = re.compile(r"try again in ((?:[\d.]+(?:ms|h|m|s))+)", re.IGNORECASE)
+_DURATION_PART = re.compile(r"([\d.]+)(ms|h|m|s)", re.IGNORECASE)
+_UNIT_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value) -> float:
+    """Parse '7.5', '7.5s', '250ms' or Groq-style '2m59.56s' into seconds (None if unparseable)."""
+    if value is None:
+        return None
+    text = str(value).strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(text)
+    if not parts:
+        return None
+    return sum(float(num) * _UNIT_SECONDS[unit.lower()] for num, unit in parts)
+
+
+def retry_after_from_message(err_msg: str) -> float:
+    """Extract the 'try again in Xs' hint from a provider error message."""
+    m = RATE_LIMIT_PATTERN.search(err_msg or "")
+    return parse_duration(m.group(1)) if m else None
+
+
+def _headers_of(e: Exception):
+    """Best-effort access to HTTP response headers carried by LiteLLM/httpx errors."""
+    headers = getattr(e, "litellm_response_headers", None)
+    if headers:
+        return headers
+    response = getattr(e, "response", None)
+    return getattr(response, "headers", None)
+
+
+def retry_after_from_headers(headers) -> float:
+    if not headers:
+        return None
+    lowered = {str(k).lower(): v for k, v in dict(headers).items()}
+    hints = []
+    for name in ("retry-after", "retry-after-ms"):
+        if name in lowered:
+            seconds = parse_duration(lowered[name])
+            if seconds is not None:
+                hints.append(seconds / 1000.0 if name.endswith("-ms") else seconds)
+    # Groq only sends reset times that matter when the matching budget is exhausted.
+    for kind in ("requests", "tokens"):
+        remaining = lowered.get(f"x-ratelimit-remaining-{kind}")
+        reset = parse_duration(lowered.get(f"x-ratelimit-reset-{kind}"))
+        if reset is not None and remaining is not None and str(remaining).strip() in ("0", "0.0"):
+            hints.append(reset)
+    return max(hints) if hints else None
+
+
+def retry_after_from_error(e: Exception) -> float:
+    """Retry hint in seconds from an exception's headers or message, or None."""
+    from_headers = retry_after_from_headers(_headers_of(e))
+    if from_headers is not None:
+        return from_headers
+    return retry_after_from_message(str(e))
+
+
+class ModelBudget:
+    """Sliding-window RPM/TPM accounting for one model."""
+
+    def __init__(self, rpm: int, tpm: int):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.blocked_until = 0.0
+        self._entries = deque()  # [start_time, tokens]; mutable so usage can be settled
+
+    def _trim(self, now: float):
+        while self._entries and now - self._entries[0][0] > WINDOW:
+            self._entries.popleft()
+
+    def earliest_start(self, now: float, tokens: int) -> float:
+        """Earliest time >= now at which one more call with `tokens` fits the window."""
+        self._trim(now)
+        start = max(now, self.blocked_until)
+        entries = list(self._entries)
+        tokens = min(tokens, self.tpm) if self.tpm else tokens
+
+        while True:
+            live = [e for e in entries if start - e[0] < WINDOW]
+            used_requests = len(live)
+            used_tokens = sum(e[1] for e in live)
+            over_rpm = self.rpm and used_requests + 1 > self.rpm
+            over_tpm = self.tpm and used_tokens + tokens > self.tpm
+            if not (over_rpm or over_tpm):
+                return start
+            # Move to the moment the oldest live entry leaves the window.
+            start = live[0][0] + WINDOW
+
+    def reserve(self, now: float, tokens: int):
+        start = self.earliest_start(now, tokens)
+        entry = [start, tokens]
+        # Keep entries ordered by start time so trimming stays O(1) amortised.
+        if self._entries and self._entries[-1][0] > start:
+            items = sorted([*self._entries, entry], key=lambda e: e[0])
+            self._entries = deque(items)
+        else:
+            self._entries.append(entry)
+        return start, entry
+
+
+class RateBudgetTracker:
+    """Process-wide budget shared by every in-flight request."""
+
+    def __init__(self, limits: dict, default_rpm: int = 30, default_tpm: int = 6000):
+        self._limits = dict(limits)
+        self._default = (default_rpm, default_tpm)
+        self._budgets = {}
+        self._lock = threading.Lock()
+
+    def _budget(self, model: str) -> ModelBudget:
+        if model not in self._budgets:
+            rpm, tpm = self._limits.get(model, self._default)
+            self._budgets[model] = ModelBudget(rpm, tpm)
+        return self._budgets[model]
+
+    def delay(self, model: str, tokens: int) -> float:
+        """Seconds until `model` could take a call of `tokens` (no reservation made)."""
+        with self._lock:
+            now = time.monotonic()
+            return self._budget(model).earliest_start(now, tokens) - now
+
+    def reserve(self, model: str, tokens: int, max_delay: float = None):
+        """
+        Reserve one request and `tokens` tokens on `model`.
+        Returns (delay_seconds, reservation); sleep for the delay before calling.
+        If the delay would exceed `max_delay`, nothing is reserved and the
+        reservation is None.
+        """
+        with self._lock:
+            now = time.monotonic()
+            budget = self._budget(model)
+            if max_delay is not None:
+                delay = budget.earliest_start(now, tokens) - now
+                if delay > max_delay:
+                    return delay, None
+            start, entry = budget.reserve(now, tokens)
+            return start - now, entry
+
+    def settle(self, reservation, actual_tokens: int):
+        """Replace a reservation's estimate with the tokens the call really used."""
+        if reservation is None or actual_tokens is None:
+            return
+        with self._lock:
+            reservation[1] = actual_tokens
+
+    def block(self, model: str, seconds: float):
+        """Hold all new reservations on `model` for `seconds` (provider said so)."""
+        with self._lock:
+            budget = self._budget(model)
+            budget.blocked_until = max(budget.blocked_until, time.monotonic() + seconds)
+
+    def note_rate_limited(self, model: str, e: Exception, default: float = 5.0, max_hold: float = MAX_HOLD) -> float:
+        """Record a 429 for `model`; returns the hold applied in seconds (at most `max_hold`)."""
+        hint = retry_after_from_error(e)
+        seconds = min(hint if hint is not None else default, max_hold)
+        self.block(model, seconds)
+        return seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            out = {}
+            for model, b in self._budgets.items():
+                b._trim(now)
+                out[model] = {
+                    "rpm_limit": b.rpm,
+                    "tpm_limit": b.tpm,
+                    "requests_in_window": sum(1 for e in b._entries if e[0] <= now),
+                    "tokens_in_window": sum(e[1] for e in b._entries if e[0] <= now),
+                    "blocked_for": max(0.0, b.blocked_until - now),
+                }
+            return out
@@ -0,0 +1,359 @@
+"""
+telegram_sender.py
+
+Outbound Telegram queue over a pooled HTTP session.
+
+- replies longer than Telegram's 4096-character limit are split on paragraph,
+  line or word boundaries and sent as consecutive messages
+- a global send rate (default 30 msg/s) and per-chat spacing (1 msg/s in
+  private chats, 20 msg/min in groups) are enforced before hitting the API
+- HTTP 429 responses are honoured via `parameters.retry_after`; the message
+  is put back at the head of its chat queue so ordering is preserved
+- a small pool of sender threads does the I/O, so callers never block; each
+  chat is owned by at most one sender at a time, which keeps its messages
+  in order
+- consecutive edits of the same message are coalesced, so a streamed reply
+  (StreamingMessage) costs at most one edit per chat send interval
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import ERRORS, current_trace, span, use_trace
+
+TELEGRAM_MAX_MESSAGE_LEN = 4096
+
+
+def make_session(pool_size: int = 16) -> requests.Session:
+    """A keep-alive session sized for the sender pool plus other callers."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def split_message(text: str, limit: int = TELEGRAM_MAX_MESSAGE_LEN):
+    """Split `text` into chunks of at most `limit` characters, preferring natural breaks."""
+    text = text or ""
+    if len(text) <= limit:
+        return [text]
+    chunks = []
+    rest = text
+    while len(rest) > limit:
+        window = rest[:limit]
+        cut = -1
+        for sep in ("\n\n", "\n", " "):
+            cut = window.rfind(sep)
+            if cut > limit // 2:
+                break
+        if cut <= 0:
+            cut = limit
+        chunks.append(rest[:cut].rstrip())
+        rest = rest[cut:].lstrip()
+    if rest:
+        chunks.append(rest)
+    return [c for c in chunks if c]
+
+
+class _ChatQueue:
+    __slots__ = ("jobs", "next_at", "busy")
+
+    def __init__(self):
+        self.jobs = deque()
+        self.next_at = 0.0
+        self.busy = False
+
+
+class TelegramSender:
+    def __init__(
+        self,
+        bot_token: str,
+        session: requests.Session = None,
+        api_base: str = "https://api.telegram.org",
+        global_rate: float = 30.0,
+        private_interval: float = 1.0,
+        group_interval: float = 3.0,
+        workers: int = 4,
+        max_attempts: int = 5,
+    ):
+        self.base_url = f"{api_base.rstrip('/')}/bot{bot_token}"
+        self.session = session or make_session()
+        self.global_interval = 1.0 / global_rate
+        self.private_interval = private_interval
+        self.group_interval = group_interval
+        self.max_attempts = max_attempts
+
+        self._chats = {}
+        self._global_next = 0.0
+        self._cond = threading.Condition()
+        self._pending = 0
+        self._stopped = False
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"tg-send-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    # ----------------------------
+    # Public API
+    # ----------------------------
+    def _enqueue(self, chat_id, method: str, payload: dict, future: Future = None):
+        """Append one job (caller holds the lock)."""
+        if len(self._chats) > 1024:
+            self._prune()
+        q = self._chats.setdefault(chat_id, _ChatQueue())
+        trace = current_trace()
+        if trace is not None:
+            trace.hold()
+        q.jobs.append({"method": method, "payload": payload, "attempts": 0, "trace": trace, "future": future})
+        self._pending += 1
+        self._cond.notify_all()
+        return q
+
+    def send(self, chat_id: int, text: str, **extra):
+        """Queue `text` for `chat_id` (split if needed). Returns immediately."""
+        if not (text or "").strip():
+            return  # Telegram rejects empty messages
+        with self._cond:
+            for part in split_message(text):
+                self._enqueue(chat_id, "sendMessage", {"chat_id": chat_id, "text": part, **extra})
+
+    def send_async(self, chat_id: int, text: str, **extra) -> Future:
+        """Queue a single message; the Future resolves to its message_id (None on failure)."""
+        future = Future()
+        with self._cond:
+            payload = {"chat_id": chat_id, "text": text[:TELEGRAM_MAX_MESSAGE_LEN], **extra}
+            self._enqueue(chat_id, "sendMessage", payload, future)
+        return future
+
+    def edit(self, chat_id: int, message_id: int, text: str):
+        """Queue an edit; replaces a still-queued edit of the same message instead of adding one."""
+        text = text[:TELEGRAM_MAX_MESSAGE_LEN]
+        with self._cond:
+            q = self._chats.get(chat_id)
+            if q is not None and q.jobs:
+                last = q.jobs[-1]
+                if last["method"] == "editMessageText" and last["payload"]["message_id"] == message_id:
+                    last["payload"]["text"] = text
+                    return
+            self._enqueue(chat_id, "editMessageText",
+                          {"chat_id": chat_id, "message_id": message_id, "text": text})
+
+    def call(self, method: str, payload: dict, timeout: float = 20) -> dict:
+        """
+        Synchronous Bot API call on the pooled session, outside the queue.
+        Returns the decoded JSON (with "ok": False on HTTP errors).
+        """
+        r = self.session.post(f"{self.base_url}/{method}", json=payload, timeout=timeout)
+        try:
+            data = r.json()
+        except ValueError:
+            data = {"ok": False, "error_code": r.status_code, "description": r.text[:200]}
+        return data
+
+    def pending(self) -> int:
+        with self._cond:
+            return self._pending
+
+    def flush(self, timeout: float = None) -> bool:
+        """Block until every queued message was sent or dropped."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    # ----------------------------
+    # Worker
+    # ----------------------------
+    def _interval_for(self, chat_id) -> float:
+        # Negative ids are groups/channels, which have the stricter limit.
+        return self.group_interval if isinstance(chat_id, int) and chat_id < 0 else self.private_interval
+
+    def _prune(self):
+        """Forget idle chats whose spacing window has passed (caller holds the lock)."""
+        now = time.monotonic()
+        idle = [cid for cid, q in self._chats.items() if not q.jobs and not q.busy and q.next_at <= now]
+        for cid in idle:
+            del self._chats[cid]
+
+    def _next_job(self):
+        """Claim the next sendable job (caller holds the lock). Returns (chat_id, job) or wait time."""
+        now = time.monotonic()
+        best_id, best_at = None, None
+        for chat_id, q in self._chats.items():
+            if q.busy or not q.jobs:
+                continue
+            if best_at is None or q.next_at < best_at:
+                best_id, best_at = chat_id, q.next_at
+        if best_id is None:
+            return None, None
+        ready_at = max(best_at, self._global_next)
+        if ready_at > now:
+            return None, ready_at - now
+        q = self._chats[best_id]
+        q.busy = True
+        self._global_next = max(self._global_next, now) + self.global_interval
+        return (best_id, q.jobs.popleft()), None
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while True:
+                    if self._stopped:
+                        return
+                    claimed, wait = self._next_job()
+                    if claimed:
+                        break
+                    self._cond.wait(wait)
+            chat_id, job = claimed
+            retry_after, done = 0.0, True
+            try:
+                try:
+                    with use_trace(job["trace"]), span("send"):
+                        retry_after, done, result = self._deliver(job)
+                except Exception:
+                    # Drop the job rather than let the error end this worker
+                    # with the chat still claimed.
+                    logging.exception("[Telegram] Unexpected error sending %s", job["method"])
+                    ERRORS.inc(stage="send")
+                    retry_after, done, result = 0.0, True, None
+                if done:
+                    self._resolve(job, result)
+            except Exception:
+                logging.exception("[Telegram] Completing %s failed", job["method"])
+                ERRORS.inc(stage="send")
+            finally:
+                with self._cond:
+                    q = self._chats[chat_id]
+                    q.busy = False
+                    now = time.monotonic()
+                    if done:
+                        self._pending -= 1
+                        q.next_at = now + self._interval_for(chat_id)
+                    else:
+                        q.jobs.appendleft(job)
+                        q.next_at = now + retry_after
+                    self._cond.notify_all()
+
+    @staticmethod
+    def _resolve(job, result):
+        """Resolve the job's future and release its trace."""
+        future, trace = job["future"], job["trace"]
+        try:
+            if future is not None and not future.done():
+                future.set_result(result)
+        finally:
+            if trace is not None:
+                trace.release()
+
+    def _deliver(self, job):
+        """Send one job. Returns (retry_after_seconds, done, message_id or None)."""
+        job["attempts"] += 1
+        try:
+            r = self.session.post(f"{self.base_url}/{job['method']}", json=job["payload"], timeout=20)
+        except requests.RequestException:
+            if job["attempts"] >= self.max_attempts:
+                logging.exception("Failed to send message to Telegram after retries")
+                ERRORS.inc(stage="send")
+                return 0.0, True, None
+            return 2.0 * job["attempts"], False, None
+
+        if r.status_code == 429:
+            try:
+                retry_after = float(r.json().get("parameters", {}).get("retry_after", 1))
+            except ValueError:
+                retry_after = 1.0
+            logging.warning("[Telegram] 429 for chat %s; retrying in %.0fs",
+                            job["payload"].get("chat_id"), retry_after)
+            if job["attempts"] >= self.max_attempts * 2:
+                logging.error("[Telegram] Giving up on message after repeated 429s")
+                ERRORS.inc(stage="send")
+                return 0.0, True, None
+            return retry_after, False, None
+
+        if r.status_code >= 500 and job["attempts"] < self.max_attempts:
+            return 2.0 * job["attempts"], False, None
+
+        if not r.ok:
+            # Re-sending identical text in an edit is harmless; don't count it.
+            if job["method"] == "editMessageText" and "not modified" in r.text:
+                return 0.0, True, job["payload"].get("message_id")
+            logging.error("[Telegram] %s failed (%s): %s", job["method"], r.status_code, r.text[:200])
+            ERRORS.inc(stage="send")
+            return 0.0, True, None
+        try:
+            result = r.json().get("result")
+        except ValueError:
+            result = None
+        return 0.0, True, result.get("message_id") if isinstance(result, dict) else None
+
+
+class StreamingMessage:
+    """
+    A reply that is shown while it is being generated: a placeholder is sent
+    at once, `update()` pushes partial text through coalesced edits and
+    `finish()` writes the final text (sending any overflow past 4096
+    characters as follow-up messages).
+    """
+
+    def __init__(self, sender: TelegramSender, chat_id: int, placeholder: str = "…", min_delta: int = 20):
+        self.sender = sender
+        self.chat_id = chat_id
+        self.min_delta = min_delta
+        self._lock = threading.Lock()
+        self._message_id = None
+        self._shown = placeholder
+        self._latest = None
+        self._future = sender.send_async(chat_id, placeholder)
+        self._future.add_done_callback(self._placeholder_sent)
+
+    def _placeholder_sent(self, future: Future):
+        with self._lock:
+            self._message_id = future.result()
+            pending = self._latest
+        if pending is not None:
+            self.update(pending)
+
+    def update(self, text: str):
+        if not text:
+            return
+        with self._lock:
+            self._latest = text
+            if self._message_id is None:
+                return
+            # Skip tiny increments; the next chunk or finish() will carry them.
+            if abs(len(text) - len(self._shown)) < self.min_delta:
+                return
+            self._shown = text
+            message_id = self._message_id
+        self.sender.edit(self.chat_id, message_id, text + " …")
+
+    def finish(self, text: str, timeout: float = 30):
+        try:
+            message_id = self._future.result(timeout=timeout)
+        except Exception:
+            message_id = None
+        if message_id is None:
+            self.sender.send(self.chat_id, text)
+            return
+        parts = split_message(text)
+        self.sender.edit(self.chat_id, message_id, parts[0])
+        for part in parts[1:]:
+            self.sender.send(self.chat_id, part)
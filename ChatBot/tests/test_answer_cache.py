@@ -0,0 +1,67 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from answer_cache import AnswerCache, is_context_free, normalize_query
+
+
+class ContextFreeTests(unittest.TestCase):
+    def test_standalone_questions(self):
+        self.assertTrue(is_context_free("What are your skills?"))
+        self.assertTrue(is_context_free("Please show me the projects"))
+
+    def test_follow_ups_and_long_questions(self):
+        self.assertFalse(is_context_free("tell me more about it"))
+        self.assertFalse(is_context_free("and the second one?"))
+        self.assertFalse(is_context_free(""))
+        self.assertFalse(is_context_free("word " * 13))
+
+    def test_normalize_drops_case_punctuation_and_filler(self):
+        self.assertEqual(normalize_query("Hey, what are your SKILLS??"), "what are your skills")
+
+
+class AnswerCacheTests(unittest.TestCase):
+    def test_keys_follow_the_data_version(self):
+        version = ["v1"]
+        cache = AnswerCache(lambda: version[0], fingerprint_ttl=0)
+        key = cache.key_for("what are your skills")
+        cache.put(key, "Python")
+        self.assertEqual(cache.get(cache.key_for("What are your skills?")), "Python")
+        version[0] = "v2"
+        self.assertIsNone(cache.get(cache.key_for("what are your skills")))
+
+    def test_no_key_for_follow_ups_or_unknown_version(self):
+        self.assertIsNone(AnswerCache(lambda: "v1").key_for("tell me more about it"))
+        self.assertIsNone(AnswerCache(lambda: None).key_for("what are your skills"))
+
+    def test_lru_eviction(self):
+        cache = AnswerCache(lambda: "v1", max_entries=2)
+        for i in range(3):
+            cache.put((f"q{i}", "v1"), str(i))
+        self.assertIsNone(cache.get(("q0", "v1")))
+        self.assertEqual(cache.get(("q2", "v1")), "2")
+
+
+class AskAgentCachingTests(unittest.TestCase):
+    """Only answers produced without earlier turns may be shared between chats."""
+
+    def ask(self, has_history):
+        import main
+
+        cache = AnswerCache(lambda: "v1")
+        run = mock.AsyncMock(return_value=("My name is Ada", True))
+        with mock.patch.object(main, "answer_cache", cache), \
+                mock.patch.object(main, "run_agent_async", run), \
+                mock.patch.object(main, "_session_has_history", mock.AsyncMock(return_value=has_history)):
+            asyncio.run(main.ask_agent_async("what are your skills", "u1", "s1"))
+        return cache.get(cache.key_for("what are your skills"))
+
+    def test_fresh_session_answer_is_cached(self):
+        self.assertEqual(self.ask(has_history=False), "My name is Ada")
+
+    def test_answer_from_a_session_with_history_is_not_cached(self):
+        self.assertIsNone(self.ask(has_history=True))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,27 @@
+"""Smoke test: one eager and one lazy cold start, measured in fresh interpreters."""
+
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+CHATBOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class BenchStartupSmokeTests(unittest.TestCase):
+    def test_one_run_reports_both_modes(self):
+        out = subprocess.run([sys.executable, "bench_startup.py", "--runs", "1", "--json"],
+                             cwd=CHATBOT_DIR, capture_output=True, text=True, timeout=240)
+        self.assertEqual(out.returncode, 0, out.stderr[-2000:])
+        report = json.loads(out.stdout)
+        self.assertEqual(set(report), {"eager", "lazy"})
+        for mode in report.values():
+            self.assertLessEqual(mode["import"]["median_ms"], mode["live"]["median_ms"])
+            self.assertLessEqual(mode["live"]["median_ms"], mode["ready"]["median_ms"])
+        # The point of lazy init: the app can bind before the agent stack is built.
+        self.assertLess(report["lazy"]["live"]["median_ms"], report["lazy"]["ready"]["median_ms"])
+
+
+if __name__ == "__main__":
+    unittest.main()
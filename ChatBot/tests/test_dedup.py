@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+
+from dedup import UpdateDeduplicator
+
+
+class UpdateDeduplicatorTests(unittest.TestCase):
+    def test_second_delivery_is_a_duplicate(self):
+        d = UpdateDeduplicator()
+        self.assertFalse(d.is_duplicate(1))
+        self.assertTrue(d.is_duplicate(1))
+        self.assertFalse(d.is_duplicate(2))
+        self.assertEqual(d.stats()["duplicates"], 1)
+        self.assertAlmostEqual(d.stats()["duplicate_ratio"], 1 / 3)
+
+    def test_updates_without_id_are_never_duplicates(self):
+        d = UpdateDeduplicator()
+        self.assertFalse(d.is_duplicate(None))
+        self.assertFalse(d.is_duplicate(None))
+
+    def test_window_is_bounded(self):
+        d = UpdateDeduplicator(window=2)
+        for update_id in (1, 2, 3):
+            d.is_duplicate(update_id)
+        self.assertEqual(d.stats()["window"], 2)
+        self.assertFalse(d.is_duplicate(1))  # evicted
+
+    def test_forget_lets_a_redelivery_through(self):
+        d = UpdateDeduplicator()
+        d.is_duplicate(7)
+        d.forget(7)
+        self.assertFalse(d.is_duplicate(7))
+        self.assertTrue(d.is_duplicate(7))
+
+    def test_sqlite_store_is_shared_between_instances(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "seen.sqlite3")
+            a = UpdateDeduplicator(sqlite_path=path)
+            b = UpdateDeduplicator(sqlite_path=path)
+            self.assertFalse(a.is_duplicate(42))
+            self.assertTrue(b.is_duplicate(42))
+            a.forget(42)
+            self.assertFalse(UpdateDeduplicator(sqlite_path=path).is_duplicate(42))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+"""Smoke test: a tiny offline load test completes every update."""
+
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+CHATBOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class LoadTestSmokeTests(unittest.TestCase):
+    def test_small_run_completes_every_update(self):
+        # A subprocess: the harness imports main with its own env.
+        out = subprocess.run(
+            [sys.executable, "loadtest.py", "--users", "2", "--updates", "4", "--voice-ratio", "0.5",
+             "--llm-latency", "0", "--llm-jitter", "0", "--think-time", "0", "--timeout", "60", "--json"],
+            cwd=CHATBOT_DIR, capture_output=True, text=True, timeout=240,
+        )
+        self.assertEqual(out.returncode, 0, out.stderr[-2000:])
+        report = json.loads(out.stdout)
+        self.assertEqual((report["completed"], report["failed_or_timed_out"]), (4, 0))
+        self.assertEqual(report["bot"]["errors"], 0)
+        self.assertGreater(report["fake_llm"].get("completions", 0), 0)
+        self.assertGreaterEqual(report["fake_telegram_calls"].get("sendMessage", 0), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
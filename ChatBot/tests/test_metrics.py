@@ -0,0 +1,121 @@
+import contextvars
+import json
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+from metrics import Counter, Gauge, Histogram, Registry, current_trace, span, start_trace, use_trace
+
+
+class RenderTests(unittest.TestCase):
+    def test_counter_labels_are_escaped(self):
+        counter = Counter("demo_total", "Demo.", ("stage",))
+        counter.inc(stage='say "hi"\\now\nplease')
+        counter.inc(2, stage="plain")
+        self.assertEqual(list(counter.render()), [
+            "# HELP demo_total Demo.",
+            "# TYPE demo_total counter",
+            'demo_total{stage="plain"} 2',
+            'demo_total{stage="say \\"hi\\"\\\\now\\nplease"} 1',
+        ])
+
+    def test_gauge_type_and_unlabelled_series(self):
+        gauge = Gauge("demo_inflight", "In flight.")
+        gauge.set(1.5)
+        self.assertEqual(list(gauge.render())[1:], ["# TYPE demo_inflight gauge", "demo_inflight 1.5"])
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = Histogram("demo_seconds", "Latency.", ("model",), buckets=(1, 0.1))
+        for value in (0.05, 0.5, 5):
+            histogram.observe(value, model="m")
+        self.assertEqual(list(histogram.render())[2:], [
+            'demo_seconds_bucket{model="m",le="0.1"} 1',
+            'demo_seconds_bucket{model="m",le="1"} 2',
+            'demo_seconds_bucket{model="m",le="+Inf"} 3',
+            'demo_seconds_sum{model="m"} 5.55',
+            'demo_seconds_count{model="m"} 3',
+        ])
+
+    def test_registry_runs_collectors_and_survives_failures(self):
+        registry = Registry()
+        gauge = registry.gauge("demo_queue", "Queue length.")
+        registry.add_collector(lambda: gauge.set(7))
+        registry.add_collector(lambda: 1 / 0)
+        with self.assertLogs(level="ERROR"):
+            text = registry.render()
+        self.assertTrue(text.endswith("demo_queue 7\n"))
+
+
+class TraceTests(unittest.TestCase):
+    """Each test runs in a copied context, so traces never leak between tests."""
+
+    def test_spans_land_in_the_current_trace(self):
+        def run():
+            trace = start_trace(42)
+            with span("llm", model="m"):
+                pass
+            with self.assertRaises(ValueError), span("send"):
+                raise ValueError
+            return trace
+
+        trace = contextvars.copy_context().run(run)
+        self.assertEqual([s["stage"] for s in trace.spans], ["llm", "send"])
+        self.assertEqual(trace.spans[0]["model"], "m")
+        self.assertEqual(trace.spans[1]["error"], "ValueError")
+
+    def test_copied_context_carries_the_trace_to_a_worker(self):
+        def timed(stage):
+            with span(stage):
+                pass
+
+        def run():
+            trace = start_trace(1)
+            with ThreadPoolExecutor(1) as pool:
+                pool.submit(timed, "uncopied").result()
+                pool.submit(contextvars.copy_context().run, timed, "transcribe").result()
+            return trace
+
+        trace = contextvars.copy_context().run(run)
+        self.assertEqual([s["stage"] for s in trace.spans], ["transcribe"])
+
+    def test_use_trace_binds_a_held_trace_in_another_thread(self):
+        def run():
+            trace = start_trace(2).hold()
+            seen = []
+
+            def worker():
+                seen.append(current_trace())
+                with use_trace(trace), span("send"):
+                    seen.append(current_trace())
+                seen.append(current_trace())
+                trace.release()
+
+            thread = threading.Thread(target=worker)
+            thread.start()
+            thread.join()
+            return trace, seen
+
+        trace, seen = contextvars.copy_context().run(run)
+        self.assertEqual(seen, [None, trace, None])
+        self.assertEqual([s["stage"] for s in trace.spans], ["send"])
+        self.assertEqual(trace._holders, 1)
+
+    def test_trace_is_logged_once_the_last_holder_releases(self):
+        def run():
+            trace = start_trace(3).hold()
+            with span("llm"):
+                pass
+            return trace
+
+        trace = contextvars.copy_context().run(run)
+        with mock.patch("metrics.TRACE_LOGS", True), self.assertLogs(level="INFO") as logs:
+            trace.release()
+            trace.release()
+        [line] = logs.output
+        record = json.loads(line.split("[Trace] ", 1)[1])
+        self.assertEqual((record["update_id"], [s["stage"] for s in record["spans"]]), (3, ["llm"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
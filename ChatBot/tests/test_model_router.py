@@ -0,0 +1,123 @@
+import threading
+import time
+import unittest
+from unittest import mock
+
+from model_router import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, ModelRouter
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    def breaker(self):
+        return CircuitBreaker(failure_threshold=0.5, min_requests=3, window=60, cooldown=10, max_cooldown=40)
+
+    def test_stays_closed_below_min_requests(self):
+        b = self.breaker()
+        b.record(False, 0)
+        b.record(False, 1)
+        self.assertEqual(b.state, CLOSED)
+
+    def test_opens_at_error_threshold(self):
+        b = self.breaker()
+        b.record(True, 0)
+        b.record(False, 1)
+        b.record(False, 2)
+        self.assertEqual(b.state, OPEN)
+        self.assertFalse(b.allows(5))
+        self.assertTrue(b.allows(12))
+
+    def test_old_failures_leave_the_window(self):
+        b = self.breaker()
+        b.record(False, 0)
+        b.record(False, 1)
+        b.record(True, 100)
+        self.assertEqual(b.state, CLOSED)
+        self.assertEqual(b.error_rate(100), 0.0)
+
+    def open_breaker(self):
+        b = self.breaker()
+        for t in range(3):
+            b.record(False, t)
+        return b
+
+    def test_half_open_allows_a_single_probe(self):
+        b = self.open_breaker()
+        b.claim(20)
+        self.assertEqual(b.state, HALF_OPEN)
+        self.assertFalse(b.allows(21))
+        # A probe that never reports back frees its slot after a cooldown.
+        self.assertTrue(b.allows(30))
+
+    def test_probe_success_closes_and_resets_cooldown(self):
+        b = self.open_breaker()
+        b.claim(20)
+        b.record(True, 21)
+        self.assertEqual(b.state, CLOSED)
+        self.assertEqual(b.cooldown, 10)
+        self.assertEqual(b.error_rate(21), 0.0)
+
+    def test_probe_failure_reopens_with_backoff(self):
+        b = self.open_breaker()
+        for step in range(3):
+            now = 100 * (step + 1)
+            b.claim(now)
+            b.record(False, now + 1)
+            self.assertEqual(b.state, OPEN)
+        self.assertEqual(b.cooldown, 40)  # 20, 40, then capped
+
+
+class ModelRouterTests(unittest.TestCase):
+    def router(self):
+        return ModelRouter("primary", ["backup"], min_requests=1, failure_threshold=0.5, cooldown=0)
+
+    def test_prefers_primary_then_falls_back(self):
+        r = self.router()
+        self.assertEqual(r.pick(), "primary")
+        self.assertEqual(r.pick(exclude={"primary"}), "backup")
+
+    def test_release_frees_the_probe_slot(self):
+        r = ModelRouter("primary", ["backup"], min_requests=1, failure_threshold=0.5, cooldown=60)
+        r.record_failure("primary")
+        r._breakers["primary"].opened_at -= 60  # cooled down
+        self.assertEqual(r.pick(), "primary")  # claims the half-open probe
+        self.assertEqual(r.pick(), "backup")
+        r.release("primary")
+        self.assertEqual(r.pick(), "primary")
+
+    def test_none_when_every_breaker_is_open(self):
+        r = ModelRouter("primary", ["backup"], min_requests=1, failure_threshold=0.5, cooldown=60)
+        r.record_failure("primary")
+        r.record_failure("backup")
+        self.assertIsNone(r.pick())
+        self.assertGreater(r.seconds_until_available(), 0)
+
+
+class RunnerForTests(unittest.TestCase):
+    def test_concurrent_callers_share_one_runner_per_model(self):
+        import main
+
+        def slow_agent(model_name):
+            time.sleep(0.05)
+            return mock.Mock(name=model_name)
+
+        barrier = threading.Barrier(8)
+        results = []
+
+        def call():
+            barrier.wait()
+            results.append(main.runner_for("backup"))
+
+        with mock.patch.dict(main._runners, clear=True), \
+                mock.patch.object(main, "ensure_agent_stack"), \
+                mock.patch.object(main, "make_agent", side_effect=slow_agent) as make_agent, \
+                mock.patch("google.adk.runners.Runner", side_effect=lambda **kwargs: mock.Mock()):
+            threads = [threading.Thread(target=call) for _ in range(8)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        make_agent.assert_called_once_with("backup")
+        self.assertEqual(len({id(r) for r in results}), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
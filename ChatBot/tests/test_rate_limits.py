@@ -0,0 +1,114 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from model_router import ModelRouter
+from rate_limits import (
+    MAX_HOLD, WINDOW, ModelBudget, RateBudgetTracker, parse_duration, retry_after_from_message,
+)
+
+
+class ModelBudgetTests(unittest.TestCase):
+    def test_starts_now_while_under_budget(self):
+        b = ModelBudget(rpm=2, tpm=1000)
+        self.assertEqual(b.reserve(100.0, 100)[0], 100.0)
+        self.assertEqual(b.reserve(100.0, 100)[0], 100.0)
+
+    def test_rpm_pushes_start_to_when_oldest_leaves_window(self):
+        b = ModelBudget(rpm=2, tpm=0)
+        b.reserve(100.0, 1)
+        b.reserve(110.0, 1)
+        self.assertEqual(b.earliest_start(120.0, 1), 100.0 + WINDOW)
+
+    def test_tpm_counts_tokens(self):
+        b = ModelBudget(rpm=0, tpm=1000)
+        b.reserve(100.0, 600)
+        self.assertEqual(b.earliest_start(101.0, 300), 101.0)
+        self.assertEqual(b.earliest_start(101.0, 500), 100.0 + WINDOW)
+
+    def test_oversized_call_is_capped_to_the_whole_budget(self):
+        b = ModelBudget(rpm=0, tpm=1000)
+        self.assertEqual(b.earliest_start(100.0, 5000), 100.0)
+
+    def test_queued_reservations_are_granted_in_order(self):
+        b = ModelBudget(rpm=1, tpm=0)
+        first = b.reserve(100.0, 1)[0]
+        second = b.reserve(100.0, 1)[0]
+        third = b.reserve(100.0, 1)[0]
+        self.assertEqual((first, second, third), (100.0, 100.0 + WINDOW, 100.0 + 2 * WINDOW))
+
+    def test_settle_replaces_the_estimate(self):
+        b = ModelBudget(rpm=0, tpm=1000)
+        _, entry = b.reserve(100.0, 900)
+        self.assertEqual(b.earliest_start(100.0, 500), 100.0 + WINDOW)
+        tracker = RateBudgetTracker({})
+        tracker.settle(entry, 100)
+        self.assertEqual(b.earliest_start(100.0, 500), 100.0)
+
+    def test_blocked_until_delays_start(self):
+        b = ModelBudget(rpm=10, tpm=0)
+        b.blocked_until = 130.0
+        self.assertEqual(b.earliest_start(100.0, 1), 130.0)
+
+
+class RetryHintTests(unittest.TestCase):
+    def test_parse_duration(self):
+        self.assertEqual(parse_duration("7.5"), 7.5)
+        self.assertEqual(parse_duration("250ms"), 0.25)
+        self.assertAlmostEqual(parse_duration("2m59.5s"), 179.5)
+        self.assertIsNone(parse_duration("soon"))
+
+    def test_message_hint(self):
+        self.assertEqual(retry_after_from_message("Rate limit reached. Please try again in 7.5s."), 7.5)
+        self.assertIsNone(retry_after_from_message("boom"))
+
+
+class RateBudgetTrackerTests(unittest.TestCase):
+    def test_reserve_refuses_waits_over_max_delay(self):
+        tracker = RateBudgetTracker({"m": (1, 0)})
+        self.assertEqual(tracker.reserve("m", 1, max_delay=5)[0], 0.0)
+        delay, reservation = tracker.reserve("m", 1, max_delay=5)
+        self.assertIsNone(reservation)
+        self.assertGreater(delay, 5)
+        # Nothing was reserved, so the queue did not grow.
+        self.assertLessEqual(tracker.delay("m", 1), WINDOW)
+
+    def test_rate_limit_hold_is_capped(self):
+        tracker = RateBudgetTracker({})
+        error = Exception("Rate limit reached. Please try again in 2m59.5s.")
+        self.assertEqual(tracker.note_rate_limited("m", error), MAX_HOLD)
+        self.assertLessEqual(tracker.delay("m", 1), MAX_HOLD)
+        self.assertEqual(tracker.note_rate_limited("m", Exception("Please try again in 7s")), 7.0)
+
+
+class RunAgentBudgetTests(unittest.TestCase):
+    """A model whose budget is far away is skipped instead of slept on."""
+
+    def run_agent(self, budget_waits):
+        import main
+
+        tracker = RateBudgetTracker({})
+        for model, seconds in budget_waits.items():
+            tracker.block(model, seconds)
+        router = ModelRouter("primary", ["backup"])
+        runner = mock.Mock()
+        runner.run_async.side_effect = AssertionError("no model should be called")
+        with mock.patch.object(main, "rate_budget", tracker), \
+                mock.patch.object(main, "model_router", router), \
+                mock.patch.object(main, "ensure_session", mock.AsyncMock()), \
+                mock.patch.object(main, "types", mock.Mock()), \
+                mock.patch.object(main, "runner_for", return_value=runner) as runner_for, \
+                mock.patch("main.asyncio.sleep") as sleep:
+            result = asyncio.run(main.run_agent_async("hi", "u1", "s1"))
+        return result, runner_for, sleep
+
+    def test_busy_reply_when_every_model_is_too_far_out(self):
+        (text, answered), runner_for, sleep = self.run_agent({"primary": 120, "backup": 90})
+        self.assertFalse(answered)
+        self.assertIn("busy", text)
+        runner_for.assert_not_called()
+        sleep.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
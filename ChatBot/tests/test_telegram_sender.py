@@ -0,0 +1,225 @@
+import threading
+import time
+import unittest
+
+from metrics import ERRORS
+from telegram_sender import TELEGRAM_MAX_MESSAGE_LEN, StreamingMessage, TelegramSender, split_message
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, data=None, text=None):
+        self.status_code = status_code
+        self.ok = status_code < 400
+        self._data = data
+        self.text = text if text is not None else str(data)
+
+    def json(self):
+        if self._data is None:
+            raise ValueError("not JSON")
+        return self._data
+
+
+class FakeSession:
+    """Records each Bot API call; `respond(method, payload)` decides the response."""
+
+    def __init__(self, respond=None):
+        self.respond = respond or (lambda method, payload: None)
+        self.calls = []
+        self.sent_at = []
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def post(self, url, json=None, timeout=None):
+        method = url.rsplit("/", 1)[1]
+        with self._lock:
+            self.calls.append((method, dict(json)))
+            self.sent_at.append(time.monotonic())
+            self._next_id += 1
+            message_id = self._next_id
+        time.sleep(0.001)  # let the other workers interleave
+        response = self.respond(method, json)
+        return response or FakeResponse(200, {"ok": True, "result": {"message_id": message_id}})
+
+    def texts(self, chat_id):
+        with self._lock:
+            return [p["text"] for _, p in self.calls if p["chat_id"] == chat_id]
+
+
+class SplitMessageTests(unittest.TestCase):
+    def test_short_text_is_one_chunk(self):
+        self.assertEqual(split_message("hello"), ["hello"])
+        self.assertEqual(split_message(""), [""])
+        self.assertEqual(split_message(None), [""])
+
+    def test_exactly_the_limit_is_not_split(self):
+        text = "x" * TELEGRAM_MAX_MESSAGE_LEN
+        self.assertEqual(split_message(text), [text])
+
+    def test_prefers_paragraph_breaks(self):
+        text = "a" * 60 + "\n\n" + "b" * 30 + "\n" + "c" * 20
+        self.assertEqual(split_message(text, limit=100), ["a" * 60, "b" * 30 + "\n" + "c" * 20])
+
+    def test_falls_back_to_spaces_then_hard_cut(self):
+        words = " ".join(["word"] * 30)
+        chunks = split_message(words, limit=50)
+        self.assertTrue(all(len(c) <= 50 for c in chunks))
+        self.assertEqual(" ".join(chunks), words)
+
+        solid = "z" * 250
+        self.assertEqual(split_message(solid, limit=100), ["z" * 100, "z" * 100, "z" * 50])
+
+    def test_ignores_breaks_too_early_in_the_window(self):
+        # A newline in the first half would leave a tiny chunk; cut at the space instead.
+        text = "ab\n" + "c" * 60 + " " + "d" * 60
+        self.assertEqual(split_message(text, limit=100), ["ab\n" + "c" * 60, "d" * 60])
+
+
+class TelegramSenderTests(unittest.TestCase):
+    def sender(self, respond=None, **kwargs):
+        options = dict(global_rate=10000, private_interval=0, group_interval=0, workers=4)
+        options.update(kwargs)
+        session = FakeSession(respond)
+        sender = TelegramSender("token", session=session, **options)
+        self.addCleanup(sender.stop)
+        return sender, session
+
+    def test_each_chat_keeps_its_order(self):
+        sender, session = self.sender()
+        for i in range(20):
+            for chat_id in (1, 2, -3):
+                sender.send(chat_id, f"{chat_id}:{i}")
+        self.assertTrue(sender.flush(timeout=5))
+        for chat_id in (1, 2, -3):
+            self.assertEqual(session.texts(chat_id), [f"{chat_id}:{i}" for i in range(20)])
+        self.assertEqual(sender.pending(), 0)
+
+    def test_429_is_retried_after_the_hint_and_keeps_order(self):
+        def respond(method, payload):
+            if len(session.calls) == 1:
+                return FakeResponse(429, {"ok": False, "parameters": {"retry_after": 0.2}})
+            return None
+
+        sender, session = self.sender(respond)
+        sender.send(1, "first")
+        sender.send(1, "second")
+        self.assertTrue(sender.flush(timeout=5))
+        self.assertEqual(session.texts(1), ["first", "first", "second"])
+
+    def test_429_hint_delays_the_retry(self):
+        def respond(method, payload):
+            if len(session.calls) == 1:
+                return FakeResponse(429, {"ok": False, "parameters": {"retry_after": 0.3}})
+            return None
+
+        sender, session = self.sender(respond)
+        started = time.monotonic()
+        sender.send(1, "hello")
+        self.assertTrue(sender.flush(timeout=5))
+        self.assertGreaterEqual(time.monotonic() - started, 0.3)
+        self.assertEqual(session.texts(1), ["hello", "hello"])
+
+    def test_gives_up_after_repeated_429s(self):
+        errors = ERRORS.value(stage="send")
+        sender, session = self.sender(
+            lambda method, payload: FakeResponse(429, {"ok": False, "parameters": {"retry_after": 0}}),
+            max_attempts=2,
+        )
+        future = sender.send_async(1, "hello")
+        self.assertIsNone(future.result(timeout=5))
+        self.assertEqual(len(session.calls), 4)
+        self.assertTrue(sender.flush(timeout=5))
+        self.assertEqual(ERRORS.value(stage="send"), errors + 1)
+
+    def test_unexpected_errors_do_not_stall_the_chat(self):
+        def respond(method, payload):
+            if payload["text"] == "boom":
+                raise RuntimeError("bug")
+            return None
+
+        sender, session = self.sender(respond, workers=1)
+        future = sender.send_async(1, "boom")
+        with self.assertLogs(level="ERROR"):
+            self.assertIsNone(future.result(timeout=5))
+            sender.send(1, "after")
+            self.assertTrue(sender.flush(timeout=5))
+        self.assertEqual(session.texts(1), ["boom", "after"])
+
+    def test_failing_callbacks_do_not_stall_the_chat(self):
+        sender, session = self.sender(workers=1)
+        future = sender.send_async(1, "first")
+        future.add_done_callback(lambda f: 1 / 0)
+        sender.send(1, "second")
+        with self.assertLogs(level="ERROR"):
+            self.assertTrue(sender.flush(timeout=5))
+        self.assertEqual(session.texts(1), ["first", "second"])
+
+    def test_empty_text_is_not_sent(self):
+        sender, session = self.sender()
+        sender.send(1, "")
+        sender.send(1, "  \n")
+        sender.send(1, None)
+        self.assertEqual(sender.pending(), 0)
+        self.assertTrue(sender.flush(timeout=1))
+        self.assertEqual(session.calls, [])
+
+
+class StreamingMessageTests(unittest.TestCase):
+    def setUp(self):
+        self.session = FakeSession()
+        self.sender = TelegramSender("token", session=self.session, global_rate=10000,
+                                     private_interval=0.2, workers=2)
+        self.addCleanup(self.sender.stop)
+
+    def edits(self):
+        return [(p["text"], t) for (m, p), t in zip(self.session.calls, self.session.sent_at) if m == "editMessageText"]
+
+    def test_partial_updates_are_coalesced_into_spaced_edits(self):
+        stream = StreamingMessage(self.sender, 1, min_delta=5)
+        text = ""
+        for i in range(60):
+            text += f"word{i} "
+            stream.update(text)
+            time.sleep(0.01)
+        stream.finish(text.strip())
+        self.assertTrue(self.sender.flush(timeout=10))
+
+        edits = self.edits()
+        # One send per chat interval at most, instead of one per update.
+        self.assertLess(len(edits), 10)
+        gaps = [b - a for (_, a), (_, b) in zip(edits, edits[1:])]
+        self.assertTrue(all(gap >= 0.19 for gap in gaps), gaps)
+        self.assertTrue(all(t.endswith(" …") for t, _ in edits[:-1]))
+        self.assertEqual(edits[-1][0], text.strip())
+
+    def test_small_increments_wait_for_the_next_chunk_or_finish(self):
+        stream = StreamingMessage(self.sender, 1, min_delta=20)
+        stream._future.result(timeout=5)
+        stream.update("short")
+        stream.update("short and")
+        self.assertTrue(self.sender.flush(timeout=5))
+        self.assertEqual(self.edits(), [])
+        stream.finish("short and done")
+        self.assertTrue(self.sender.flush(timeout=5))
+        self.assertEqual([t for t, _ in self.edits()], ["short and done"])
+
+    def test_text_beyond_the_limit_overflows_into_new_messages(self):
+        stream = StreamingMessage(self.sender, 1)
+        text = "\n\n".join(["x" * 3000] * 3)
+        stream.finish(text)
+        self.assertTrue(self.sender.flush(timeout=10))
+        methods = [m for m, _ in self.session.calls]
+        self.assertEqual(methods, ["sendMessage", "editMessageText", "sendMessage", "sendMessage"])
+        self.assertEqual(self.session.texts(1)[1:], ["x" * 3000] * 3)
+
+    def test_falls_back_to_a_plain_send_without_a_placeholder(self):
+        self.session.respond = lambda method, payload: FakeResponse(400, {"ok": False}, text="Bad Request")
+        stream = StreamingMessage(self.sender, 1)
+        self.assertIsNone(stream._future.result(timeout=5))
+        self.session.respond = lambda method, payload: None
+        stream.finish("final answer")
+        self.assertTrue(self.sender.flush(timeout=5))
+        self.assertEqual(self.session.calls[-1], ("sendMessage", {"chat_id": 1, "text": "final answer"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+import threading
+import unittest
+
+from voice import TranscriptCache, VoiceDownloadError, VoicePipeline, VoiceTooLarge
+
+
+class FakeFileResponse:
+    def __init__(self, body: bytes, headers=None):
+        self.body = body
+        self.headers = headers or {}
+        self.read = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            self.read += chunk_size
+            yield self.body[i:i + chunk_size]
+
+
+class FakeJsonResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def json(self):
+        return self.data
+
+
+class FakeTelegram:
+    """getFile + file download, as seen through requests.Session.get."""
+
+    def __init__(self, body=b"ogg", file_size=None, headers=None, ok=True):
+        self.file = FakeFileResponse(body, headers)
+        self.file_size = len(body) if file_size is None else file_size
+        self.ok = ok
+        self.get_file_calls = 0
+
+    def get(self, url, params=None, stream=False, timeout=None):
+        if url.endswith("/getFile"):
+            self.get_file_calls += 1
+            if not self.ok:
+                return FakeJsonResponse({"ok": False, "description": "file is gone"})
+            return FakeJsonResponse({"ok": True, "result": {"file_path": "voice/1.ogg", "file_size": self.file_size}})
+        return self.file
+
+
+def voice(unique_id="u1", **extra):
+    return {"file_id": "f1", "file_unique_id": unique_id, **extra}
+
+
+class DownloadTests(unittest.TestCase):
+    def pipeline(self, telegram, max_bytes=100):
+        return VoicePipeline("token", transcribe=None, session=telegram, max_bytes=max_bytes, chunk_size=10)
+
+    def test_downloads_under_the_cap(self):
+        self.assertEqual(self.pipeline(FakeTelegram(b"x" * 100)).download("f1"), b"x" * 100)
+
+    def test_declared_size_is_refused_before_any_request(self):
+        telegram = FakeTelegram()
+        with self.assertRaises(VoiceTooLarge):
+            self.pipeline(telegram).download("f1", declared_size=101)
+        self.assertEqual(telegram.get_file_calls, 0)
+
+    def test_size_reported_by_get_file_or_content_length(self):
+        with self.assertRaises(VoiceTooLarge):
+            self.pipeline(FakeTelegram(file_size=500)).download("f1")
+        with self.assertRaises(VoiceTooLarge):
+            self.pipeline(FakeTelegram(b"x", file_size=0, headers={"Content-Length": "500"})).download("f1")
+
+    def test_stream_stops_once_past_the_cap(self):
+        telegram = FakeTelegram(b"x" * 1000, file_size=0)
+        with self.assertRaises(VoiceTooLarge):
+            self.pipeline(telegram).download("f1")
+        self.assertLessEqual(telegram.file.read, 110)
+
+    def test_get_file_errors(self):
+        with self.assertRaisesRegex(VoiceDownloadError, "file is gone"):
+            self.pipeline(FakeTelegram(ok=False)).download("f1")
+
+
+class TranscriptionTests(unittest.TestCase):
+    def pipeline(self, transcribe, **kwargs):
+        pipeline = VoicePipeline("token", transcribe=transcribe, session=FakeTelegram(), **kwargs)
+        self.addCleanup(pipeline._executor.shutdown)
+        return pipeline
+
+    def test_transcripts_are_cached_by_unique_id(self):
+        calls = []
+        pipeline = self.pipeline(lambda name, audio: calls.append(audio) or f"text {len(calls)}")
+        self.assertEqual(pipeline.submit(voice("u1")).result(timeout=5), "text 1")
+        cached = pipeline.submit(voice("u1"))
+        self.assertTrue(cached.done())
+        self.assertEqual(cached.result(), "text 1")
+        self.assertEqual(pipeline.submit(voice("u2")).result(timeout=5), "text 2")
+        self.assertEqual(len(calls), 2)
+
+    def test_failures_and_empty_transcripts_are_not_cached(self):
+        outcomes = [RuntimeError("whisper down"), "", "hello"]
+
+        def transcribe(name, audio):
+            outcome = outcomes.pop(0)
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        pipeline = self.pipeline(transcribe)
+        with self.assertRaises(RuntimeError):
+            pipeline.submit(voice()).result(timeout=5)
+        self.assertEqual(pipeline.submit(voice()).result(timeout=5), "")
+        self.assertEqual(pipeline.submit(voice()).result(timeout=5), "hello")
+        self.assertEqual(outcomes, [])
+
+    def test_identical_notes_in_flight_share_one_job(self):
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def transcribe(name, audio):
+            calls.append(audio)
+            started.set()
+            release.wait(5)
+            return "shared"
+
+        pipeline = self.pipeline(transcribe)
+        first = pipeline.submit(voice("u1"))
+        self.assertTrue(started.wait(5))
+        second = pipeline.submit(voice("u1"))
+        self.assertIs(first, second)
+        release.set()
+        self.assertEqual(second.result(timeout=5), "shared")
+        self.assertEqual(len(calls), 1)
+        first.result()
+        self.assertEqual(pipeline._inflight, {})
+
+    def test_notes_without_a_unique_id_are_not_shared(self):
+        pipeline = self.pipeline(lambda name, audio: "text")
+        a, b = pipeline.submit({"file_id": "f1"}), pipeline.submit({"file_id": "f1"})
+        self.assertIsNot(a, b)
+        self.assertEqual((a.result(timeout=5), b.result(timeout=5)), ("text", "text"))
+
+
+class TranscriptCacheTests(unittest.TestCase):
+    def test_lru_eviction_and_counters(self):
+        cache = TranscriptCache(max_entries=2)
+        cache.put("a", "1")
+        cache.put("b", "2")
+        self.assertEqual(cache.get("a"), "1")
+        cache.put("c", "3")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.get("a"), cache.get("c")), ("1", "3"))
+        self.assertEqual((cache.hits, cache.misses), (3, 1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+"""
+voice.py
+
+Voice-note pipeline for the Telegram bot:
+- getFile + streamed download with a hard size cap (no unbounded buffering)
+- transcription cache keyed by Telegram's file_unique_id, so forwarded or
+  re-sent notes are transcribed once
+- concurrent but bounded: downloads and Whisper calls run on a small worker
+  pool, off the webhook thread; identical notes in flight share one job
+"""
+
+import contextvars
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+
+from metrics import span
+
+
+class VoiceTooLarge(Exception):
+    """The voice note exceeds the configured download limit."""
+
+
+class VoiceDownloadError(Exception):
+    """Telegram could not give us the file."""
+
+
+class TranscriptCache:
+    """Thread-safe LRU of file_unique_id -> transcript."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: str, text: str):
+        with self._lock:
+            self._data[key] = text
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+
+class VoicePipeline:
+    def __init__(
+        self,
+        bot_token: str,
+        transcribe,
+        session: requests.Session = None,
+        api_base: str = "https://api.telegram.org",
+        max_bytes: int = 5 * 1024 * 1024,
+        max_workers: int = 4,
+        cache_size: int = 1024,
+        chunk_size: int = 64 * 1024,
+    ):
+        self.bot_token = bot_token
+        self.transcribe = transcribe  # (file_name, bytes) -> str
+        self.session = session or requests.Session()
+        self.api_base = api_base.rstrip("/")
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.cache = TranscriptCache(cache_size)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="voice")
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    # ----------------------------
+    # Download
+    # ----------------------------
+    def download(self, file_id: str, declared_size: int = None) -> bytes:
+        if declared_size and declared_size > self.max_bytes:
+            raise VoiceTooLarge(f"voice note is {declared_size} bytes (limit {self.max_bytes})")
+
+        info = self.session.get(
+            f"{self.api_base}/bot{self.bot_token}/getFile",
+            params={"file_id": file_id},
+            timeout=15,
+        ).json()
+        if not info.get("ok"):
+            raise VoiceDownloadError(info.get("description") or "getFile failed")
+
+        result = info["result"]
+        if (result.get("file_size") or 0) > self.max_bytes:
+            raise VoiceTooLarge(f"voice note is {result['file_size']} bytes (limit {self.max_bytes})")
+
+        file_url = f"{self.api_base}/file/bot{self.bot_token}/{result['file_path']}"
+        buf = bytearray()
+        with self.session.get(file_url, stream=True, timeout=30) as r:
+            r.raise_for_status()
+            length = r.headers.get("Content-Length")
+            if length and int(length) > self.max_bytes:
+                raise VoiceTooLarge(f"voice note is {length} bytes (limit {self.max_bytes})")
+            for chunk in r.iter_content(chunk_size=self.chunk_size):
+                buf.extend(chunk)
+                if len(buf) > self.max_bytes:
+                    raise VoiceTooLarge(f"voice note exceeds {self.max_bytes} bytes")
+        return bytes(buf)
+
+    # ----------------------------
+    # Download + transcribe (cached)
+    # ----------------------------
+    def _run(self, voice: dict) -> str:
+        key = voice.get("file_unique_id")
+        with span("download"):
+            audio = self.download(voice["file_id"], voice.get("file_size"))
+        with span("transcribe"):
+            text = self.transcribe("voice.ogg", audio)
+        if key and text:
+            self.cache.put(key, text)
+        return text
+
+    def _finish(self, key: str, future: Future):
+        with self._lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def submit(self, voice: dict) -> Future:
+        """
+        Schedule transcription of a Telegram `voice` object; returns a Future
+        resolving to the transcript. Cache hits resolve immediately.
+        """
+        key = voice.get("file_unique_id")
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                done = Future()
+                done.set_result(cached)
+                return done
+
+            with self._lock:
+                inflight = self._inflight.get(key)
+                # A finished job may not have left _inflight yet; never hand
+                # out its (possibly failed) result again.
+                if inflight is not None and not inflight.done():
+                    return inflight
+                # Run under the caller's context so spans land in its trace.
+                future = self._executor.submit(contextvars.copy_context().run, self._run, voice)
+                self._inflight[key] = future
+            future.add_done_callback(lambda f, k=key: self._finish(k, f))
+            return future
+
+        return self._executor.submit(contextvars.copy_context().run, self._run, voice)
@@ -1,9 +1,85 @@
-from django.contrib import admin
+from functools import partial
+
+from django import forms
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
 from .models import *
+from . import catalog, ingest, retention
+from .search import EstimatedCountPaginator, search_contacts
+
+class ImageIngestionAdmin(admin.ModelAdmin):
+    # Stash new uploads and optimize them in the background (see ingest.py)
+    # instead of storing the full-size file inside the request.
+    def save_model(self, request, obj, form, change):
+        field = obj.ingest_field
+        upload = form.cleaned_data.get(field) if field in form.changed_data else None
+        if upload:
+            previous = type(obj).objects.filter(pk=obj.pk).values_list(field, flat=True).first() if change else None
+            obj.pending_image.save(upload.name, upload, save=False)
+            setattr(obj, field, previous or None)
+            obj.image_status = obj.PROCESSING
+        super().save_model(request, obj, form, change)
+        if upload:
+            transaction.on_commit(partial(ingest.submit, type(obj), obj.pk))
+            self.message_user(request, "The new image is being processed; the previous one is shown until it is ready.", messages.INFO)
+
+class CatalogImportForm(forms.Form):
+    catalog = forms.FileField(help_text="CSV or JSON; see portfolio/catalog.py for the format. Images by http(s) URL.")
+    tenant = forms.ModelChoiceField(Tenant.objects.all(), initial=DEFAULT_TENANT_ID)
+    dry_run = forms.BooleanField(required=False, help_text="Only validate the rows.")
+
+class CatalogImportAdmin(admin.ModelAdmin):
+    # "Import catalog" button on the changelist: bulk upserts Work and Skill
+    # rows from an uploaded file (see catalog.py).
+    change_list_template = 'admin/portfolio/catalog_change_list.html'
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path('import/', self.admin_site.admin_view(self.import_catalog_view), name='%s_%s_import_catalog' % info),
+        ] + super().get_urls()
+
+    def import_catalog_view(self, request):
+        if not (self.has_add_permission(request) and self.has_change_permission(request)):
+            raise PermissionDenied
+        form = CatalogImportForm(request.POST or None, request.FILES or None)
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['catalog']
+            try:
+                entries = catalog.parse_catalog(upload.read(), upload.name)
+            except catalog.CatalogError as e:
+                form.add_error('catalog', str(e))
+            else:
+                dry_run = form.cleaned_data['dry_run']
+                result = catalog.import_catalog(entries, form.cleaned_data['tenant'], dry_run=dry_run)
+                prefix = "Dry run: " if dry_run else ""
+                self.message_user(request, f"{prefix}{result.summary()}.", messages.SUCCESS)
+                for label, message in result.errors[:20]:
+                    self.message_user(request, f"{label}: {message}", messages.WARNING)
+                if len(result.errors) > 20:
+                    self.message_user(request, f"... and {len(result.errors) - 20} more skipped row(s).", messages.WARNING)
+                return redirect(request.path if dry_run else 'admin:%s_%s_changelist' % (self.model._meta.app_label, self.model._meta.model_name))
+        context = dict(
+            self.admin_site.each_context(request),
+            opts=self.model._meta,
+            title="Import catalog",
+            form=form,
+        )
+        return TemplateResponse(request, 'admin/portfolio/catalog_import.html', context)
+
+@admin.register(Tenant)
+class TenantAdmin(admin.ModelAdmin):
+    list_display = ('name', 'slug', 'domain')
+    search_fields = ('name', 'slug', 'domain')
+    prepopulated_fields = {'slug': ('name',)}
 
 @admin.register(Home)
-class HomeAdmin(admin.ModelAdmin):
-    list_display = ('title', 'subtitle', 'email_address')
+class HomeAdmin(ImageIngestionAdmin):
+    list_display = ('title', 'subtitle', 'email_address', 'image_status')
     search_fields = ('title', 'subtitle')
     list_filter = ('title',)
     ordering = ('title',)
@@ -19,17 +95,51 @@ class SkilledAdmin(admin.ModelAdmin):
     search_fields = ('name', 'bio')
 
 @admin.register(Skill)
-class SkillAdmin(admin.ModelAdmin):
+class SkillAdmin(CatalogImportAdmin):
     list_display = ('skill_name', 'proficiency')
     list_filter = ('proficiency',)
     search_fields = ('skill_name',)
 
 @admin.register(Work)
-class WorkAdmin(admin.ModelAdmin):
-    list_display = ('project_name',)
+class WorkAdmin(CatalogImportAdmin, ImageIngestionAdmin):
+    list_display = ('project_name', 'image_status')
     search_fields = ('project_name',)
 
 @admin.register(Contact)
 class ContactAdmin(admin.ModelAdmin):
-    list_display = ('name', 'email')
+    list_display = ('name', 'email', 'created_at')
     search_fields = ('name', 'email', 'message')
+    # Large inboxes: no second COUNT(*) for "x of y", estimated page count.
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        results = search_contacts(queryset, search_term)
+        if results is None:
+            return super().get_search_results(request, queryset, search_term)
+        return results, False
+
+@admin.register(ContactArchive)
+class ContactArchiveAdmin(admin.ModelAdmin):
+    # Read-only view of messages moved out by retention.py.
+    list_display = ('name', 'email', 'created_at', 'archived_at')
+    fields = ('tenant', 'contact_id', 'name', 'email', 'message', 'created_at', 'archived_at')
+    readonly_fields = fields
+    search_fields = ('name', 'email')
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_search_results(self, request, queryset, search_term):
+        # Messages are compressed, so search scans the archive table.
+        if not search_term:
+            return queryset, False
+        hits = retention.search_archive(search_term, limit=1000, directory=None)
+        return queryset.filter(pk__in=[hit['id'] for hit in hits]), False
@@ -9,4 +9,5 @@ urlpatterns = [
     path('skills/', api_views.SkillView.as_view(), name='skills-api'),
     path('work/', api_views.WorkView.as_view(), name='work-api'),
     path('contact/', api_views.submit_contact, name='submit-contact'),
+    path('changes/', api_views.changes, name='changes-api'),
 ]
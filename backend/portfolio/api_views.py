@@ -2,6 +2,7 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.permissions import AllowAny
 from .models import Home, About, Skilled, Skill, Work, Contact
 from .serializers import HomeSerializer, AboutSerializer, SkilledSerializer, SkillSerializer, WorkSerializer
 from django.http import JsonResponse
@@ -9,36 +10,65 @@ from django.views.decorators.csrf import csrf_exempt
 from .views import send_telegram_message
 from django.shortcuts import render
 from django.urls import get_resolver
+from django.http import StreamingHttpResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from .changes import changes_since, changed
+from .tenancy import tenant_cached
+from .surrogate import keys_for, tag
+import json
+import time
 
-class HomeView(APIView):
-    def get(self, request):
-        home_content = Home.objects.first()
-        serializer = HomeSerializer(home_content, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+CHANGE_FEED_LIMIT = 500
+SSE_POLL_SECONDS = 5        # catches changes written by other processes
+SSE_HEARTBEAT_SECONDS = 15
+SSE_MAX_SECONDS = 300       # clients reconnect with Last-Event-ID
 
-class AboutView(APIView):
-    def get(self, request):
-        about_content = About.objects.first()
-        serializer = AboutSerializer(about_content, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+class TenantContentView(APIView):
+    # Serves the current tenant's rows, cached per tenant until its content changes.
+    # No authentication: reading the session would make SessionMiddleware add
+    # Vary: Cookie, and the proxy would then keep a copy per visitor.
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    model = None
+    serializer_class = None
+    many = False
 
-class SkilledView(APIView):
     def get(self, request):
-        skilled_content = Skilled.objects.first()
-        serializer = SkilledSerializer(skilled_content, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        data, keys = tenant_cached(request, self.model.__name__, lambda: self.serialize(request))
+        tag(request, keys)
+        return Response(data, status=status.HTTP_200_OK)
 
-class SkillView(APIView):
-    def get(self, request):
-        skills = Skill.objects.all()
-        serializer = SkillSerializer(skills, many=True, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+    def serialize(self, request):
+        rows = self.model.objects.filter(tenant=request.tenant)
+        if self.many:
+            rows = list(rows)
+            data = list(self.serializer_class(rows, many=True, context={'request': request}).data)
+        else:
+            rows = [rows.first()]
+            data = dict(self.serializer_class(rows[0], context={'request': request}).data)
+        return data, keys_for(request.tenant.pk, self.model, rows)
 
-class WorkView(APIView):
-    def get(self, request):
-        works = Work.objects.all()
-        serializer = WorkSerializer(works, many=True, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_200_OK)
+class HomeView(TenantContentView):
+    model = Home
+    serializer_class = HomeSerializer
+
+class AboutView(TenantContentView):
+    model = About
+    serializer_class = AboutSerializer
+
+class SkilledView(TenantContentView):
+    model = Skilled
+    serializer_class = SkilledSerializer
+
+class SkillView(TenantContentView):
+    model = Skill
+    serializer_class = SkillSerializer
+    many = True
+
+class WorkView(TenantContentView):
+    model = Work
+    serializer_class = WorkSerializer
+    many = True
 
 @csrf_exempt
 def submit_contact(request):
@@ -48,13 +78,49 @@ def submit_contact(request):
         message = request.POST.get('message')
 
         if name and email and message:
-            Contact.objects.create(name=name, email=email, message=message)
+            Contact.objects.create(tenant=request.tenant, name=name, email=email, message=message)
             send_telegram_message(name, email, message)
             return JsonResponse({"message": "Your message has been sent successfully!"}, status=200)
         else:
             return JsonResponse({"error": "Please fill in all the fields."}, status=400)
     return JsonResponse({"error": "Invalid request method."}, status=405)
 
+def changes(request):
+    # Plain view rather than an APIView: DRF content negotiation would reject
+    # Accept: text/event-stream before we get to stream.
+    try:
+        since = int(request.GET.get('since') or request.headers.get('Last-Event-ID') or 0)
+        limit = int(request.GET.get('limit') or CHANGE_FEED_LIMIT)
+    except ValueError:
+        return JsonResponse({"error": "since and limit must be integers."}, status=400)
+    limit = max(1, min(limit, CHANGE_FEED_LIMIT))
+
+    if request.GET.get('stream') or 'text/event-stream' in request.headers.get('Accept', ''):
+        response = StreamingHttpResponse(_change_events(request, since), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    rows, version, has_more = changes_since(request.tenant, since, limit, request)
+    return JsonResponse({"version": version, "has_more": has_more, "changes": rows})
+
+def _change_events(request, since):
+    version = since
+    started = last_sent = time.monotonic()
+    yield "retry: 3000\n\n"
+    while time.monotonic() - started < SSE_MAX_SECONDS:
+        rows, version, has_more = changes_since(request.tenant, version, CHANGE_FEED_LIMIT, request)
+        for row in rows:
+            yield f"id: {row['version']}\nevent: change\ndata: {json.dumps(row, cls=DjangoJSONEncoder)}\n\n"
+            last_sent = time.monotonic()
+        if has_more:
+            continue
+        if time.monotonic() - last_sent >= SSE_HEARTBEAT_SECONDS:
+            yield ": keep-alive\n\n"
+            last_sent = time.monotonic()
+        with changed:
+            changed.wait(timeout=SSE_POLL_SECONDS)
+
 def api_overview(request):
     api_routes = []
     for pattern in get_resolver().url_patterns:
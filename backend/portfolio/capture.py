@@ -0,0 +1,81 @@
+# capture.py
+# Opt-in, sampled traffic capture for `manage.py replay_traffic`.
+#
+# Enabled by setting TRAFFIC_CAPTURE_FILE (see settings.py). Each sampled
+# request becomes one JSON line in a size-rotated file:
+#   {"t": 1729330000.123, "ms": 4.2, "m": "GET", "p": "/api/home/", "s": 200,
+#    "h": {"Accept": "..."}, "size": 0, "sha1": null, "form": {"name": 8}}
+# Bodies are never stored: only their size and a short hash, plus the field
+# names and value lengths of small urlencoded or multipart forms so replays
+# can synthesize look-alike submissions. Cookie and Authorization headers are
+# never captured, and the response passes through unread (SSE streams too).
+import hashlib
+import json
+import logging
+import random
+import time
+from logging.handlers import RotatingFileHandler
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+CAPTURED_HEADERS = ('Accept', 'Content-Type', 'User-Agent', 'Last-Event-ID', 'Host', 'X-Requested-With')
+MAX_HASHED_BODY = 64 * 1024
+FORM_TYPES = ('application/x-www-form-urlencoded', 'multipart/form-data')
+
+logger = logging.getLogger('portfolio.capture')
+logger.propagate = False
+
+
+class TrafficCaptureMiddleware:
+    def __init__(self, get_response):
+        path = getattr(settings, 'TRAFFIC_CAPTURE_FILE', '')
+        if not path:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'TRAFFIC_CAPTURE_SAMPLE_RATE', 0.1)
+        if not logger.handlers:
+            handler = RotatingFileHandler(
+                path,
+                maxBytes=getattr(settings, 'TRAFFIC_CAPTURE_MAX_BYTES', 10 * 1024 * 1024),
+                backupCount=getattr(settings, 'TRAFFIC_CAPTURE_BACKUPS', 5),
+                delay=True,
+            )
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        record = {
+            't': round(time.time(), 3),
+            'm': request.method,
+            'p': request.get_full_path(),
+            'h': {name: request.headers[name][:200] for name in CAPTURED_HEADERS if name in request.headers},
+        }
+        record.update(self._body_summary(request))
+        if not record['size']:
+            record['h'].pop('Content-Type', None)  # WSGI default, not sent by the client
+
+        started = time.perf_counter()
+        response = self.get_response(request)
+        record['ms'] = round((time.perf_counter() - started) * 1000, 2)
+        record['s'] = response.status_code
+        logger.info(json.dumps(record, separators=(',', ':')))
+        return response
+
+    def _body_summary(self, request):
+        size = int(request.META.get('CONTENT_LENGTH') or 0)
+        summary = {'size': size, 'sha1': None}
+        # Large bodies (admin uploads) are left unread so the view can still
+        # stream them.
+        if not size or size > MAX_HASHED_BODY:
+            return summary
+        body = request.body
+        summary['sha1'] = hashlib.sha1(body).hexdigest()[:16]
+        if request.content_type in FORM_TYPES:
+            # Parsed from the body read above; file parts are not replayed.
+            summary['form'] = {key: len(value) for key, value in request.POST.items()}
+        return summary
@@ -0,0 +1,323 @@
+# catalog.py
+# Bulk import of Work and Skill rows from a CSV or JSON catalog, used by
+# `manage.py import_catalog` and the admin "Import catalog" page.
+#
+# Every row is validated first. Project images referenced by URL (or by path,
+# from the command) are then fetched and optimized by a bounded thread pool,
+# before anything is written, and stored through content-addressed storage,
+# so rows sharing an image store it once. Rows are upserted per tenant by name
+# (Work.project_name, Skill.skill_name) with bulk_create/bulk_update, one
+# transaction per batch. Bulk writes send no signals: each batch logs its
+# changes in one insert, and the caches are purged once per import.
+#
+# Accepted formats:
+#   JSON  {"work": [{...}, ...], "skills": [{...}, ...]}, or a list of rows
+#   CSV   a header row; project_name / skill_name columns tell the kind apart
+#
+# Image URLs come from whoever uploads the catalog, so they are fetched only
+# over http(s), only from hosts that resolve to public addresses (checked
+# again on every redirect), and never past IMAGE_MAX_BYTES.
+import csv
+import io
+import ipaddress
+import json
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+
+import requests
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models.fields.files import FieldFile
+
+from .changes import bulk_changes_committed, record_bulk_changes
+from .ingest import InvalidImage, process_image
+from .models import ChangeLog, Skill, Work
+
+BATCH_SIZE = getattr(settings, 'CATALOG_IMPORT_BATCH_SIZE', 500)
+WORKERS = getattr(settings, 'CATALOG_IMPORT_WORKERS', 8)
+IMAGE_TIMEOUT = getattr(settings, 'CATALOG_IMAGE_TIMEOUT', 15)
+IMAGE_MAX_BYTES = getattr(settings, 'CATALOG_IMAGE_MAX_BYTES', 20 * 1024 * 1024)
+IMAGE_MAX_REDIRECTS = 3
+
+KINDS = {'work': Work, 'skills': Skill}
+# model -> (key field, importable fields, image field)
+SPECS = {
+    Work: ('project_name', ('project_name', 'project_url'), 'project_image'),
+    Skill: ('skill_name', ('skill_name', 'proficiency'), None),
+}
+
+
+class CatalogError(Exception):
+    """The catalog as a whole cannot be read."""
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = {}  # model -> count
+        self.updated = {}
+        self.unchanged = 0
+        self.images = 0
+        self.errors = []   # (row label, message)
+
+    @property
+    def written(self):
+        return sum(self.created.values()) + sum(self.updated.values())
+
+    def summary(self):
+        parts = [f"{n} {model._meta.verbose_name_plural} created" for model, n in self.created.items() if n]
+        parts += [f"{n} {model._meta.verbose_name_plural} updated" for model, n in self.updated.items() if n]
+        parts.append(f"{self.unchanged} unchanged")
+        parts.append(f"{self.images} image(s) fetched")
+        if self.errors:
+            parts.append(f"{len(self.errors)} row(s) skipped")
+        return ', '.join(parts)
+
+
+# ----------------------------
+# Parsing and validation
+# ----------------------------
+def _kind_of(row):
+    if 'project_name' in row:
+        return Work
+    if 'skill_name' in row:
+        return Skill
+    return None
+
+
+def parse_catalog(data, filename=''):
+    """Return [(label, model or None, row dict)] from CSV or JSON bytes."""
+    try:
+        text = data.decode('utf-8-sig')
+    except UnicodeDecodeError as e:
+        raise CatalogError(f"The catalog is not UTF-8: {e}") from e
+
+    if filename.lower().endswith('.json') or text.lstrip()[:1] in ('[', '{'):
+        try:
+            payload = json.loads(text)
+        except ValueError as e:
+            raise CatalogError(f"Invalid JSON: {e}") from e
+        if isinstance(payload, dict):
+            unknown = set(payload) - set(KINDS)
+            if unknown:
+                raise CatalogError(f"Unknown section(s) {sorted(unknown)}; expected {sorted(KINDS)}.")
+            sections = [(name, KINDS[name], rows) for name, rows in payload.items()]
+        elif isinstance(payload, list):
+            sections = [('row', None, payload)]
+        else:
+            raise CatalogError("A JSON catalog is an object of sections or a list of rows.")
+        entries = []
+        for name, model, rows in sections:
+            if not isinstance(rows, list):
+                raise CatalogError(f"Section {name!r} must be a list of rows.")
+            for i, row in enumerate(rows, 1):
+                row = row if isinstance(row, dict) else {}
+                entries.append((f"{name} {i}", model or _kind_of(row), row))
+        return entries
+
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames:
+        raise CatalogError("The CSV catalog has no header row.")
+    return [(f"line {reader.line_num}", _kind_of(row), row) for row in reader]
+
+
+def _clean_row(model, row):
+    """(values, image reference) for a raw row; raises ValidationError."""
+    key_field, fields, image_field = SPECS[model]
+    values, errors = {}, []
+    for name in fields:
+        field = model._meta.get_field(name)
+        raw = row.get(name)
+        raw = '' if raw is None else str(raw).strip()
+        if raw == '' and field.null:
+            values[name] = None
+            continue
+        try:
+            values[name] = field.clean(raw, None)
+        except ValidationError as e:
+            errors.append(f"{name}: {' '.join(e.messages)}")
+    proficiency = values.get('proficiency')
+    if proficiency is not None and not 0 <= proficiency <= 100:
+        errors.append("proficiency: must be between 0 and 100.")
+    if errors:
+        raise ValidationError(errors)
+    image = str(row.get(image_field) or '').strip() if image_field else ''
+    return values, image
+
+
+# ----------------------------
+# Images
+# ----------------------------
+_local = threading.local()
+
+
+def _session():
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = _local.session = requests.Session()
+    return session
+
+
+def _check_url(url):
+    """Raise CatalogError unless `url` is http(s) to a host with only public addresses."""
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        raise CatalogError("only http(s) image URLs are accepted")
+    try:
+        infos = socket.getaddrinfo(parts.hostname, parts.port or 80, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError, ValueError) as e:
+        raise CatalogError(f"cannot resolve {parts.hostname}: {e}") from e
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split('%')[0])
+        if not address.is_global or address.is_multicast:
+            raise CatalogError(f"{parts.hostname} resolves to a non-public address")
+
+
+def _fetch_url(url):
+    for _ in range(IMAGE_MAX_REDIRECTS + 1):
+        _check_url(url)
+        with _session().get(url, timeout=IMAGE_TIMEOUT, stream=True, allow_redirects=False) as response:
+            if response.is_redirect:
+                url = urljoin(url, response.headers['Location'])
+                continue
+            response.raise_for_status()
+            if int(response.headers.get('Content-Length') or 0) > IMAGE_MAX_BYTES:
+                raise CatalogError(f"larger than {IMAGE_MAX_BYTES} bytes")
+            return response.raw.read(IMAGE_MAX_BYTES + 1, decode_content=True)
+    raise CatalogError(f"more than {IMAGE_MAX_REDIRECTS} redirects")
+
+
+def _read_image(ref, base_dir):
+    if ref.startswith(('http://', 'https://')):
+        data = _fetch_url(ref)
+    elif base_dir is None:
+        raise CatalogError("only http(s) image URLs are accepted here")
+    else:
+        path = os.path.join(base_dir, ref)
+        with open(path, 'rb') as f:
+            data = f.read(IMAGE_MAX_BYTES + 1)
+    if len(data) > IMAGE_MAX_BYTES:
+        raise CatalogError(f"larger than {IMAGE_MAX_BYTES} bytes")
+    return data
+
+
+def _store_image(ref, base_dir, storage):
+    data, ext = process_image(io.BytesIO(_read_image(ref, base_dir)))
+    # Content-addressed: the stored name depends only on the bytes. Blobs
+    # left behind by a failed import are collected by `dedupe_media`.
+    return storage.save(f'import{ext}', ContentFile(data))
+
+
+def fetch_images(refs, base_dir=None, workers=WORKERS):
+    """Fetch, optimize and store each reference once: ({ref: name}, {ref: error})."""
+    storage = Work._meta.get_field('project_image').storage
+    stored, failed = {}, {}
+    if not refs:
+        return stored, failed
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='catalog-image') as pool:
+        futures = {ref: pool.submit(_store_image, ref, base_dir, storage) for ref in refs}
+        for ref, future in futures.items():
+            try:
+                stored[ref] = future.result()
+            except (requests.RequestException, OSError, InvalidImage, CatalogError) as e:
+                failed[ref] = str(e) or type(e).__name__
+    return stored, failed
+
+
+# ----------------------------
+# Import
+# ----------------------------
+def _batches(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _current(value):
+    return (value.name or None) if isinstance(value, FieldFile) else value
+
+
+def import_catalog(entries, tenant, base_dir=None, batch_size=BATCH_SIZE, workers=WORKERS, dry_run=False):
+    """
+    Upsert parsed catalog `entries` (see parse_catalog) into `tenant`. Image
+    paths resolve against `base_dir`; without it only URLs are accepted.
+    Invalid rows are skipped and reported in the result.
+    """
+    result = ImportResult()
+    rows = {model: [] for model in SPECS}
+    seen = set()
+    for label, model, row in entries:
+        if model is None:
+            result.errors.append((label, "Neither project_name nor skill_name given."))
+            continue
+        try:
+            values, image = _clean_row(model, row)
+        except ValidationError as e:
+            result.errors.append((label, ' '.join(e.messages)))
+            continue
+        key = (model, values[SPECS[model][0]])
+        if key in seen:
+            result.errors.append((label, f"Duplicate {SPECS[model][0]} {key[1]!r} in this catalog."))
+            continue
+        seen.add(key)
+        rows[model].append((label, values, image))
+
+    refs = {image for model_rows in rows.values() for _, _, image in model_rows if image}
+    # A dry run validates rows only; images are neither fetched nor compared.
+    stored, failed = ({}, {}) if dry_run else fetch_images(refs, base_dir, workers)
+    result.images = len(stored)
+
+    touched = []
+    for model, model_rows in rows.items():
+        key_field, _, image_field = SPECS[model]
+        existing = {getattr(obj, key_field): obj for obj in model.objects.filter(tenant=tenant)}
+        creates, updates, fields = [], [], set()
+        for label, values, image in model_rows:
+            if image and not dry_run:
+                if image in failed:
+                    result.errors.append((label, f"Image {image!r}: {failed[image]}"))
+                    continue
+                values[image_field] = stored[image]
+                # Supersedes any admin upload still being ingested; the
+                # ingest job's swap only applies while its pending file is set.
+                values['pending_image'] = None
+                values['image_status'] = model.READY
+            obj = existing.get(values[key_field])
+            if obj is None:
+                creates.append(model(tenant=tenant, **values))
+                continue
+            diff = [name for name, value in values.items() if _current(getattr(obj, name)) != value]
+            if not diff:
+                result.unchanged += 1
+                continue
+            for name in diff:
+                setattr(obj, name, values[name])
+            fields.update(diff)
+            updates.append(obj)
+
+        result.created[model] = len(creates)
+        result.updated[model] = len(updates)
+        if dry_run or not (creates or updates):
+            continue
+        touched.append(model)
+        for batch in _batches(creates, batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+                if batch[0].pk is None:  # no RETURNING (SQLite < 3.35)
+                    pks = dict(model.objects.filter(
+                        tenant=tenant, **{f'{key_field}__in': [getattr(obj, key_field) for obj in batch]},
+                    ).values_list(key_field, 'pk'))
+                    for obj in batch:
+                        obj.pk = pks[getattr(obj, key_field)]
+                record_bulk_changes(model, tenant.pk, [obj.pk for obj in batch], ChangeLog.CREATED)
+        for batch in _batches(updates, batch_size):
+            with transaction.atomic():
+                model.objects.bulk_update(batch, sorted(fields))
+                record_bulk_changes(model, tenant.pk, [obj.pk for obj in batch], ChangeLog.UPDATED)
+
+    if touched:
+        transaction.on_commit(lambda: bulk_changes_committed(tenant.pk, touched))
+    return result
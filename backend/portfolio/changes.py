@@ -0,0 +1,129 @@
+# changes.py
+# Change log for portfolio content, fed by model signals. Each save/delete of
+# a tracked model appends a ChangeLog row whose id is the new version; the
+# /api/changes/ endpoint (api_views.changes) serves everything since a
+# client's last version; the latest version also keys the tenant's content
+# cache (tenancy.py). Committed changes purge the matching surrogate keys.
+import threading
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from .models import About, ChangeLog, Home, Skill, Skilled, Tenant, Work
+from .serializers import AboutSerializer, HomeSerializer, SkillSerializer, SkilledSerializer, WorkSerializer
+from .surrogate import collection_key, instance_key, purger
+
+# Feed name -> (model, serializer); the names match the /api/<name>/ endpoints.
+FEED_MODELS = {
+    'home': (Home, HomeSerializer),
+    'about': (About, AboutSerializer),
+    'skilled': (Skilled, SkilledSerializer),
+    'skills': (Skill, SkillSerializer),
+    'work': (Work, WorkSerializer),
+}
+_FEED_NAMES = {model: name for name, (model, _) in FEED_MODELS.items()}
+
+# Wakes streaming clients in this process as soon as a change commits;
+# changes made by other processes are picked up by their poll interval.
+changed = threading.Condition()
+
+
+def _committed(tenant_id, model, object_id):
+    purger.purge([collection_key(tenant_id, model), instance_key(tenant_id, model, object_id)])
+    with changed:
+        changed.notify_all()
+
+
+def record_change(model, object_id, action=ChangeLog.UPDATED, tenant_id=None):
+    """Log a change that bypassed save()/delete(), e.g. a queryset update()."""
+    if tenant_id is None:
+        tenant_id = model._default_manager.filter(pk=object_id).values_list('tenant_id', flat=True).first()
+        if tenant_id is None:
+            return
+    ChangeLog.objects.create(tenant_id=tenant_id, model=_FEED_NAMES[model], object_id=object_id, action=action)
+    transaction.on_commit(lambda: _committed(tenant_id, model, object_id))
+
+
+def record_bulk_changes(model, tenant_id, object_ids, action):
+    """
+    Log rows written by bulk_create()/bulk_update(), which send no signals.
+    Nothing is purged per row: call bulk_changes_committed() once afterwards.
+    """
+    name = _FEED_NAMES[model]
+    ChangeLog.objects.bulk_create([
+        ChangeLog(tenant_id=tenant_id, model=name, object_id=object_id, action=action) for object_id in object_ids
+    ])
+
+
+def bulk_changes_committed(tenant_id, models):
+    # Every tagged response carries its collection key, so purging the
+    # collections covers all of the rows' instance keys as well.
+    purger.purge([collection_key(tenant_id, model) for model in models])
+    with changed:
+        changed.notify_all()
+
+
+def changes_since(tenant, since, limit=500, request=None):
+    """
+    The tenant's changes after version `since`, collapsed to the latest action
+    per object, with the current serialized row for creates/updates. Returns
+    (changes, version, has_more); `version` is what the client sends next.
+    """
+    limit = max(1, limit)
+    entries = list(ChangeLog.objects.filter(tenant=tenant, pk__gt=since).order_by('pk')[:limit + 1])
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+    if not entries:
+        return [], since, False
+
+    latest = {}
+    created = set()
+    for entry in entries:
+        key = (entry.model, entry.object_id)
+        if entry.action == ChangeLog.CREATED:
+            created.add(key)
+        latest.pop(key, None)
+        latest[key] = entry
+
+    rows = {}
+    for name, (model, serializer) in FEED_MODELS.items():
+        ids = [object_id for (m, object_id), e in latest.items() if m == name and e.action != ChangeLog.DELETED]
+        if ids:
+            for obj in model.objects.filter(tenant=tenant, pk__in=ids):
+                rows[(name, obj.pk)] = serializer(obj, context={'request': request}).data
+
+    changes = []
+    for key, entry in latest.items():
+        data = rows.get(key)
+        # A row that vanished after this entry was written is reported as deleted.
+        if data is None:
+            action = ChangeLog.DELETED
+        elif key in created:
+            action = ChangeLog.CREATED
+        else:
+            action = entry.action
+        changes.append({
+            'version': entry.pk,
+            'model': entry.model,
+            'id': entry.object_id,
+            'action': action,
+            'data': data,
+        })
+    return changes, entries[-1].pk, has_more
+
+
+def _on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:  # loaddata
+        return
+    record_change(sender, instance.pk, ChangeLog.CREATED if created else ChangeLog.UPDATED, instance.tenant_id)
+
+
+def _on_delete(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, Tenant):  # the whole tenant is going away
+        return
+    record_change(sender, instance.pk, ChangeLog.DELETED, instance.tenant_id)
+
+
+for _model in _FEED_NAMES:
+    post_save.connect(_on_save, sender=_model, dispatch_uid=f'changelog-save-{_model.__name__}')
+    post_delete.connect(_on_delete, sender=_model, dispatch_uid=f'changelog-delete-{_model.__name__}')
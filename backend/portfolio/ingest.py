@@ -0,0 +1,101 @@
+# ingest.py
+# Background image ingestion: the admin stashes an upload in `pending_image`
+# and returns; a worker thread decodes it with Pillow, strips metadata, caps
+# the dimensions, re-encodes it and then swaps it into the model's image field
+# with a single conditional UPDATE. Until then the API keeps serving the
+# previous image. Jobs live in process memory only: after a restart,
+# `manage.py requeue_images` picks up the rows left in PROCESSING.
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .changes import record_change
+
+logger = logging.getLogger(__name__)
+
+MAX_SIDE = getattr(settings, 'IMAGE_INGEST_MAX_SIDE', 1600)
+JPEG_QUALITY = getattr(settings, 'IMAGE_INGEST_QUALITY', 82)
+WORKERS = getattr(settings, 'IMAGE_INGEST_WORKERS', 2)
+
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='image-ingest')
+
+
+class InvalidImage(Exception):
+    pass
+
+
+def process_image(fileobj, max_side=MAX_SIDE, quality=JPEG_QUALITY):
+    """Return (bytes, extension) of the optimized image; raises InvalidImage."""
+    try:
+        with Image.open(fileobj) as probe:
+            probe.verify()
+        fileobj.seek(0)
+        image = Image.open(fileobj)
+        image.load()
+    except (UnidentifiedImageError, OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise InvalidImage(str(e)) from e
+
+    # Apply the EXIF orientation before the metadata is dropped.
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    keep_alpha = image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info)
+    out = BytesIO()
+    # Saving without exif=/icc_profile=/pnginfo= leaves all metadata behind.
+    if keep_alpha:
+        image.convert('RGBA').save(out, 'PNG', optimize=True)
+        ext = '.png'
+    else:
+        image.convert('RGB').save(out, 'JPEG', quality=quality, optimize=True, progressive=True)
+        ext = '.jpg'
+    return out.getvalue(), ext
+
+
+def ingest(model, pk):
+    close_old_connections()
+    try:
+        obj = model._default_manager.filter(pk=pk).first()
+        if obj is None or not obj.pending_image:
+            return
+        pending = obj.pending_image.name
+        field = model._meta.get_field(model.ingest_field)
+        rows = model._default_manager.filter(pk=pk, pending_image=pending)
+        try:
+            with obj.pending_image.open('rb') as f:
+                data, ext = process_image(f)
+        except InvalidImage as e:
+            logger.warning("Image ingestion failed for %s #%s: %s", model.__name__, pk, e)
+            if rows.update(image_status=model.FAILED, pending_image=None):
+                record_change(model, pk)
+            field.storage.delete(pending)
+            return
+
+        name = field.storage.save(f'{pk}{ext}', ContentFile(data))
+        # Swap only if no newer upload replaced the pending file meanwhile.
+        swapped = rows.update(**{field.name: name, 'pending_image': None, 'image_status': model.READY})
+        if swapped:
+            record_change(model, pk)
+            field.storage.delete(pending)
+        else:
+            field.storage.delete(name)
+    except Exception:
+        logger.exception("Image ingestion crashed for %s #%s", model.__name__, pk)
+        model._default_manager.filter(pk=pk).update(image_status=model.FAILED)
+    finally:
+        close_old_connections()
+
+
+def submit(model, pk):
+    return _executor.submit(ingest, model, pk)
+
+
+def stuck_rows(model):
+    """Rows left PROCESSING, e.g. by a worker that died mid-job: (with a pending file, without)."""
+    rows = model._default_manager.filter(image_status=model.PROCESSING)
+    missing = rows.filter(pending_image__isnull=True) | rows.filter(pending_image='')
+    return rows.exclude(pk__in=missing.values('pk')), missing
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio import retention
+
+
+class Command(BaseCommand):
+    help = (
+        "Move contact messages older than the retention period out of the "
+        "Contact table (into ContactArchive or gzipped NDJSON files) in short "
+        "batches, then VACUUM/ANALYZE. Meant to run periodically from cron. "
+        "Contacts older than migration 0010 have estimated dates, spread by id "
+        "from CONTACT_BACKFILL_SINCE (default: twice the retention period ago)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=retention.RETENTION_DAYS,
+                            help="Archive messages older than this many days (default: CONTACT_RETENTION_DAYS).")
+        parser.add_argument('--target', choices=retention.TARGETS, default=retention.ARCHIVE_TARGET)
+        parser.add_argument('--dir', default=retention.ARCHIVE_DIR, help="Directory for the NDJSON target.")
+        parser.add_argument('--batch-size', type=int, default=retention.BATCH_SIZE)
+        parser.add_argument('--pause', type=float, default=0.0, help="Seconds to sleep between batches.")
+        parser.add_argument('--dry-run', action='store_true', help="Only count what would be archived.")
+        parser.add_argument('--no-compact', action='store_true', help="Skip VACUUM/ANALYZE.")
+        parser.add_argument('--vacuum', action='store_true', help="VACUUM even below the free-page threshold (SQLite).")
+
+    def handle(self, *args, days, target, dir, batch_size, pause, dry_run, no_compact, vacuum, **options):
+        if days < 0 or batch_size < 1:
+            raise CommandError("--days must be >= 0 and --batch-size >= 1.")
+        cutoff = retention.cutoff_for(days)
+        if dry_run:
+            count = retention.expired(cutoff).count()
+            self.stdout.write(f"[dry run] {count} message(s) older than {cutoff:%Y-%m-%d %H:%M} would be archived to {target}.")
+            return
+
+        moved = retention.archive_old_contacts(days, target, batch_size, dir, pause)
+        self.stdout.write(self.style.SUCCESS(f"{moved} message(s) older than {cutoff:%Y-%m-%d %H:%M} archived to {target}."))
+        if not no_compact:
+            done = retention.compact(force_vacuum=vacuum)
+            self.stdout.write(f"Compaction: {', '.join(done) or 'nothing to do for this database'}.")
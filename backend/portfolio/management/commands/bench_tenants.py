@@ -0,0 +1,88 @@
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client, override_settings
+
+from portfolio.models import Home, Skill, Tenant, Work
+from portfolio.tenancy import clear_lookups
+
+
+# The bench clears the cache between levels to measure cold requests; it gets
+# its own store so that never touches what the site has cached.
+BENCH_CACHE = {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'bench-tenants',
+    'OPTIONS': {'MAX_ENTRIES': 100000},
+}
+
+
+def _percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark request latency as the tenant count grows. Tenants and their "
+        "content are created inside a transaction that is rolled back at the end."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tenants', default='10,100,1000,5000', help="Comma-separated tenant counts to measure at.")
+        parser.add_argument('--requests', type=int, default=300, help="Requests per level.")
+        parser.add_argument('--path', default='/api/home/', help="Path requested under /t/<slug>/.")
+        parser.add_argument('--rows', type=int, default=5, help="Work and Skill rows per tenant.")
+
+    def handle(self, *args, **options):
+        with override_settings(CACHES={**settings.CACHES, 'default': BENCH_CACHE}):
+            self._run(options)
+        clear_lookups()
+
+    def _run(self, options):
+        levels = sorted(int(n) for n in options['tenants'].split(','))
+        host = next((h for h in settings.ALLOWED_HOSTS if h and h[0] not in '.*'), 'localhost')
+        client = Client(HTTP_HOST=host)
+
+        self.stdout.write(f"{'tenants':>8} {'cold p50':>9} {'cold p95':>9} {'warm p50':>9} {'warm p95':>9} {'warm p99':>9}  (ms)")
+        with transaction.atomic():
+            slugs = []
+            for level in levels:
+                slugs += self._create_tenants(len(slugs), level, options['rows'])
+                clear_lookups()
+                cache.clear()
+
+                sample = random.sample(slugs, min(options['requests'], len(slugs)))
+                cold = [self._timed(client, slug, options['path']) for slug in sample]
+                warm = [self._timed(client, random.choice(sample), options['path']) for _ in range(options['requests'])]
+                self.stdout.write(
+                    f"{level:>8} {statistics.median(cold):>9.2f} {_percentile(cold, .95):>9.2f} "
+                    f"{statistics.median(warm):>9.2f} {_percentile(warm, .95):>9.2f} {_percentile(warm, .99):>9.2f}"
+                )
+            transaction.set_rollback(True)
+        cache.clear()
+
+    def _create_tenants(self, start, stop, rows):
+        tenants = Tenant.objects.bulk_create(
+            [Tenant(slug=f'bench-{i}', name=f'Bench {i}') for i in range(start, stop)], batch_size=500,
+        )
+        Home.objects.bulk_create([Home(tenant=t, title=t.name, subtitle='benchmark') for t in tenants], batch_size=500)
+        Work.objects.bulk_create(
+            [Work(tenant=t, project_name=f'project {n}') for t in tenants for n in range(rows)], batch_size=500,
+        )
+        Skill.objects.bulk_create(
+            [Skill(tenant=t, skill_name=f'skill {n}', proficiency=50) for t in tenants for n in range(rows)], batch_size=500,
+        )
+        return [t.slug for t in tenants]
+
+    def _timed(self, client, slug, path):
+        started = time.perf_counter()
+        response = client.get(f'/t/{slug}{path}')
+        elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code != 200:
+            raise RuntimeError(f"/t/{slug}{path} returned {response.status_code}")
+        return elapsed
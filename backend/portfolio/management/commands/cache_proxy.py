@@ -0,0 +1,160 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from django.core.management.base import BaseCommand
+
+from portfolio.surrogate import SURROGATE_KEY_HEADER
+
+HOP_BY_HOP = {'connection', 'keep-alive', 'transfer-encoding', 'te', 'trailer', 'upgrade', 'content-encoding', 'content-length'}
+_S_MAXAGE = re.compile(r's-maxage=(\d+)')
+_MAX_AGE = re.compile(r'(?<!-)max-age=(\d+)')
+
+
+class ProxyCache:
+    """(host, path) -> response variants, indexed by surrogate key for purges."""
+
+    def __init__(self):
+        self.entries = {}  # (host, path) -> [(expires_at, status, headers, body, keys, vary)]
+        self.by_key = {}   # surrogate key -> {(host, path)}
+        self.lock = threading.Lock()
+        self.hits = self.misses = self.purged = 0
+
+    def get(self, url, request_headers):
+        with self.lock:
+            now = time.monotonic()
+            for entry in self.entries.get(url, ()):
+                if entry[0] > now and all(request_headers.get(name) == value for name, value in entry[5]):
+                    self.hits += 1
+                    return entry
+            self.misses += 1
+            return None
+
+    def put(self, url, ttl, status, headers, body, keys, vary):
+        with self.lock:
+            now = time.monotonic()
+            # Keep the live variants that differ from this one on a Vary header.
+            variants = [e for e in self.entries.get(url, ()) if e[0] > now and e[5] != vary]
+            variants.append((now + ttl, status, headers, body, keys, vary))
+            self.entries[url] = variants
+            for key in keys:
+                self.by_key.setdefault(key, set()).add(url)
+
+    def purge(self, keys):
+        with self.lock:
+            urls = set()
+            for key in keys:
+                urls |= self.by_key.pop(key, set())
+            for url in urls:
+                self.purged += len(self.entries.pop(url, ()))
+            return len(urls)
+
+
+def vary_values(response_headers, request_headers):
+    """The request's values for the response's Vary headers, or None for Vary: *."""
+    names = [n.strip().lower() for n in response_headers.get('Vary', '').split(',') if n.strip()]
+    if '*' in names:
+        return None
+    return tuple((name, request_headers.get(name)) for name in sorted(set(names)))
+
+
+def cache_ttl(headers):
+    control = headers.get('Cache-Control', '').lower()
+    if 'private' in control or 'no-store' in control or 'no-cache' in control:
+        return 0
+    match = _S_MAXAGE.search(control) or _MAX_AGE.search(control)
+    return int(match.group(1)) if match else 0
+
+
+def make_handler(upstream, cache, session):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, fmt, *args):
+            pass
+
+        def _reply(self, status, headers, body, cache_state):
+            self.send_response(status)
+            for name, value in headers:
+                self.send_header(name, value)
+            self.send_header('X-Cache', cache_state)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            if self.command != 'HEAD':
+                self.wfile.write(body)
+
+        def _url(self):
+            # Tenants are resolved from the host, so it is part of the key.
+            return (self.headers.get('Host', '').lower(), self.path)
+
+        def _forward(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            body = self.rfile.read(length) if length else None
+            headers = {k: v for k, v in self.headers.items() if k.lower() not in HOP_BY_HOP}
+            return session.request(
+                self.command, upstream + self.path, headers=headers, data=body, allow_redirects=False, timeout=60,
+            )
+
+        def do_GET(self):
+            # HEAD is answered from a cached GET, but never fills the cache.
+            entry = cache.get(self._url(), self.headers)
+            if entry:
+                self._reply(entry[1], entry[2], entry[3], 'HIT')
+                return
+            response = self._forward()
+            headers = [(k, v) for k, v in response.headers.items() if k.lower() not in HOP_BY_HOP]
+            ttl = cache_ttl(response.headers) if response.status_code == 200 and self.command == 'GET' else 0
+            vary = vary_values(response.headers, self.headers)
+            if ttl and vary is not None and not response.headers.get('Set-Cookie'):
+                keys = response.headers.get(SURROGATE_KEY_HEADER, '').split()
+                cache.put(self._url(), ttl, response.status_code, headers, response.content, keys, vary)
+            self._reply(response.status_code, headers, response.content, 'MISS')
+
+        do_HEAD = do_GET
+
+        def do_POST(self):
+            if self.path == '/__purge':
+                length = int(self.headers.get('Content-Length') or 0)
+                keys = json.loads(self.rfile.read(length) or b'{}').get('surrogate_keys', [])
+                purged = cache.purge(keys)
+                body = json.dumps({'purged': purged}).encode()
+                self._reply(200, [('Content-Type', 'application/json')], body, 'PURGE')
+                return
+            response = self._forward()
+            headers = [(k, v) for k, v in response.headers.items() if k.lower() not in HOP_BY_HOP]
+            self._reply(response.status_code, headers, response.content, 'PASS')
+
+        do_PUT = do_PATCH = do_DELETE = do_POST
+
+        def do_OPTIONS(self):
+            self.do_POST()
+
+    return Handler
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a minimal caching reverse proxy for local testing: caches GET "
+        "responses by s-maxage/max-age, indexes them by Surrogate-Key, and "
+        "accepts POST /__purge {\"surrogate_keys\": [...]} (point CACHE_PURGE_URL at it)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listen', default='127.0.0.1:8080')
+        parser.add_argument('--upstream', default='http://127.0.0.1:8000')
+
+    def handle(self, *args, listen, upstream, **options):
+        host, _, port = listen.rpartition(':')
+        cache = ProxyCache()
+        server = ThreadingHTTPServer((host or '127.0.0.1', int(port)), make_handler(upstream.rstrip('/'), cache, requests.Session()))
+        self.stdout.write(f"Caching proxy on http://{listen} -> {upstream} (purge: POST /__purge)")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            self.stdout.write(f"hits={cache.hits} misses={cache.misses} purged={cache.purged}")
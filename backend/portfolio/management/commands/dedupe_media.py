@@ -0,0 +1,106 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from portfolio.changes import FEED_MODELS, record_change
+from portfolio.storage import (
+    BLOB_DIR, BLOB_GRACE_SECONDS, content_addressed_fields, content_hash, blob_name, is_blob, reference_counts,
+)
+
+# Temporary upload files younger than this may belong to an upload in progress.
+TMP_GRACE_SECONDS = 3600
+
+FEED_MODELS_BY_CLASS = {model for model, _ in FEED_MODELS.values()}
+
+
+class Command(BaseCommand):
+    help = (
+        "Move existing media into content-addressed blobs (identical files "
+        "share one blob), repoint the database rows, and delete files that no "
+        "row references any more."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report what would change without touching anything.")
+        parser.add_argument('--no-gc', action='store_true', help="Skip deleting unreferenced files.")
+
+    def handle(self, *args, dry_run=False, no_gc=False, **options):
+        fields = list(content_addressed_fields())
+        if not fields:
+            self.stdout.write("No fields use ContentAddressedStorage.")
+            return
+
+        moved = self.migrate_rows(fields, dry_run)
+        removed, freed = (0, 0) if no_gc else self.collect_garbage(fields, dry_run)
+
+        prefix = "[dry run] " if dry_run else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{moved} row(s) moved to blobs, {removed} unreferenced file(s) removed "
+            f"({freed / 1024:.1f} KiB freed)."
+        ))
+
+    def migrate_rows(self, fields, dry_run):
+        moved = 0
+        for model, field in fields:
+            storage = field.storage
+            rows = model._default_manager.exclude(**{field.name: ''}).exclude(**{f'{field.name}__isnull': True})
+            for pk, name in rows.values_list('pk', field.name):
+                if is_blob(name):
+                    continue
+                if not storage.exists(name):
+                    self.stderr.write(f"{model.__name__} #{pk}: {name} is missing, skipped")
+                    continue
+                with storage.open(name) as f:
+                    new_name = blob_name(content_hash(f), name) if dry_run else storage.save(name, f)
+                if not dry_run:
+                    # update() skips save(); only the path changes, but mirrors
+                    # still need the new URL before the old file is collected.
+                    model._default_manager.filter(pk=pk).update(**{field.name: new_name})
+                    if model in FEED_MODELS_BY_CLASS:
+                        record_change(model, pk)
+                self.stdout.write(f"{model.__name__} #{pk}.{field.name}: {name} -> {new_name}")
+                moved += 1
+        return moved
+
+    def collect_garbage(self, fields, dry_run):
+        storage = fields[0][1].storage
+        referenced = reference_counts()
+        if dry_run:
+            # Rows would point at blobs after the (skipped) migration step.
+            for old_name, new_name in self._planned_moves(fields):
+                referenced[old_name] -= 1
+                referenced[new_name] += 1
+
+        roots = {BLOB_DIR} | {str(field.upload_to).strip('/') for _, field in fields if isinstance(field.upload_to, str)}
+        removed = freed = 0
+        now = time.time()
+        for root in sorted(roots):
+            base = storage.path(root)
+            for dirpath, _, filenames in os.walk(base):
+                for filename in filenames:
+                    path = os.path.join(dirpath, filename)
+                    name = os.path.relpath(path, storage.location).replace(os.sep, '/')
+                    if referenced[name] > 0:
+                        continue
+                    # Recent blobs may belong to a save whose row is not committed yet.
+                    age = now - os.path.getmtime(path)
+                    if name.startswith(f'{BLOB_DIR}/tmp/') and age < TMP_GRACE_SECONDS:
+                        continue
+                    if is_blob(name) and age < BLOB_GRACE_SECONDS:
+                        continue
+                    size = os.path.getsize(path)
+                    if not dry_run:
+                        os.remove(path)
+                    self.stdout.write(f"unreferenced: {name} ({size} bytes)")
+                    removed += 1
+                    freed += size
+        return removed, freed
+
+    def _planned_moves(self, fields):
+        for model, field in fields:
+            storage = field.storage
+            for name in model._default_manager.exclude(**{field.name: ''}).values_list(field.name, flat=True):
+                if name and not is_blob(name) and storage.exists(name):
+                    with storage.open(name) as f:
+                        yield name, blob_name(content_hash(f), name)
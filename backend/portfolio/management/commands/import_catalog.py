@@ -0,0 +1,50 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from portfolio import catalog
+from portfolio.models import DEFAULT_TENANT_ID, Tenant
+
+
+class Command(BaseCommand):
+    help = (
+        "Import Work and Skill rows from a CSV or JSON catalog: rows are "
+        "upserted by name in batched bulk writes, project images (URLs or "
+        "paths relative to the catalog) are fetched in parallel."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Catalog file (.csv or .json).")
+        parser.add_argument('--tenant', default=str(DEFAULT_TENANT_ID), help="Tenant id or slug.")
+        parser.add_argument('--batch-size', type=int, default=catalog.BATCH_SIZE)
+        parser.add_argument('--workers', type=int, default=catalog.WORKERS, help="Concurrent image fetches.")
+        parser.add_argument('--dry-run', action='store_true', help="Validate and report without writing or fetching.")
+
+    def handle(self, *args, path, tenant, batch_size, workers, dry_run, **options):
+        if batch_size < 1 or workers < 1:
+            raise CommandError("--batch-size and --workers must be at least 1.")
+        lookup = {'pk': int(tenant)} if tenant.isdigit() else {'slug': tenant}
+        target = Tenant.objects.filter(**lookup).first()
+        if target is None:
+            raise CommandError(f"Unknown tenant {tenant!r}.")
+        try:
+            with open(path, 'rb') as f:
+                entries = catalog.parse_catalog(f.read(), path)
+        except OSError as e:
+            raise CommandError(f"Cannot read {path}: {e}")
+        except catalog.CatalogError as e:
+            raise CommandError(str(e))
+
+        started = time.monotonic()
+        result = catalog.import_catalog(
+            entries, target, base_dir=os.path.dirname(os.path.abspath(path)),
+            batch_size=batch_size, workers=workers, dry_run=dry_run,
+        )
+        for label, message in result.errors:
+            self.stderr.write(f"{label}: {message}")
+        prefix = "[dry run] " if dry_run else ""
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}{len(entries)} row(s) for {target.slug}: {result.summary()} "
+            f"in {time.monotonic() - started:.2f}s."
+        ))
@@ -0,0 +1,206 @@
+import json
+import statistics
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+# Captured headers that are safe to send again; Host follows --target.
+REPLAYED_HEADERS = ('Accept', 'Content-Type', 'User-Agent', 'Last-Event-ID', 'X-Requested-With')
+
+
+def load_capture(path):
+    """Capture lines / hand-written seed .jsonl: one request record per line."""
+    records = []
+    with open(path, encoding='utf-8') as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                raise CommandError(f"{path}:{lineno}: {e}")
+            if 'm' in record and 'p' in record:
+                records.append(record)
+    return records
+
+
+def load_postman(path, interval):
+    """Postman v2.1 collection -> records spaced `interval` seconds apart."""
+    with open(path, encoding='utf-8') as f:
+        collection = json.load(f)
+
+    def items(nodes):
+        for node in nodes:
+            if 'item' in node:
+                yield from items(node['item'])
+            elif 'request' in node:
+                yield node['request']
+
+    records = []
+    for i, req in enumerate(items(collection.get('item', []))):
+        url = req.get('url') or {}
+        if isinstance(url, str):
+            path = '/' + url.split('://', 1)[-1].split('/', 1)[-1]
+        else:
+            path = '/' + '/'.join(url.get('path') or [])
+            if url.get('query'):
+                path += '?' + '&'.join(f"{q['key']}={q.get('value', '')}" for q in url['query'] if not q.get('disabled'))
+        record = {
+            't': i * interval,
+            'm': req.get('method', 'GET'),
+            'p': path,
+            'h': {h['key']: h['value'] for h in req.get('header', []) if not h.get('disabled')},
+        }
+        body = req.get('body') or {}
+        if body.get('mode') == 'urlencoded':
+            record['form'] = {f['key']: f.get('value', '') for f in body['urlencoded'] if not f.get('disabled')}
+        elif body.get('mode') == 'raw':
+            record['raw'] = body.get('raw', '')
+        records.append(record)
+    return records
+
+
+def _form_value(key, spec):
+    # Seeds carry real values; captures only carry the value length.
+    if isinstance(spec, str):
+        return spec
+    if 'mail' in key:
+        return ('r' * max(1, spec - 12))[:64] + '@example.com'
+    return 'x' * spec
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-issue captured traffic (TRAFFIC_CAPTURE_FILE output, .jsonl seeds or "
+        "a Postman collection) against a server, keeping the original timing "
+        "and overlap, sped up by --speed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('files', nargs='+', help="Capture/seed .jsonl files (rotated ones too) or Postman .json collections.")
+        parser.add_argument('--target', default='http://127.0.0.1:8000', help="Base URL to replay against.")
+        parser.add_argument('--speed', type=float, default=1.0, help="Time compression: 1 = real time, 10 = ten times faster.")
+        parser.add_argument('--max-workers', type=int, default=64, help="Upper bound on concurrent requests.")
+        parser.add_argument('--loops', type=int, default=1, help="Play the traffic this many times back to back.")
+        parser.add_argument('--no-writes', action='store_true', help="Skip non-GET/HEAD requests.")
+        parser.add_argument('--seed-interval', type=float, default=0.5, help="Spacing (seconds) between Postman requests.")
+        parser.add_argument('--timeout', type=float, default=30.0)
+
+    def handle(self, *args, **options):
+        if options['speed'] <= 0:
+            raise CommandError("--speed must be positive")
+        records = []
+        for path in options['files']:
+            if path.endswith('.json'):
+                loaded = load_postman(path, options['seed_interval'])
+            else:
+                loaded = load_capture(path)
+            # Sources are overlaid: each one starts at t=0.
+            start = min((r['t'] for r in loaded), default=0)
+            records += [{**r, 't': r['t'] - start} for r in loaded]
+        if options['no_writes']:
+            records = [r for r in records if r['m'] in ('GET', 'HEAD')]
+        if not records:
+            raise CommandError("Nothing to replay.")
+
+        records.sort(key=lambda r: r['t'])
+        t0 = records[0]['t']
+        span = records[-1]['t'] - t0
+        # Each loop starts one average gap after the previous one ended.
+        gap = span / max(1, len(records) - 1) if len(records) > 1 else options['seed_interval']
+        schedule = [
+            ((loop * (span + gap)) + r['t'] - t0, r)
+            for loop in range(options['loops'])
+            for r in records
+        ]
+        self.stdout.write(
+            f"Replaying {len(schedule)} requests spanning {(span + gap) * options['loops'] / options['speed']:.1f}s "
+            f"at {options['speed']}x against {options['target']}"
+        )
+        results = self._replay(schedule, options)
+        self._report(results)
+
+    def _replay(self, schedule, options):
+        target = options['target'].rstrip('/')
+        local = threading.local()
+        results = []
+        lock = threading.Lock()
+        in_flight = [0, 0]  # current, peak
+
+        def send(due, record):
+            session = getattr(local, 'session', None)
+            if session is None:
+                session = local.session = requests.Session()
+            headers = {k: v for k, v in record.get('h', {}).items() if k in REPLAYED_HEADERS}
+            data = None
+            if 'form' in record:
+                data = {k: _form_value(k, v) for k, v in record['form'].items()}
+                # Sent urlencoded; a captured multipart boundary would not match.
+                headers.pop('Content-Type', None)
+            elif 'raw' in record:
+                data = record['raw'].encode()
+            elif record.get('size'):
+                data = b'x' * record['size']
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight[1], in_flight[0])
+            started = time.perf_counter()
+            lag = time.monotonic() - due
+            try:
+                response = session.request(
+                    record['m'], target + record['p'], headers=headers, data=data,
+                    timeout=options['timeout'], allow_redirects=False, stream=True,
+                )
+                if not response.headers.get('Content-Type', '').startswith('text/event-stream'):
+                    response.content  # time the full body, but don't wait out SSE streams
+                response.close()
+                status = response.status_code
+            except requests.RequestException as e:
+                status = type(e).__name__
+            elapsed = (time.perf_counter() - started) * 1000
+            with lock:
+                in_flight[0] -= 1
+                results.append((record['m'], record['p'].split('?')[0], status, elapsed, lag, record.get('ms')))
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['max_workers']) as pool:
+            for offset, record in schedule:
+                due = started + offset / options['speed']
+                delay = due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(send, due, record)
+        self.peak_in_flight = in_flight[1]
+        self.wall = time.monotonic() - started
+        return results
+
+    def _report(self, results):
+        def pct(values, q):
+            values = sorted(values)
+            return values[min(len(values) - 1, int(q * len(values)))]
+
+        statuses = Counter(str(r[2]) for r in results)
+        lags = [r[4] * 1000 for r in results]
+        self.stdout.write(
+            f"{len(results)} requests in {self.wall:.1f}s ({len(results) / max(self.wall, 1e-9):.1f} req/s), "
+            f"peak concurrency {self.peak_in_flight}, schedule lag p95 {pct(lags, .95):.1f}ms"
+        )
+        self.stdout.write("status: " + ", ".join(f"{k}={v}" for k, v in sorted(statuses.items())))
+
+        by_path = defaultdict(list)
+        for method, path, status, elapsed, lag, original in results:
+            by_path[(method, path)].append((elapsed, original))
+        self.stdout.write(f"{'request':<40} {'n':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'orig p50':>9}  (ms)")
+        for (method, path), rows in sorted(by_path.items(), key=lambda kv: -len(kv[1])):
+            times = [e for e, _ in rows]
+            original = [o for _, o in rows if o is not None]
+            orig = f"{statistics.median(original):>9.1f}" if original else f"{'-':>9}"
+            self.stdout.write(
+                f"{(method + ' ' + path)[:40]:<40} {len(rows):>6} {statistics.median(times):>8.1f} "
+                f"{pct(times, .95):>8.1f} {pct(times, .99):>8.1f} {orig}"
+            )
@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from portfolio import ingest
+from portfolio.changes import record_change
+from portfolio.models import Home, Work
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-run image ingestion for rows still marked processing, which is "
+        "where a restart or crash of the web process leaves them. Safe to run "
+        "while workers are alive: the swap only happens if the pending file "
+        "is still the same. Rows without a pending file are marked failed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Only report the stuck rows.")
+        parser.add_argument('--workers', type=int, default=ingest.WORKERS)
+
+    def handle(self, *args, dry_run=False, workers=ingest.WORKERS, **options):
+        jobs = []
+        for model in (Home, Work):
+            pending, missing = ingest.stuck_rows(model)
+            jobs += [(model, pk) for pk in pending.values_list('pk', flat=True)]
+            lost = list(missing.values_list('pk', flat=True))
+            if lost and not dry_run:
+                model._default_manager.filter(pk__in=lost).update(image_status=model.FAILED)
+                for pk in lost:
+                    record_change(model, pk)
+            if lost:
+                verb = "would be marked" if dry_run else "marked"
+                self.stdout.write(f"{model.__name__}: {len(lost)} row(s) without a pending file {verb} failed.")
+
+        if dry_run:
+            self.stdout.write(f"[dry run] {len(jobs)} image(s) would be requeued.")
+            return
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            list(pool.map(lambda job: ingest.ingest(*job), jobs))
+        self.stdout.write(self.style.SUCCESS(f"{len(jobs)} image(s) requeued."))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from portfolio import retention
+
+
+class Command(BaseCommand):
+    help = "Search archived contact messages (archive table and NDJSON files) for every word of a term."
+
+    def add_arguments(self, parser):
+        parser.add_argument('term')
+        parser.add_argument('--tenant', type=int, help="Only this tenant id.")
+        parser.add_argument('--limit', type=int, default=50)
+        parser.add_argument('--dir', default=retention.ARCHIVE_DIR, help="Directory of the NDJSON archives.")
+
+    def handle(self, *args, term, tenant, limit, dir, **options):
+        hits = retention.search_archive(term, tenant, limit, dir)
+        for hit in hits:
+            self.stdout.write(
+                f"[{hit['source']}] #{hit['contact_id']} {hit['created_at']:%Y-%m-%d} "
+                f"{hit['name']} <{hit['email']}>: {hit['message']}"
+            )
+        self.stdout.write(f"{len(hits)} match(es).")
@@ -0,0 +1,84 @@
+from django.db import migrations
+
+# Full-text index for Contact, kept in sync by the database itself:
+# - SQLite: an external-content FTS5 table maintained by triggers
+# - PostgreSQL: a generated tsvector column with a GIN index
+# Other backends keep the plain icontains admin search.
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS portfolio_contact_fts USING fts5(
+        name, email, message,
+        content='portfolio_contact', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS portfolio_contact_fts_ai AFTER INSERT ON portfolio_contact BEGIN
+        INSERT INTO portfolio_contact_fts(rowid, name, email, message)
+        VALUES (new.id, new.name, new.email, new.message);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS portfolio_contact_fts_ad AFTER DELETE ON portfolio_contact BEGIN
+        INSERT INTO portfolio_contact_fts(portfolio_contact_fts, rowid, name, email, message)
+        VALUES ('delete', old.id, old.name, old.email, old.message);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS portfolio_contact_fts_au AFTER UPDATE ON portfolio_contact BEGIN
+        INSERT INTO portfolio_contact_fts(portfolio_contact_fts, rowid, name, email, message)
+        VALUES ('delete', old.id, old.name, old.email, old.message);
+        INSERT INTO portfolio_contact_fts(rowid, name, email, message)
+        VALUES (new.id, new.name, new.email, new.message);
+    END
+    """,
+    "INSERT INTO portfolio_contact_fts(portfolio_contact_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS portfolio_contact_fts_au",
+    "DROP TRIGGER IF EXISTS portfolio_contact_fts_ad",
+    "DROP TRIGGER IF EXISTS portfolio_contact_fts_ai",
+    "DROP TABLE IF EXISTS portfolio_contact_fts",
+]
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE portfolio_contact ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(email, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(message, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS portfolio_contact_search_gin ON portfolio_contact USING GIN (search_vector)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS portfolio_contact_search_gin",
+    "ALTER TABLE portfolio_contact DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(schema_editor, statements):
+    for sql in statements.get(schema_editor.connection.vendor, ()):
+        schema_editor.execute(sql)
+
+
+def create_search_index(apps, schema_editor):
+    _run(schema_editor, {"sqlite": SQLITE_FORWARD, "postgresql": POSTGRES_FORWARD})
+
+
+def drop_search_index(apps, schema_editor):
+    _run(schema_editor, {"sqlite": SQLITE_BACKWARD, "postgresql": POSTGRES_BACKWARD})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0004_remove_work_project_description'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
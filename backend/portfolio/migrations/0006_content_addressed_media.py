@@ -0,0 +1,34 @@
+# Generated by Django 4.2.5 on 2026-10-19 11:58
+
+from django.db import migrations, models
+import portfolio.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0005_contact_search'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='about',
+            name='profile_image',
+            field=models.ImageField(blank=True, null=True, storage=portfolio.storage.ContentAddressedStorage(), upload_to='about_images/'),
+        ),
+        migrations.AlterField(
+            model_name='home',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=portfolio.storage.ContentAddressedStorage(), upload_to='home_images/'),
+        ),
+        migrations.AlterField(
+            model_name='skilled',
+            name='profile_image',
+            field=models.ImageField(blank=True, null=True, storage=portfolio.storage.ContentAddressedStorage(), upload_to='skill_images/'),
+        ),
+        migrations.AlterField(
+            model_name='work',
+            name='project_image',
+            field=models.ImageField(blank=True, null=True, storage=portfolio.storage.ContentAddressedStorage(), upload_to='work_images/'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.5 on 2026-10-19 11:59
+
+from django.db import migrations, models
+import portfolio.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0006_content_addressed_media'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='home',
+            name='image_status',
+            field=models.CharField(choices=[('ready', 'Ready'), ('processing', 'Processing'), ('failed', 'Failed')], default='ready', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='home',
+            name='pending_image',
+            field=models.ImageField(blank=True, editable=False, null=True, storage=portfolio.storage.ContentAddressedStorage(), upload_to='pending/'),
+        ),
+        migrations.AddField(
+            model_name='work',
+            name='image_status',
+            field=models.CharField(choices=[('ready', 'Ready'), ('processing', 'Processing'), ('failed', 'Failed')], default='ready', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='work',
+            name='pending_image',
+            field=models.ImageField(blank=True, editable=False, null=True, storage=portfolio.storage.ContentAddressedStorage(), upload_to='pending/'),
+        ),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 4.2.5 on 2026-10-19 12:02
+
+import importlib
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+contact_search = importlib.import_module('portfolio.migrations.0005_contact_search')
+
+
+def create_default_tenant(apps, schema_editor):
+    # Owns everything that existed before tenancy (models.DEFAULT_TENANT_ID).
+    Tenant = apps.get_model('portfolio', 'Tenant')
+    Tenant.objects.get_or_create(pk=1, defaults={'slug': 'default', 'name': 'Default'})
+
+
+def restore_contact_search(apps, schema_editor):
+    # SQLite rebuilds portfolio_contact to add the column, which drops the
+    # FTS triggers from 0005; recreate them (no-op on other backends).
+    contact_search.create_search_index(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0008_changelog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tenant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('slug', models.SlugField(unique=True)),
+                ('name', models.CharField(max_length=100)),
+                ('domain', models.CharField(blank=True, max_length=253, null=True, unique=True)),
+            ],
+        ),
+        migrations.RunPython(create_default_tenant, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='about',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=1, on_delete=django.db.models.deletion.CASCADE, to='portfolio.tenant'),
+        ),
+        migrations.AddField(
+            model_name='changelog',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=1, on_delete=django.db.models.deletion.CASCADE, to='portfolio.tenant'),
+        ),
+        migrations.AddField(
+            model_name='contact',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=1, on_delete=django.db.models.deletion.CASCADE, to='portfolio.tenant'),
+        ),
+        migrations.AddField(
+            model_name='home',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=1, on_delete=django.db.models.deletion.CASCADE, to='portfolio.tenant'),
+        ),
+        migrations.AddField(
+            model_name='skill',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=1, on_delete=django.db.models.deletion.CASCADE, to='portfolio.tenant'),
+        ),
+        migrations.AddField(
+            model_name='skilled',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=1, on_delete=django.db.models.deletion.CASCADE, to='portfolio.tenant'),
+        ),
+        migrations.AddField(
+            model_name='work',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=1, on_delete=django.db.models.deletion.CASCADE, to='portfolio.tenant'),
+        ),
+        migrations.RunPython(restore_contact_search, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='about',
+            index=models.Index(fields=['tenant', 'id'], name='about_tenant_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='changelog',
+            index=models.Index(fields=['tenant', 'id'], name='changelog_tenant_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['tenant', 'id'], name='contact_tenant_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='home',
+            index=models.Index(fields=['tenant', 'id'], name='home_tenant_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='skill',
+            index=models.Index(fields=['tenant', 'id'], name='skill_tenant_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='skilled',
+            index=models.Index(fields=['tenant', 'id'], name='skilled_tenant_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='work',
+            index=models.Index(fields=['tenant', 'id'], name='work_tenant_id_idx'),
+        ),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 4.2.5 on 2026-10-19 12:11
+
+import importlib
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+import django.db.models.deletion
+import django.utils.timezone
+
+contact_search = importlib.import_module('portfolio.migrations.0005_contact_search')
+
+
+def restore_contact_search(apps, schema_editor):
+    # Adding created_at rebuilds portfolio_contact on SQLite, dropping the FTS triggers.
+    contact_search.create_search_index(apps, schema_editor)
+
+
+def backfill_created_at(apps, schema_editor):
+    # Existing contacts have no recorded date. Spread them by id order from
+    # CONTACT_BACKFILL_SINCE (default: twice the retention period ago) up to
+    # now, so the oldest become eligible for archiving first instead of all
+    # of them waiting a full retention period from this migration.
+    Contact = apps.get_model('portfolio', 'Contact')
+    ids = list(Contact.objects.using(schema_editor.connection.alias).order_by('pk').values_list('pk', flat=True))
+    if not ids:
+        return
+    now = timezone.now()
+    since = parse_date(getattr(settings, 'CONTACT_BACKFILL_SINCE', '') or '')
+    if since is not None:
+        start = timezone.make_aware(datetime.combine(since, time.min))
+    else:
+        start = now - timedelta(days=2 * getattr(settings, 'CONTACT_RETENTION_DAYS', 365))
+    step = (now - start) / len(ids)
+    rows = [Contact(pk=pk, created_at=start + step * i) for i, pk in enumerate(ids)]
+    Contact.objects.using(schema_editor.connection.alias).bulk_update(rows, ['created_at'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('portfolio', '0009_tenants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContactArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('contact_id', models.BigIntegerField()),
+                ('name', models.CharField(max_length=50)),
+                ('email', models.EmailField(max_length=254)),
+                ('message_z', models.BinaryField()),
+                ('created_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='contact',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.RunPython(backfill_created_at, migrations.RunPython.noop),
+        migrations.RunPython(restore_contact_search, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['created_at'], name='contact_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='contactarchive',
+            name='tenant',
+            field=models.ForeignKey(db_index=False, default=1, on_delete=django.db.models.deletion.CASCADE, to='portfolio.tenant'),
+        ),
+        migrations.AddIndex(
+            model_name='contactarchive',
+            index=models.Index(fields=['tenant', 'id'], name='contactarchive_tenant_id_idx'),
+        ),
+    ]
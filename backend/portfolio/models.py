@@ -1,51 +1,135 @@
+import zlib
+
 from django.db import models
+from django.utils import timezone
+from .storage import content_addressed_storage
+
+DEFAULT_TENANT_ID = 1  # created by migration 0009; owns the pre-tenancy content
+
+class Tenant(models.Model):
+    # One hosted portfolio, resolved per request by tenancy.TenantMiddleware
+    # from its domain, a <slug>.<TENANT_BASE_DOMAIN> subdomain or /t/<slug>/.
+    slug = models.SlugField(max_length=50, unique=True)
+    name = models.CharField(max_length=100)
+    domain = models.CharField(max_length=253, unique=True, blank=True, null=True)
+
+    def __str__(self):
+        return self.name
+
+class TenantOwned(models.Model):
+    # Every lookup is "this tenant's rows in id order", hence (tenant, id)
+    # instead of the plain FK index.
+    tenant = models.ForeignKey(Tenant, on_delete=models.CASCADE, default=DEFAULT_TENANT_ID, db_index=False)
 
-class Home(models.Model):
+    class Meta:
+        abstract = True
+        indexes = [models.Index(fields=['tenant', 'id'], name='%(class)s_tenant_id_idx')]
+
+class ImageIngestion(models.Model):
+    # New uploads wait in `pending_image` while a background worker (see
+    # ingest.py) optimizes them; the field named by `ingest_field` keeps the
+    # previous image until the processed file is swapped in.
+    READY = 'ready'
+    PROCESSING = 'processing'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(READY, 'Ready'), (PROCESSING, 'Processing'), (FAILED, 'Failed')]
+
+    ingest_field = None
+
+    image_status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=READY, editable=False)
+    pending_image = models.ImageField(upload_to='pending/', storage=content_addressed_storage, blank=True, null=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+class Home(TenantOwned, ImageIngestion):
     title = models.CharField(max_length=100)
     subtitle = models.CharField(max_length=100)
-    image = models.ImageField(upload_to='home_images/', blank=True, null=True)
+    image = models.ImageField(upload_to='home_images/', storage=content_addressed_storage, blank=True, null=True)
     github_url = models.URLField(blank=True, null=True)
     linkedin_url = models.URLField(blank=True, null=True)
     email_address = models.EmailField(blank=True, null=True)
 
+    ingest_field = 'image'
+
     def __str__(self):
         return self.title
 
-class About(models.Model):
+class About(TenantOwned):
     name = models.CharField(max_length=50)
     bio = models.TextField()
-    profile_image = models.ImageField(upload_to='about_images/', blank=True, null=True)
+    profile_image = models.ImageField(upload_to='about_images/', storage=content_addressed_storage, blank=True, null=True)
 
     def __str__(self):
         return self.name
 
-class Skilled(models.Model):
+class Skilled(TenantOwned):
     name = models.CharField(max_length=50)
     bio = models.TextField()
-    profile_image = models.ImageField(upload_to='skill_images/', blank=True, null=True)
+    profile_image = models.ImageField(upload_to='skill_images/', storage=content_addressed_storage, blank=True, null=True)
 
     def __str__(self):
         return self.name
     
-class Skill(models.Model):
+class Skill(TenantOwned):
     skill_name = models.CharField(max_length=50)
     proficiency = models.IntegerField(help_text="Enter a value between 0 and 100")  # e.g., percentage of proficiency
 
     def __str__(self):
         return self.skill_name
 
-class Work(models.Model):
+class Work(TenantOwned, ImageIngestion):
     project_name = models.CharField(max_length=100)
-    project_image = models.ImageField(upload_to='work_images/', blank=True, null=True)
+    project_image = models.ImageField(upload_to='work_images/', storage=content_addressed_storage, blank=True, null=True)
     project_url = models.URLField(blank=True, null=True)
 
+    ingest_field = 'project_image'
+
     def __str__(self):
         return self.project_name
 
-class Contact(models.Model):
+class Contact(TenantOwned):
     name = models.CharField(max_length=50)
     email = models.EmailField()
     message = models.TextField()
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta(TenantOwned.Meta):
+        # created_at drives retention (see retention.py).
+        indexes = TenantOwned.Meta.indexes + [models.Index(fields=['created_at'], name='contact_created_idx')]
 
     def __str__(self):
         return f"Message from {self.name}"
+
+class ContactArchive(TenantOwned):
+    # Contacts moved out of the hot table by retention.py. Name and email stay
+    # plain for lookups; the message body is zlib-compressed.
+    contact_id = models.BigIntegerField()
+    name = models.CharField(max_length=50)
+    email = models.EmailField()
+    message_z = models.BinaryField()
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    @property
+    def message(self):
+        return zlib.decompress(self.message_z).decode('utf-8')
+
+    def __str__(self):
+        return f"Archived message from {self.name}"
+
+class ChangeLog(TenantOwned):
+    # One row per create/update/delete of portfolio content; the id is the
+    # monotonically increasing version served by /api/changes/?since=<id>.
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    ACTION_CHOICES = [(CREATED, 'Created'), (UPDATED, 'Updated'), (DELETED, 'Deleted')]
+
+    model = models.CharField(max_length=20)
+    object_id = models.IntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"#{self.pk} {self.action} {self.model} {self.object_id}"
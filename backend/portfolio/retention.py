@@ -0,0 +1,192 @@
+# retention.py
+# Keeps the Contact table (inserted into by every form submission, listed and
+# searched by the admin) small by moving old messages out of it.
+#
+# archive_old_contacts() works in short transactions of `batch_size` rows:
+# read the oldest expired rows through the created_at index, write them to the
+# archive (ContactArchive with a zlib-compressed message, or an appended gzip
+# NDJSON file per day), delete them by primary key, commit, and optionally
+# pause so writers are never blocked for long. compact() then reclaims space
+# and refreshes planner statistics. search_archive() scans the archive on
+# demand; it is meant for the occasional lookup, not for the hot path.
+import gzip
+import json
+import os
+import time
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Contact, ContactArchive
+from .search import CONTACT_FTS_TABLE
+
+RETENTION_DAYS = getattr(settings, 'CONTACT_RETENTION_DAYS', 365)
+ARCHIVE_TARGET = getattr(settings, 'CONTACT_ARCHIVE_TARGET', 'table')
+ARCHIVE_DIR = getattr(settings, 'CONTACT_ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'archive'))
+BATCH_SIZE = getattr(settings, 'CONTACT_ARCHIVE_BATCH_SIZE', 500)
+# SQLite: VACUUM only when at least this share of the file is free pages.
+VACUUM_FREE_RATIO = getattr(settings, 'CONTACT_VACUUM_FREE_RATIO', 0.2)
+
+TARGETS = ('table', 'ndjson')
+_FIELDS = ('id', 'tenant_id', 'name', 'email', 'message', 'created_at')
+
+
+def cutoff_for(days=RETENTION_DAYS):
+    return timezone.now() - timedelta(days=days)
+
+
+def expired(cutoff):
+    return Contact.objects.filter(created_at__lt=cutoff)
+
+
+def _to_table(rows, archived_at):
+    ContactArchive.objects.bulk_create([
+        ContactArchive(
+            tenant_id=row['tenant_id'], contact_id=row['id'], name=row['name'], email=row['email'],
+            message_z=zlib.compress(row['message'].encode('utf-8')), created_at=row['created_at'],
+            archived_at=archived_at,
+        )
+        for row in rows
+    ])
+
+
+def _to_ndjson(rows, archived_at, directory):
+    # One file per archive day; each batch appends a gzip member, which
+    # gzip.open() reads back as one stream. A crash between the append and
+    # the commit can leave a row in both places, never in neither.
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'contacts-{archived_at:%Y%m%d}.ndjson.gz')
+    lines = ''.join(
+        json.dumps({
+            'contact_id': row['id'], 'tenant_id': row['tenant_id'], 'name': row['name'], 'email': row['email'],
+            'message': row['message'], 'created_at': row['created_at'].isoformat(),
+            'archived_at': archived_at.isoformat(),
+        }) + '\n'
+        for row in rows
+    )
+    with gzip.open(path, 'at', encoding='utf-8') as f:
+        f.write(lines)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def archive_batch(cutoff, target=ARCHIVE_TARGET, batch_size=BATCH_SIZE, directory=ARCHIVE_DIR):
+    """Archive and delete up to `batch_size` expired contacts; returns how many."""
+    if target not in TARGETS:
+        raise ValueError(f"archive target must be one of {TARGETS}, not {target!r}")
+    with transaction.atomic():
+        rows = list(expired(cutoff).order_by('created_at', 'pk').values(*_FIELDS)[:batch_size])
+        if not rows:
+            return 0
+        archived_at = timezone.now()
+        if target == 'table':
+            _to_table(rows, archived_at)
+        else:
+            _to_ndjson(rows, archived_at, directory)
+        Contact.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+    return len(rows)
+
+
+def archive_old_contacts(days=RETENTION_DAYS, target=ARCHIVE_TARGET, batch_size=BATCH_SIZE,
+                         directory=ARCHIVE_DIR, pause=0.0):
+    """Archive everything older than `days`, one short transaction per batch."""
+    cutoff = cutoff_for(days)
+    total = 0
+    while True:
+        moved = archive_batch(cutoff, target, batch_size, directory)
+        total += moved
+        if moved < batch_size:
+            return total
+        if pause:
+            time.sleep(pause)
+
+
+def compact(using='default', force_vacuum=False):
+    """
+    Reclaim space and refresh statistics after archiving. Must run outside a
+    transaction (VACUUM cannot). Returns a list of what was done.
+    """
+    connection = connections[using]
+    if connection.in_atomic_block:
+        raise RuntimeError("compact() cannot run inside a transaction")
+    tables = [Contact._meta.db_table, ContactArchive._meta.db_table]
+    done = []
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [CONTACT_FTS_TABLE])
+            if cursor.fetchone():
+                cursor.execute(f"INSERT INTO {CONTACT_FTS_TABLE}({CONTACT_FTS_TABLE}) VALUES ('optimize')")
+                done.append('fts optimize')
+            cursor.execute('PRAGMA page_count')
+            pages = cursor.fetchone()[0]
+            cursor.execute('PRAGMA freelist_count')
+            free = cursor.fetchone()[0]
+            if pages and (force_vacuum or free / pages >= VACUUM_FREE_RATIO):
+                cursor.execute('VACUUM')
+                done.append(f'vacuum ({free} of {pages} pages free)')
+            for table in tables:
+                cursor.execute(f'ANALYZE {connection.ops.quote_name(table)}')
+            cursor.execute('PRAGMA optimize')
+            done.append('analyze')
+        elif connection.vendor == 'postgresql':
+            # Autovacuum handles space reuse; this just makes it happen now.
+            for table in tables:
+                cursor.execute(f'VACUUM (ANALYZE) {connection.ops.quote_name(table)}')
+            done.append('vacuum analyze')
+    return done
+
+
+def _matches(words, *values):
+    text = ' '.join(values).lower()
+    return all(word in text for word in words)
+
+
+def _archive_files(directory):
+    if not directory or not os.path.isdir(directory):
+        return []
+    names = sorted((n for n in os.listdir(directory) if n.startswith('contacts-') and n.endswith('.ndjson.gz')), reverse=True)
+    return [os.path.join(directory, n) for n in names]
+
+
+def search_archive(term, tenant_id=None, limit=50, directory=ARCHIVE_DIR):
+    """
+    Archived messages whose name, email or message contain every word of
+    `term` (case-insensitive), newest first, from the table and then the
+    NDJSON files (skipped when `directory` is None). Each hit is a dict;
+    table hits carry the archive row `id`.
+    """
+    words = term.lower().split()
+    hits = []
+
+    rows = ContactArchive.objects.order_by('-created_at', '-pk')
+    if tenant_id is not None:
+        rows = rows.filter(tenant_id=tenant_id)
+    for row in rows.iterator(chunk_size=500):
+        message = row.message
+        if _matches(words, row.name, row.email, message):
+            hits.append({
+                'id': row.pk, 'contact_id': row.contact_id, 'tenant_id': row.tenant_id, 'name': row.name,
+                'email': row.email, 'message': message, 'created_at': row.created_at,
+                'archived_at': row.archived_at, 'source': 'table',
+            })
+            if len(hits) >= limit:
+                return hits
+
+    for path in _archive_files(directory):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                if tenant_id is not None and record['tenant_id'] != tenant_id:
+                    continue
+                if _matches(words, record['name'], record['email'], record['message']):
+                    record['created_at'] = parse_datetime(record['created_at'])
+                    record['archived_at'] = parse_datetime(record['archived_at'])
+                    record['source'] = os.path.basename(path)
+                    hits.append(record)
+                    if len(hits) >= limit:
+                        return hits
+    return hits
@@ -0,0 +1,85 @@
+# search.py
+# Full-text search for Contact (see migration 0005_contact_search) and a
+# paginator that avoids COUNT(*) on large, unfiltered changelists.
+import re
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models.expressions import RawSQL
+from django.utils.functional import cached_property
+
+CONTACT_FTS_TABLE = 'portfolio_contact_fts'
+
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+def _tokens(term):
+    # Only word characters reach the MATCH / tsquery syntax.
+    return _TOKEN.findall(term or '')[:16]
+
+
+def search_contacts(queryset, term):
+    """
+    Filter a Contact queryset through the full-text index; every word must
+    match (as a prefix). Returns None when the database has no index, so the
+    caller can fall back to icontains.
+    """
+    tokens = _tokens(term)
+    if not tokens:
+        return queryset.none()
+
+    vendor = connections[queryset.db].vendor
+    table = queryset.model._meta.db_table
+    if vendor == 'sqlite':
+        match = ' '.join('"%s"*' % t for t in tokens)
+        ids = RawSQL(f'SELECT rowid FROM {CONTACT_FTS_TABLE} WHERE {CONTACT_FTS_TABLE} MATCH %s', (match,))
+    elif vendor == 'postgresql':
+        tsquery = ' & '.join('%s:*' % t for t in tokens)
+        ids = RawSQL(f"SELECT id FROM {table} WHERE search_vector @@ to_tsquery('simple', %s)", (tsquery,))
+    else:
+        return None
+    return queryset.filter(pk__in=ids)
+
+
+def estimated_row_count(model, using='default'):
+    """Cheap row estimate for a whole table, or None if the backend has none."""
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [table])
+            row = cursor.fetchone()
+        elif connection.vendor == 'sqlite':
+            # Row count recorded by the last ANALYZE (retention.compact() runs
+            # one after archiving); max(rowid) would keep counting deleted rows.
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+            if not cursor.fetchone():
+                return None
+            cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s', [table])
+            stat = cursor.fetchone()
+            row = (int(stat[0].split()[0]),) if stat and stat[0] else None
+        else:
+            return None
+    if not row or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    # Below this many rows an exact count is cheap enough.
+    estimate_threshold = 10000
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        query = getattr(qs, 'query', None)
+        if query is not None and not query.where:
+            # Small tables (or a stale estimate of a now small one) get an
+            # exact count, bounded so it never scans a large table.
+            bounded = qs.order_by()[:self.estimate_threshold + 1].count()
+            if bounded <= self.estimate_threshold:
+                return bounded
+            estimate = estimated_row_count(qs.model, qs.db)
+            if estimate is not None and estimate > self.estimate_threshold:
+                return estimate
+        return super().count
@@ -6,20 +6,20 @@ class HomeSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Home
-        fields = '__all__'
+        exclude = ('tenant', 'pending_image', 'image_status')
 
     def get_image(self, obj):
         request = self.context.get('request')
-        if request is not None:
+        if obj.image and request:
             return request.build_absolute_uri(obj.image.url)
-        return obj.image.url
+        return obj.image.url if obj.image else None
 
 class AboutSerializer(serializers.ModelSerializer):
     profile_image = serializers.SerializerMethodField()
 
     class Meta:
         model = About
-        fields = '__all__'
+        exclude = ('tenant',)
 
     def get_profile_image(self, obj):
         request = self.context.get('request')
@@ -32,7 +32,7 @@ class SkilledSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Skilled
-        fields = '__all__'
+        exclude = ('tenant',)
 
     def get_profile_image(self, obj):
         request = self.context.get('request')
@@ -43,14 +43,14 @@ class SkilledSerializer(serializers.ModelSerializer):
 class SkillSerializer(serializers.ModelSerializer):
     class Meta:
         model = Skill
-        fields = '__all__'
+        exclude = ('tenant',)
 
 class WorkSerializer(serializers.ModelSerializer):
     project_image = serializers.SerializerMethodField()
 
     class Meta:
         model = Work
-        fields = '__all__'
+        exclude = ('tenant', 'pending_image', 'image_status')
 
     def get_project_image(self, obj):
         request = self.context.get('request')
@@ -61,4 +61,4 @@ class WorkSerializer(serializers.ModelSerializer):
 class ContactSerializer(serializers.ModelSerializer):
     class Meta:
         model = Contact
-        fields = '__all__'
+        exclude = ('tenant',)
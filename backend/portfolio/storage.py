@@ -0,0 +1,111 @@
+# storage.py
+# Content-addressed media storage: uploads are stored as
+# blobs/<sha256[:2]>/<sha256><ext>, so identical files share one blob no
+# matter how often (or under which field) they are uploaded. Blob URLs never
+# change content, which makes them safe to cache forever downstream.
+#
+# Reference counts come from the database (rows pointing at a name), so there
+# is no counter to drift; `manage.py dedupe_media` migrates legacy files and
+# garbage-collects unreferenced blobs.
+#
+# A save can hand out an existing blob before the row that will reference it
+# is committed, so saving refreshes the blob's mtime and delete() leaves blobs
+# used within BLOB_GRACE_SECONDS alone; `dedupe_media` collects them later if
+# they stay unreferenced.
+import hashlib
+import os
+import time
+import uuid
+from collections import Counter
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+BLOB_DIR = 'blobs'
+# Unreferenced blobs saved more recently than this may be about to be referenced.
+BLOB_GRACE_SECONDS = 600
+
+
+def content_hash(content, chunk_size=64 * 1024):
+    # `content` is a django File; chunks() rewinds it first.
+    digest = hashlib.sha256()
+    for chunk in content.chunks(chunk_size):
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+def blob_name(digest, original_name):
+    ext = os.path.splitext(original_name)[1].lower()
+    return f'{BLOB_DIR}/{digest[:2]}/{digest}{ext}'
+
+
+def is_blob(name):
+    return bool(name) and name.replace('\\', '/').startswith(BLOB_DIR + '/')
+
+
+def content_addressed_fields():
+    """(model, field) pairs whose files live in a ContentAddressedStorage."""
+    from django.apps import apps
+
+    for model in apps.get_models():
+        for field in model._meta.get_fields():
+            if isinstance(getattr(field, 'storage', None), ContentAddressedStorage):
+                yield model, field
+
+
+def reference_counts():
+    """Counter of stored file name -> number of rows referencing it."""
+    counts = Counter()
+    for model, field in content_addressed_fields():
+        names = model._default_manager.exclude(**{field.name: ''}).exclude(**{f'{field.name}__isnull': True})
+        counts.update(names.values_list(field.name, flat=True))
+    return counts
+
+
+def is_referenced(name):
+    """Whether any row points at `name` (one indexed lookup per field)."""
+    return any(
+        model._default_manager.filter(**{field.name: name}).exists()
+        for model, field in content_addressed_fields()
+    )
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+
+    def get_available_name(self, name, max_length=None):
+        # The final name is decided by the content in _save; never suffix.
+        return name
+
+    def _save(self, name, content):
+        name = blob_name(content_hash(content), name)
+        if self.exists(name):
+            try:
+                # Mark it as in use so a concurrent delete() keeps it.
+                os.utime(self.path(name))
+                return name
+            except FileNotFoundError:
+                pass  # deleted meanwhile: write it again
+        # Write under a unique temporary name, then rename into place: readers
+        # never see a partial blob, and a concurrent identical upload just
+        # replaces it with the same bytes.
+        tmp = super()._save(f'{BLOB_DIR}/tmp/{uuid.uuid4().hex}', content)
+        os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+        os.replace(self.path(tmp), self.path(name))
+        return name
+
+    def delete(self, name):
+        # Blobs can be shared; only drop them once nothing points at them.
+        if is_blob(name) and (self.recently_used(name) or is_referenced(name)):
+            return
+        super().delete(name)
+
+    def recently_used(self, name):
+        try:
+            return time.time() - os.path.getmtime(self.path(name)) < BLOB_GRACE_SECONDS
+        except FileNotFoundError:
+            return False
+
+
+content_addressed_storage = ContentAddressedStorage()
@@ -0,0 +1,141 @@
+# surrogate.py
+# Cache tagging for a caching reverse proxy / CDN in front of the site.
+#
+# Views tag responses with surrogate keys for the rows they contain
+# ("t1:work" for the collection, "t1:work:3" per row, tenant-prefixed);
+# SurrogateKeyMiddleware turns the tags into a Surrogate-Key header plus
+# Cache-Control with a long s-maxage. When content changes, the change-log
+# signals (changes.py) queue the affected keys on `purger`, which sends them
+# in batches to CACHE_PURGE_URL, so the proxy can cache for a long time and
+# still never serve stale content for long.
+#
+# `manage.py cache_proxy` is a small stand-in proxy that honours all of this.
+import atexit
+import logging
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+
+logger = logging.getLogger(__name__)
+
+CACHE_S_MAXAGE = getattr(settings, 'CACHE_S_MAXAGE', 86400)
+CACHE_MAX_AGE = getattr(settings, 'CACHE_MAX_AGE', 60)
+SURROGATE_KEY_HEADER = getattr(settings, 'SURROGATE_KEY_HEADER', 'Surrogate-Key')
+
+
+def collection_key(tenant_id, model):
+    return f't{tenant_id}:{model._meta.model_name}'
+
+
+def instance_key(tenant_id, model, pk):
+    return f'{collection_key(tenant_id, model)}:{pk}'
+
+
+def keys_for(tenant_id, model, objs):
+    keys = [collection_key(tenant_id, model)]
+    keys += [instance_key(tenant_id, model, obj.pk) for obj in objs if obj is not None]
+    return keys
+
+
+def tag(request, keys):
+    request = getattr(request, '_request', request)  # DRF Request -> HttpRequest
+    request.surrogate_keys = getattr(request, 'surrogate_keys', set()) | set(keys)
+
+
+class SurrogateKeyMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        keys = getattr(request, 'surrogate_keys', None)
+        if not keys or request.method not in ('GET', 'HEAD') or response.status_code != 200:
+            return response
+        response[SURROGATE_KEY_HEADER] = ' '.join(sorted(keys))
+        if response.has_header('Cache-Control'):
+            return response
+        # Pages that vary on the cookie (CSRF token, flash messages, a read
+        # session) must not be shared between visitors. This middleware sits
+        # above SessionMiddleware, so the session's Vary: Cookie is seen here.
+        if response.cookies or 'cookie' in response.get('Vary', '').lower():
+            patch_cache_control(response, private=True, max_age=0)
+        else:
+            patch_cache_control(response, public=True, max_age=CACHE_MAX_AGE, s_maxage=CACHE_S_MAXAGE)
+        return response
+
+
+class PurgeDispatcher:
+    """Collects surrogate keys and POSTs them to the purge endpoint in batches."""
+
+    def __init__(self, url, headers=None, batch_window=0.5, max_batch=256, max_attempts=3, timeout=5):
+        self.url = url
+        self.headers = headers or {}
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        self._pending = set()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._session = requests.Session()
+        self.sent_batches = 0
+        self.failed_batches = 0
+
+    def purge(self, keys):
+        if not self.url:
+            return
+        with self._cond:
+            self._pending.update(keys)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='cache-purge', daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+        # Let a burst of saves (admin bulk edits, imports) coalesce.
+        time.sleep(self.batch_window)
+        with self._cond:
+            batch = sorted(self._pending)[:self.max_batch]
+            self._pending.difference_update(batch)
+        return batch
+
+    def _run(self):
+        while True:
+            self._send(self._take_batch())
+
+    def _send(self, batch):
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                response = self._session.post(
+                    self.url, json={'surrogate_keys': batch}, headers=self.headers, timeout=self.timeout,
+                )
+                if response.status_code < 300:
+                    self.sent_batches += 1
+                    return
+                error = f'HTTP {response.status_code}'
+            except requests.RequestException as e:
+                error = str(e)
+            if attempt < self.max_attempts:
+                time.sleep(min(2 ** attempt, 10))
+        self.failed_batches += 1
+        logger.warning("Cache purge of %d key(s) failed: %s", len(batch), error)
+
+    def flush(self):
+        """Send whatever is pending now (used at exit)."""
+        with self._cond:
+            batch, self._pending = sorted(self._pending), set()
+        for i in range(0, len(batch), self.max_batch):
+            self._send(batch[i:i + self.max_batch])
+
+
+purger = PurgeDispatcher(
+    getattr(settings, 'CACHE_PURGE_URL', ''),
+    headers=getattr(settings, 'CACHE_PURGE_HEADERS', {}),
+)
+atexit.register(purger.flush)
@@ -0,0 +1,124 @@
+# tenancy.py
+# Per-request tenant resolution and tenant-scoped caching.
+#
+# TenantMiddleware sets `request.tenant` from, in order:
+#   1. an exact Tenant.domain match on the host,
+#   2. a <slug>.<TENANT_BASE_DOMAIN> subdomain,
+#   3. a /t/<slug>/ path prefix (stripped from path_info so the normal URL
+#      patterns match, and installed as the script prefix for the request so
+#      reverse() and redirects stay under it),
+# and falls back to the default tenant. Lookups go through a small in-process
+# map with a TTL, so resolving a tenant is a dict hit whatever the number of
+# tenants; a miss is one unique-index query.
+#
+# Cached content is keyed by (tenant, content generation), where the
+# generation is the tenant's latest ChangeLog version, so any content change
+# moves readers to fresh keys instead of deleting old ones.
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.http import Http404
+from django.urls import get_script_prefix, set_script_prefix
+
+from .models import DEFAULT_TENANT_ID, ChangeLog, Tenant
+
+TENANT_BASE_DOMAIN = getattr(settings, 'TENANT_BASE_DOMAIN', '')
+TENANT_PATH_PREFIX = '/t/'
+LOOKUP_TTL = getattr(settings, 'TENANT_LOOKUP_TTL', 60)
+CONTENT_CACHE_TTL = getattr(settings, 'TENANT_CONTENT_CACHE_TTL', 300)
+
+_lookups = {}  # ('domain'|'slug'|'id', value) -> (expires_at, Tenant | None)
+_lookups_lock = threading.Lock()
+MAX_LOOKUPS = 100_000
+
+
+def _lookup(kind, value):
+    key = (kind, value)
+    hit = _lookups.get(key)
+    now = time.monotonic()
+    if hit is not None and hit[0] > now:
+        return hit[1]
+    tenant = Tenant.objects.filter(**{kind: value}).first()
+    with _lookups_lock:
+        if len(_lookups) >= MAX_LOOKUPS:
+            _lookups.clear()
+        _lookups[key] = (now + LOOKUP_TTL, tenant)
+    return tenant
+
+
+def clear_lookups(**kwargs):
+    with _lookups_lock:
+        _lookups.clear()
+
+
+post_save.connect(clear_lookups, sender=Tenant, dispatch_uid='tenancy-clear-save')
+post_delete.connect(clear_lookups, sender=Tenant, dispatch_uid='tenancy-clear-delete')
+
+
+def resolve_tenant(request):
+    host = request.get_host().split(':')[0].lower()
+    tenant = _lookup('domain', host)
+    if tenant is not None:
+        return tenant
+
+    if TENANT_BASE_DOMAIN and host.endswith('.' + TENANT_BASE_DOMAIN):
+        slug = host[:-len(TENANT_BASE_DOMAIN) - 1]
+        tenant = _lookup('slug', slug)
+        if tenant is None:
+            raise Http404("Unknown portfolio.")
+        return tenant
+
+    path = request.path_info
+    if path.startswith(TENANT_PATH_PREFIX):
+        slug, _, rest = path[len(TENANT_PATH_PREFIX):].partition('/')
+        tenant = _lookup('slug', slug)
+        if tenant is None:
+            raise Http404("Unknown portfolio.")
+        prefix = f'{TENANT_PATH_PREFIX}{slug}'
+        request.path_info = '/' + rest
+        request.META['SCRIPT_NAME'] = request.META.get('SCRIPT_NAME', '') + prefix
+        return tenant
+
+    return _lookup('id', DEFAULT_TENANT_ID)
+
+
+class TenantMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        script_name = request.META.get('SCRIPT_NAME', '')
+        request.tenant = resolve_tenant(request)
+        if request.META.get('SCRIPT_NAME', '') == script_name:
+            return self.get_response(request)
+        # The script prefix is per thread; put it back for the next request.
+        previous = get_script_prefix()
+        set_script_prefix(request.META['SCRIPT_NAME'])
+        try:
+            return self.get_response(request)
+        finally:
+            set_script_prefix(previous)
+
+
+# ----------------------------
+# Tenant-scoped content cache
+# ----------------------------
+def content_generation(tenant_id):
+    # The tenant's latest change-log version: one (tenant, id) index probe,
+    # and correct across processes even with a per-process cache backend.
+    return ChangeLog.objects.filter(tenant_id=tenant_id).order_by('-pk').values_list('pk', flat=True).first() or 0
+
+
+def tenant_cached(request, name, build, timeout=CONTENT_CACHE_TTL):
+    """`build()` once per (tenant, content generation, name, origin)."""
+    tenant_id = request.tenant.pk
+    origin = request.build_absolute_uri('/')
+    key = f'portfolio:tenant:{tenant_id}:{content_generation(tenant_id)}:{name}:{origin}'
+    value = cache.get(key)
+    if value is None:
+        value = build()
+        cache.set(key, value, timeout)
+    return value
@@ -1,3 +1,783 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import os
+import socket
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import urlencode
 
-# Create your tests here.
+import requests
+from django.contrib.admin.sites import site
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.test import LiveServerTestCase, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import get_script_prefix, reverse
+from django.utils import timezone
+from PIL import Image
+
+from . import capture, catalog, ingest, retention, storage, surrogate, tenancy
+from .changes import changes_since
+from .models import DEFAULT_TENANT_ID, ChangeLog, Contact, ContactArchive, Skill, Tenant, Work
+from .admin import ContactAdmin
+from .search import EstimatedCountPaginator, estimated_row_count, search_contacts
+
+
+def analyze():
+    with connection.cursor() as cursor:
+        cursor.execute('ANALYZE')
+
+
+def use_temp_media(test):
+    """Point MEDIA_ROOT at a temporary directory for the rest of `test`."""
+    media = tempfile.TemporaryDirectory()
+    test.addCleanup(media.cleanup)
+    media_root = override_settings(MEDIA_ROOT=media.name)
+    media_root.enable()
+    test.addCleanup(media_root.disable)
+    return media.name
+
+
+def png_bytes(size=(40, 30), color=(200, 10, 10), mode='RGB', **save_options):
+    out = io.BytesIO()
+    Image.new(mode, size, color).save(out, 'PNG', **save_options)
+    return out.getvalue()
+
+
+class SmallThresholdPaginator(EstimatedCountPaginator):
+    estimate_threshold = 5
+
+
+class EstimatedCountPaginatorTests(TestCase):
+    def add_contacts(self, n):
+        Contact.objects.bulk_create([Contact(name='n', email='e@example.com', message='m') for _ in range(n)])
+
+    def test_small_tables_are_counted_exactly(self):
+        self.add_contacts(3)
+        self.assertEqual(SmallThresholdPaginator(Contact.objects.order_by('pk'), 2).count, 3)
+
+    def test_large_tables_use_the_analyze_estimate(self):
+        self.add_contacts(20)
+        analyze()
+        self.assertEqual(estimated_row_count(Contact), 20)
+        self.assertEqual(SmallThresholdPaginator(Contact.objects.order_by('pk'), 2).count, 20)
+
+    def test_deleted_rows_are_not_counted(self):
+        self.add_contacts(20)
+        analyze()
+        Contact.objects.filter(pk__in=Contact.objects.order_by('pk').values('pk')[:17]).delete()
+        # Stale statistics, but the bounded count sees the table is small now.
+        self.assertEqual(SmallThresholdPaginator(Contact.objects.order_by('pk'), 2).count, 3)
+        self.add_contacts(7)
+        analyze()
+        self.assertEqual(SmallThresholdPaginator(Contact.objects.order_by('pk'), 2).count, 10)
+
+    def test_filtered_querysets_are_counted_exactly(self):
+        self.add_contacts(20)
+        Contact.objects.create(name='other', email='o@example.com', message='m')
+        analyze()
+        self.assertEqual(SmallThresholdPaginator(Contact.objects.filter(name='other').order_by('pk'), 2).count, 1)
+
+
+class ContactSearchTests(TestCase):
+    def setUp(self):
+        self.jonathan = Contact.objects.create(name='Jonathan Smith', email='jon@example.com', message='Hello there')
+        self.zoe = Contact.objects.create(name='Zoë Müller', email='zoe@example.de', message='Привет, как дела?')
+        Contact.objects.create(name='Ann', email='ann@example.com', message='He said "hi" OR (maybe) NOT -x*')
+
+    def names(self, term):
+        return sorted(search_contacts(Contact.objects.all(), term).values_list('name', flat=True))
+
+    def test_every_word_matches_as_a_prefix(self):
+        self.assertEqual(self.names('jon'), ['Jonathan Smith'])
+        self.assertEqual(self.names('jonat smi'), ['Jonathan Smith'])
+        self.assertEqual(self.names('jon zoe'), [])
+        self.assertEqual(self.names('example'), ['Ann', 'Jonathan Smith', 'Zoë Müller'])
+
+    def test_unicode_and_diacritics(self):
+        self.assertEqual(self.names('zoe muller'), ['Zoë Müller'])
+        self.assertEqual(self.names('Müll'), ['Zoë Müller'])
+        self.assertEqual(self.names('прив'), ['Zoë Müller'])
+
+    def test_quotes_and_operators_are_plain_words(self):
+        for term in ('"hi" OR', 'NOT (maybe', 'said -x*', 'ann" OR "*', 'OR(hi maybe)'):
+            self.assertEqual(self.names(term), ['Ann'], term)
+        self.assertEqual(self.names('" * ( -'), [])
+
+    def test_triggers_keep_the_index_in_sync(self):
+        self.jonathan.name = 'Johnny Walker'
+        self.jonathan.save()
+        self.assertEqual(self.names('jonathan'), [])
+        self.assertEqual(self.names('walk'), ['Johnny Walker'])
+        Contact.objects.filter(pk=self.zoe.pk).update(message='Guten Tag')
+        self.assertEqual(self.names('прив'), [])
+        self.assertEqual(self.names('guten'), ['Zoë Müller'])
+        self.zoe.delete()
+        self.assertEqual(self.names('zoe'), [])
+
+    def test_admin_search_uses_the_index(self):
+        request = RequestFactory().get('/admin/portfolio/contact/', {'q': 'jon hello'})
+        results, may_have_duplicates = ContactAdmin(Contact, site).get_search_results(
+            request, Contact.objects.all(), 'jon hello')
+        self.assertEqual(list(results), [self.jonathan])
+        self.assertFalse(may_have_duplicates)
+
+
+class ChangesSinceTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.get(pk=DEFAULT_TENANT_ID)
+        self.start = ChangeLog.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+    def test_collapses_to_the_latest_action_per_object(self):
+        created = Skill.objects.create(skill_name='Python', proficiency=50)
+        created.proficiency = 90
+        created.save()
+        gone = Skill.objects.create(skill_name='Perl', proficiency=10)
+        gone_id = gone.pk
+        gone.delete()
+
+        changes, version, has_more = changes_since(self.tenant, self.start)
+        by_id = {c['id']: c for c in changes}
+        self.assertEqual(len(changes), 2)
+        self.assertEqual(by_id[created.pk]['action'], ChangeLog.CREATED)
+        self.assertEqual(by_id[created.pk]['data']['proficiency'], 90)
+        self.assertEqual(by_id[gone_id]['action'], ChangeLog.DELETED)
+        self.assertIsNone(by_id[gone_id]['data'])
+        self.assertEqual(version, ChangeLog.objects.latest('pk').pk)
+        self.assertFalse(has_more)
+
+    def test_updates_since_a_later_version_stay_updates(self):
+        skill = Skill.objects.create(skill_name='Go', proficiency=50)
+        since = ChangeLog.objects.latest('pk').pk
+        skill.proficiency = 60
+        skill.save()
+        changes, _, _ = changes_since(self.tenant, since)
+        self.assertEqual([c['action'] for c in changes], [ChangeLog.UPDATED])
+
+    def test_limit_pages_through_the_log(self):
+        for i in range(3):
+            Skill.objects.create(skill_name=f'S{i}', proficiency=i)
+        first, version, has_more = changes_since(self.tenant, self.start, limit=2)
+        self.assertEqual(len(first), 2)
+        self.assertTrue(has_more)
+        rest, _, has_more = changes_since(self.tenant, version, limit=2)
+        self.assertEqual(len(rest), 1)
+        self.assertFalse(has_more)
+        # A limit below 1 still makes progress instead of failing.
+        clamped, _, _ = changes_since(self.tenant, self.start, limit=0)
+        self.assertEqual(len(clamped), 1)
+
+    def test_other_tenants_changes_are_not_visible(self):
+        other = Tenant.objects.create(slug='other', name='Other')
+        Skill.objects.create(tenant=other, skill_name='Hidden', proficiency=1)
+        changes, version, _ = changes_since(self.tenant, self.start)
+        self.assertEqual((changes, version), ([], self.start))
+
+    def test_api_clamps_and_validates_limit(self):
+        for i in range(2):
+            Skill.objects.create(skill_name=f'S{i}', proficiency=i)
+        for limit, expected in (('-3', 1), ('0', 1), ('1', 1), ('100000', 2)):
+            response = self.client.get('/api/changes/', {'since': self.start, 'limit': limit})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()['changes']), expected, limit)
+        self.assertEqual(self.client.get('/api/changes/', {'limit': 'x'}).status_code, 400)
+
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class ResolveTenantTests(TestCase):
+    def setUp(self):
+        tenancy.clear_lookups()
+        self.addCleanup(tenancy.clear_lookups)
+        self.acme = Tenant.objects.create(slug='acme', name='Acme', domain='portfolio.acme.test')
+        self.factory = RequestFactory()
+
+    def resolve(self, path='/', host='example.com'):
+        request = self.factory.get(path, HTTP_HOST=host)
+        return request, tenancy.resolve_tenant(request)
+
+    def test_exact_domain(self):
+        self.assertEqual(self.resolve(host='portfolio.acme.test:8000')[1], self.acme)
+
+    def test_subdomain_of_the_base_domain(self):
+        with mock.patch.object(tenancy, 'TENANT_BASE_DOMAIN', 'folio.test'):
+            self.assertEqual(self.resolve(host='acme.folio.test')[1], self.acme)
+            with self.assertRaises(Http404):
+                self.resolve(host='nobody.folio.test')
+
+    def test_path_prefix_is_stripped(self):
+        request, tenant = self.resolve('/t/acme/api/home/')
+        self.assertEqual(tenant, self.acme)
+        self.assertEqual(request.path_info, '/api/home/')
+        self.assertEqual(request.META['SCRIPT_NAME'], '/t/acme')
+        with self.assertRaises(Http404):
+            self.resolve('/t/nobody/')
+
+    def test_default_tenant_otherwise(self):
+        request, tenant = self.resolve('/api/home/')
+        self.assertEqual(tenant.pk, DEFAULT_TENANT_ID)
+        self.assertEqual(request.path_info, '/api/home/')
+
+    def test_lookups_are_cleared_when_a_tenant_changes(self):
+        self.assertEqual(self.resolve(host='portfolio.acme.test')[1], self.acme)
+        self.acme.domain = 'acme.example'
+        self.acme.save()
+        self.assertEqual(self.resolve(host='portfolio.acme.test')[1].pk, DEFAULT_TENANT_ID)
+
+    @mock.patch('portfolio.views.send_telegram_message')
+    def test_redirects_stay_under_the_path_prefix(self, send):
+        response = self.client.post('/t/acme/', {'flname': 'Ann', 'email': 'ann@example.com', 'message': 'Hi'})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response['Location'], '/t/acme/')
+        self.assertEqual(Contact.objects.get(name='Ann').tenant, self.acme)
+        # The prefix does not leak into later requests on this thread.
+        self.assertEqual(get_script_prefix(), '/')
+        self.assertEqual(reverse('index'), '/')
+
+
+class BenchTenantsTests(TestCase):
+    def test_runs_without_touching_the_site_cache(self):
+        from django.core.cache import cache
+
+        cache.set('site-key', 'kept')
+        self.addCleanup(cache.delete, 'site-key')
+        out = io.StringIO()
+        call_command('bench_tenants', tenants='2,3', requests=3, rows=1, stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 3)
+        self.assertEqual(cache.get('site-key'), 'kept')
+        self.assertFalse(Tenant.objects.filter(slug__startswith='bench-').exists())
+
+
+class ArchiveBatchTests(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.cutoff = now - timedelta(days=30)
+        for i in range(5):
+            Contact.objects.create(
+                name=f'old{i}', email=f'old{i}@example.com', message=f'old message {i}',
+                created_at=now - timedelta(days=60 + i),
+            )
+        self.recent = Contact.objects.create(name='new', email='new@example.com', message='recent', created_at=now)
+
+    def test_moves_oldest_expired_rows_to_the_table(self):
+        self.assertEqual(retention.archive_batch(self.cutoff, 'table', batch_size=2), 2)
+        archived = ContactArchive.objects.order_by('created_at')
+        # Oldest first: old4 and old3.
+        self.assertEqual([a.name for a in archived], ['old4', 'old3'])
+        self.assertEqual(archived[0].message, 'old message 4')
+        self.assertFalse(Contact.objects.filter(name__in=['old4', 'old3']).exists())
+
+    def test_stops_at_the_cutoff(self):
+        self.assertEqual(retention.archive_old_contacts(days=30, target='table', batch_size=2), 5)
+        self.assertEqual(list(Contact.objects.all()), [self.recent])
+        self.assertEqual(retention.archive_batch(self.cutoff, 'table'), 0)
+
+    def test_ndjson_target_and_search(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertEqual(retention.archive_batch(self.cutoff, 'ndjson', batch_size=10, directory=directory), 5)
+            [name] = os.listdir(directory)
+            with gzip.open(os.path.join(directory, name), 'rt', encoding='utf-8') as f:
+                records = [json.loads(line) for line in f]
+            self.assertEqual(len(records), 5)
+            hits = retention.search_archive('MESSAGE 2', directory=directory)
+            self.assertEqual([h['name'] for h in hits], ['old2'])
+        self.assertEqual(Contact.objects.count(), 1)
+
+    def test_rejects_unknown_targets(self):
+        with self.assertRaises(ValueError):
+            retention.archive_batch(self.cutoff, 'tape')
+        self.assertEqual(Contact.objects.count(), 6)
+
+
+class ImportCatalogTests(TestCase):
+    def setUp(self):
+        self.tenant = Tenant.objects.get(pk=DEFAULT_TENANT_ID)
+        use_temp_media(self)
+        self.dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.dir.cleanup)
+        Image.new('RGB', (40, 30), (200, 10, 10)).save(os.path.join(self.dir.name, 'logo.png'))
+
+    def run_import(self, data, filename='catalog.json', **kwargs):
+        entries = catalog.parse_catalog(data.encode(), filename)
+        return catalog.import_catalog(entries, self.tenant, base_dir=self.dir.name, **kwargs)
+
+    def test_creates_then_updates_by_name(self):
+        Skill.objects.create(skill_name='Python', proficiency=10)
+        result = self.run_import(json.dumps({
+            'skills': [{'skill_name': 'Python', 'proficiency': 90}, {'skill_name': 'Rust', 'proficiency': '60'}],
+            'work': [{'project_name': 'Site', 'project_url': 'https://example.com', 'project_image': 'logo.png'}],
+        }))
+        self.assertEqual(result.created, {Work: 1, Skill: 1})
+        self.assertEqual(result.updated, {Work: 0, Skill: 1})
+        self.assertEqual(result.errors, [])
+        self.assertEqual(Skill.objects.get(skill_name='Python').proficiency, 90)
+        work = Work.objects.get(project_name='Site')
+        self.assertTrue(work.project_image.name.startswith('blobs/'))
+        self.assertEqual(work.image_status, Work.READY)
+
+    def test_unchanged_rows_are_not_written(self):
+        data = 'skill_name,proficiency\nPython,90\nRust,60\n'
+        self.run_import(data, 'skills.csv')
+        version = ChangeLog.objects.latest('pk').pk
+        result = self.run_import(data, 'skills.csv')
+        self.assertEqual(result.unchanged, 2)
+        self.assertEqual(result.written, 0)
+        self.assertEqual(ChangeLog.objects.latest('pk').pk, version)
+
+    def test_same_image_is_stored_once(self):
+        rows = [{'project_name': f'P{i}', 'project_image': 'logo.png'} for i in range(3)]
+        result = self.run_import(json.dumps(rows))
+        self.assertEqual(result.images, 1)
+        self.assertEqual(len(set(Work.objects.values_list('project_image', flat=True))), 1)
+        # Re-importing the same image leaves the rows untouched.
+        self.assertEqual(self.run_import(json.dumps(rows)).unchanged, 3)
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        result = self.run_import(json.dumps([
+            {'skill_name': 'Too much', 'proficiency': 150},
+            {'skill_name': 'NaN', 'proficiency': 'abc'},
+            {'project_name': 'Bad url', 'project_url': 'not a url'},
+            {'project_name': 'Missing image', 'project_image': 'nope.png'},
+            {'name': 'unknown kind'},
+            {'skill_name': 'Ok', 'proficiency': 1},
+            {'skill_name': 'Ok', 'proficiency': 2},
+        ]))
+        self.assertEqual(len(result.errors), 6)
+        self.assertEqual(list(Skill.objects.values_list('skill_name', 'proficiency')), [('Ok', 1)])
+        self.assertFalse(Work.objects.exists())
+
+    def test_one_change_log_entry_per_row_and_a_single_purge(self):
+        with mock.patch('portfolio.changes.purger') as purger:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.run_import(json.dumps({'skills': [{'skill_name': f'S{i}', 'proficiency': i} for i in range(5)]}),
+                                batch_size=2)
+        self.assertEqual(ChangeLog.objects.filter(model='skills', action=ChangeLog.CREATED).count(), 5)
+        purger.purge.assert_called_once_with(['t1:skill'])
+
+    def test_dry_run_writes_nothing(self):
+        result = self.run_import(json.dumps([{'project_name': 'Site', 'project_image': 'logo.png'}]), dry_run=True)
+        self.assertEqual(result.created[Work], 1)
+        self.assertFalse(Work.objects.exists())
+
+    def test_an_imported_image_supersedes_a_pending_upload(self):
+        Work.objects.create(project_name='Site', pending_image='pending/upload.png', image_status=Work.PROCESSING)
+        self.run_import(json.dumps([{'project_name': 'Site', 'project_image': 'logo.png'}]))
+        work = Work.objects.get(project_name='Site')
+        self.assertFalse(work.pending_image)
+        self.assertEqual(work.image_status, Work.READY)
+        self.assertTrue(work.project_image.name.startswith('blobs/'))
+
+    def fetch(self, url, responses, addresses=('93.184.216.34',)):
+        """catalog._read_image(url) with canned responses and DNS answers."""
+        def getaddrinfo(host, port, **kwargs):
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, '', (addresses[0] if host != 'internal.test' else '10.0.0.5', port))]
+
+        session = mock.Mock()
+        session.get.side_effect = responses
+        with mock.patch('socket.getaddrinfo', getaddrinfo), mock.patch.object(catalog, '_session', return_value=session):
+            try:
+                return catalog._read_image(url, None)
+            finally:
+                self.requested = [call.args[0] for call in session.get.call_args_list]
+
+    def response(self, status=200, body=b'', **headers):
+        response = mock.MagicMock(status_code=status, headers=headers, is_redirect='Location' in headers)
+        response.__enter__.return_value = response
+        response.raw.read.side_effect = lambda n, decode_content: body[:n]
+        return response
+
+    def test_image_urls_must_be_public_http(self):
+        for url, addresses in (('ftp://example.com/a.png', None), ('http://localhost/a.png', ('127.0.0.1',)),
+                               ('http://metadata/a.png', ('169.254.169.254',)), ('http://[::1]/a.png', ('::1',))):
+            with self.subTest(url=url), self.assertRaises(catalog.CatalogError):
+                self.fetch(url, [], addresses or ('93.184.216.34',))
+            self.assertEqual(self.requested, [])
+
+    def test_redirects_are_checked_too(self):
+        self.assertEqual(self.fetch('http://example.com/a.png', [
+            self.response(302, Location='/b.png'), self.response(body=b'png'),
+        ]), b'png')
+        self.assertEqual(self.requested, ['http://example.com/a.png', 'http://example.com/b.png'])
+        with self.assertRaisesRegex(catalog.CatalogError, 'non-public'):
+            self.fetch('http://example.com/a.png', [self.response(302, Location='http://internal.test/')])
+        self.assertEqual(self.requested, ['http://example.com/a.png'])
+
+    def test_response_size_is_capped(self):
+        with mock.patch.object(catalog, 'IMAGE_MAX_BYTES', 10):
+            with self.assertRaisesRegex(catalog.CatalogError, 'larger than'):
+                self.fetch('http://example.com/a.png', [self.response(body=b'x', **{'Content-Length': '11'})])
+            with self.assertRaisesRegex(catalog.CatalogError, 'larger than'):
+                self.fetch('http://example.com/a.png', [self.response(body=b'x' * 100)])
+
+    def test_unreadable_catalogs(self):
+        for data, name in (('{bad', 'x.json'), ('', 'x.csv'), ('{"projects": []}', 'x.json')):
+            with self.assertRaises(catalog.CatalogError):
+                catalog.parse_catalog(data.encode(), name)
+
+
+class SurrogateKeyTests(TestCase):
+    def setUp(self):
+        Skill.objects.create(skill_name='Python', proficiency=90)
+
+    def test_api_responses_are_shared_and_tagged(self):
+        session = SessionStore()
+        session['seen'] = True
+        session.create()
+        for cookies in ({}, {'sessionid': session.session_key}):
+            self.client.cookies.clear()
+            self.client.cookies.load(cookies)
+            response = self.client.get('/api/skills/')
+            self.assertEqual(response['Cache-Control'], 'public, max-age=60, s-maxage=86400')
+            self.assertNotIn('cookie', response['Vary'].lower())
+            keys = response[surrogate.SURROGATE_KEY_HEADER].split()
+            self.assertIn('t1:skill', keys)
+            self.assertIn(f't1:skill:{Skill.objects.get().pk}', keys)
+
+    def test_responses_that_touch_cookies_stay_private(self):
+        self.assertIn('private', self.client.get('/')['Cache-Control'])
+        # A stale session cookie is deleted, which must not be cached either.
+        self.client.cookies.load({'sessionid': 'stale'})
+        response = self.client.get('/api/skills/')
+        self.assertIn('Cookie', response['Vary'])
+        self.assertEqual(response['Cache-Control'], 'private, max-age=0')
+
+    def test_tag_accumulates_on_the_underlying_request(self):
+        request = RequestFactory().get('/')
+        surrogate.tag(request, ['a'])
+        surrogate.tag(mock.Mock(_request=request), ['b', 'a'])
+        self.assertEqual(request.surrogate_keys, {'a', 'b'})
+
+
+class PurgeDispatcherTests(SimpleTestCase):
+    def dispatcher(self, *outcomes, **kwargs):
+        dispatcher = surrogate.PurgeDispatcher('http://cdn.test/__purge', **kwargs)
+        dispatcher._session = mock.Mock()
+        dispatcher._session.post.side_effect = [
+            outcome if isinstance(outcome, Exception) else mock.Mock(status_code=outcome) for outcome in outcomes
+        ]
+        return dispatcher
+
+    def sent(self, dispatcher):
+        return [call.kwargs['json']['surrogate_keys'] for call in dispatcher._session.post.call_args_list]
+
+    @mock.patch('portfolio.surrogate.time.sleep')
+    def test_retries_until_accepted(self, sleep):
+        dispatcher = self.dispatcher(requests.ConnectionError('down'), 503, 204)
+        dispatcher._send(['t1:skill'])
+        self.assertEqual(self.sent(dispatcher), [['t1:skill']] * 3)
+        self.assertEqual((dispatcher.sent_batches, dispatcher.failed_batches), (1, 0))
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [2, 4])
+
+    @mock.patch('portfolio.surrogate.time.sleep')
+    def test_gives_up_after_max_attempts(self, sleep):
+        dispatcher = self.dispatcher(500, 500, max_attempts=2)
+        with self.assertLogs('portfolio.surrogate', 'WARNING'):
+            dispatcher._send(['t1:skill'])
+        self.assertEqual((dispatcher.sent_batches, dispatcher.failed_batches), (0, 1))
+
+    def test_flush_sends_pending_keys_in_batches(self):
+        dispatcher = self.dispatcher(200, 200, max_batch=2)
+        dispatcher._pending.update(['c', 'a', 'b'])
+        dispatcher.flush()
+        self.assertEqual(self.sent(dispatcher), [['a', 'b'], ['c']])
+        self.assertEqual(dispatcher._pending, set())
+
+    def test_a_burst_of_purges_is_sent_as_one_batch(self):
+        dispatcher = self.dispatcher(200, batch_window=0.2)
+        dispatcher.purge(['t1:skill', 't1:skill:1'])
+        dispatcher.purge(['t1:skill', 't1:work'])
+        for _ in range(100):
+            if dispatcher.sent_batches:
+                break
+            time.sleep(0.05)
+        self.assertEqual(self.sent(dispatcher), [['t1:skill', 't1:skill:1', 't1:work']])
+
+    def test_no_url_means_no_purging(self):
+        dispatcher = surrogate.PurgeDispatcher('')
+        dispatcher.purge(['t1:skill'])
+        self.assertIsNone(dispatcher._thread)
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        self.media = use_temp_media(self)
+        self.storage = storage.content_addressed_storage
+
+    def age(self, name, seconds=storage.BLOB_GRACE_SECONDS + 1):
+        stamp = time.time() - seconds
+        os.utime(self.storage.path(name), (stamp, stamp))
+
+    def test_same_content_is_stored_once(self):
+        first = self.storage.save('work_images/a.png', ContentFile(png_bytes()))
+        second = self.storage.save('home_images/b.PNG', ContentFile(png_bytes()))
+        other = self.storage.save('work_images/a.png', ContentFile(png_bytes(color=(0, 0, 0))))
+        self.assertEqual(first, second)
+        self.assertTrue(first.startswith('blobs/') and first.endswith('.png'))
+        self.assertNotEqual(first, other)
+        self.assertEqual(len(os.listdir(os.path.dirname(self.storage.path(first)))), 1)
+
+    def test_delete_keeps_referenced_blobs(self):
+        name = self.storage.save('a.png', ContentFile(png_bytes()))
+        Work.objects.create(project_name='A', project_image=name)
+        work = Work.objects.create(project_name='B', project_image=name)
+        self.age(name)
+        self.storage.delete(name)
+        self.assertTrue(self.storage.exists(name))
+        Work.objects.filter(project_name='A').delete()
+        work.project_image = None
+        work.save()
+        self.storage.delete(name)
+        self.assertFalse(self.storage.exists(name))
+
+    def test_delete_keeps_blobs_a_save_just_handed_out(self):
+        name = self.storage.save('a.png', ContentFile(png_bytes()))
+        self.age(name)
+        # Another upload of the same bytes, whose row is not committed yet.
+        self.assertEqual(self.storage.save('b.png', ContentFile(png_bytes())), name)
+        self.storage.delete(name)
+        self.assertTrue(self.storage.exists(name))
+
+    def test_dedupe_media_moves_legacy_files_and_collects_garbage(self):
+        os.makedirs(os.path.join(self.media, 'work_images'))
+        for filename in ('a.png', 'copy.png'):
+            with open(os.path.join(self.media, 'work_images', filename), 'wb') as f:
+                f.write(png_bytes())
+        a = Work.objects.create(project_name='A', project_image='work_images/a.png')
+        b = Work.objects.create(project_name='B', project_image='work_images/copy.png')
+        orphan = self.storage.save('old.png', ContentFile(png_bytes(color=(0, 0, 255))))
+        self.age(orphan)
+        recent = self.storage.save('new.png', ContentFile(png_bytes(color=(0, 255, 0))))
+
+        out = io.StringIO()
+        call_command('dedupe_media', dry_run=True, stdout=out)
+        self.assertIn('[dry run] 2 row(s) moved to blobs, 3 unreferenced file(s) removed', out.getvalue())
+        a.refresh_from_db()
+        self.assertEqual(a.project_image.name, 'work_images/a.png')
+        self.assertTrue(self.storage.exists('work_images/copy.png') and self.storage.exists(orphan))
+
+        call_command('dedupe_media', stdout=io.StringIO())
+        a.refresh_from_db()
+        b.refresh_from_db()
+        self.assertEqual(a.project_image.name, b.project_image.name)
+        self.assertTrue(storage.is_blob(a.project_image.name) and self.storage.exists(a.project_image.name))
+        self.assertEqual(os.listdir(os.path.join(self.media, 'work_images')), [])
+        self.assertFalse(self.storage.exists(orphan))
+        self.assertTrue(self.storage.exists(recent))
+
+
+class ProcessImageTests(SimpleTestCase):
+    def process(self, data, **kwargs):
+        out, ext = ingest.process_image(io.BytesIO(data), **kwargs)
+        return Image.open(io.BytesIO(out)), ext
+
+    def test_resizes_to_the_bound_keeping_the_aspect_ratio(self):
+        image, ext = self.process(png_bytes((3000, 1000)), max_side=1600)
+        self.assertEqual((image.size, image.format, ext), ((1600, 533), 'JPEG', '.jpg'))
+        self.assertEqual(self.process(png_bytes((40, 30)), max_side=1600)[0].size, (40, 30))
+
+    def test_applies_exif_orientation_and_drops_metadata(self):
+        exif = Image.Exif()
+        exif[0x0112] = 6  # rotate 90 degrees clockwise when shown
+        out = io.BytesIO()
+        Image.new('RGB', (40, 20), (0, 128, 0)).save(out, 'JPEG', exif=exif)
+        image, _ = self.process(out.getvalue())
+        self.assertEqual(image.size, (20, 40))
+        self.assertEqual(dict(image.getexif()), {})
+
+    def test_modes(self):
+        image, ext = self.process(png_bytes(mode='RGBA', color=(0, 0, 0, 0)))
+        self.assertEqual((image.mode, ext), ('RGBA', '.png'))
+        paletted = Image.new('P', (10, 10))
+        out = io.BytesIO()
+        paletted.save(out, 'PNG', transparency=0)
+        self.assertEqual(self.process(out.getvalue())[1], '.png')
+        for mode, color in (('L', 128), ('CMYK', (0, 0, 0, 0)), ('P', 1)):
+            out = io.BytesIO()
+            Image.new(mode, (10, 10), color).save(out, 'TIFF')
+            image, ext = self.process(out.getvalue())
+            self.assertEqual((image.mode, ext), ('RGB', '.jpg'), mode)
+
+    def test_rejects_non_images(self):
+        for data in (b'', b'not an image', png_bytes()[:40]):
+            with self.assertRaises(ingest.InvalidImage):
+                self.process(data)
+
+
+@mock.patch('portfolio.ingest.close_old_connections')  # would close the test transaction
+class IngestTests(TestCase):
+    def setUp(self):
+        use_temp_media(self)
+        self.storage = storage.content_addressed_storage
+
+    def pending_work(self, data, **fields):
+        work = Work(project_name='Site', image_status=Work.PROCESSING, **fields)
+        work.pending_image.save('upload.png', ContentFile(data), save=False)
+        work.save()
+        # Past the storage grace period, so the pending blob can be removed.
+        stamp = time.time() - storage.BLOB_GRACE_SECONDS - 1
+        os.utime(self.storage.path(work.pending_image.name), (stamp, stamp))
+        return work
+
+    def test_swaps_in_the_processed_image(self, close_old_connections):
+        work = self.pending_work(png_bytes((3000, 1000)))
+        pending = work.pending_image.name
+        ingest.ingest(Work, work.pk)
+        work.refresh_from_db()
+        self.assertEqual(work.image_status, Work.READY)
+        self.assertFalse(work.pending_image)
+        self.assertTrue(work.project_image.name.endswith('.jpg'))
+        with work.project_image.open('rb') as f:
+            self.assertEqual(Image.open(f).size, (ingest.MAX_SIDE, ingest.MAX_SIDE // 3))
+        self.assertFalse(self.storage.exists(pending))
+        self.assertTrue(ChangeLog.objects.filter(model='work', object_id=work.pk, action=ChangeLog.UPDATED).exists())
+
+    def test_bad_image_fails_and_keeps_the_previous_one(self, close_old_connections):
+        previous = self.storage.save('old.png', ContentFile(png_bytes()))
+        work = self.pending_work(b'not an image', project_image=previous)
+        pending = work.pending_image.name
+        with self.assertLogs('portfolio.ingest', 'WARNING'):
+            ingest.ingest(Work, work.pk)
+        work.refresh_from_db()
+        self.assertEqual(work.image_status, Work.FAILED)
+        self.assertFalse(work.pending_image)
+        self.assertEqual(work.project_image.name, previous)
+        self.assertFalse(self.storage.exists(pending))
+
+    def test_a_newer_upload_is_not_overwritten(self, close_old_connections):
+        work = self.pending_work(png_bytes())
+        newer = self.storage.save('newer.png', ContentFile(png_bytes(color=(1, 2, 3))))
+        process_image = ingest.process_image
+
+        def replaced_meanwhile(fileobj):
+            # The admin stores another upload while the worker is busy.
+            Work.objects.filter(pk=work.pk).update(pending_image=newer)
+            return process_image(fileobj)
+
+        with mock.patch.object(ingest, 'process_image', side_effect=replaced_meanwhile):
+            ingest.ingest(Work, work.pk)
+        work.refresh_from_db()
+        self.assertEqual((work.image_status, work.pending_image.name), (Work.PROCESSING, newer))
+        self.assertFalse(work.project_image)
+
+    def test_admin_upload_is_processed_after_commit(self, close_old_connections):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'pw'))
+        upload = SimpleUploadedFile('shot.png', png_bytes((2000, 2000)), content_type='image/png')
+        with mock.patch.object(ingest, 'submit', side_effect=ingest.ingest) as submit, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/admin/portfolio/work/add/', {
+                'tenant': DEFAULT_TENANT_ID, 'project_name': 'Shot', 'project_url': '', 'project_image': upload,
+            })
+            self.assertEqual(response.status_code, 302)
+            work = Work.objects.get(project_name='Shot')
+            # Until the worker runs, only the pending file is stored.
+            self.assertEqual(work.image_status, Work.PROCESSING)
+            self.assertFalse(work.project_image)
+            self.assertTrue(work.pending_image)
+        submit.assert_called_once_with(Work, work.pk)
+        work.refresh_from_db()
+        self.assertEqual(work.image_status, Work.READY)
+        with work.project_image.open('rb') as f:
+            self.assertEqual(Image.open(f).size, (ingest.MAX_SIDE, ingest.MAX_SIDE))
+
+    def test_api_does_not_expose_ingestion_fields(self, close_old_connections):
+        self.pending_work(png_bytes())
+        [row] = self.client.get('/api/work/').json()
+        self.assertNotIn('image_status', row)
+        self.assertNotIn('pending_image', row)
+
+
+class CaptureFileMixin:
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'capture.jsonl')
+        self.addCleanup(self.close_capture_file)
+
+    def close_capture_file(self):
+        # The handler is installed once per process; tests each use their own file.
+        for handler in list(capture.logger.handlers):
+            capture.logger.removeHandler(handler)
+            handler.close()
+
+    def records(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+
+class TrafficCaptureTests(CaptureFileMixin, SimpleTestCase):
+    def middleware(self, view, rate=1.0):
+        with override_settings(TRAFFIC_CAPTURE_FILE=self.path, TRAFFIC_CAPTURE_SAMPLE_RATE=rate):
+            return capture.TrafficCaptureMiddleware(view)
+
+    def test_off_unless_a_file_is_set(self):
+        with override_settings(TRAFFIC_CAPTURE_FILE=''):
+            with self.assertRaises(MiddlewareNotUsed):
+                capture.TrafficCaptureMiddleware(lambda request: HttpResponse())
+
+    def test_records_shape_but_no_secrets(self):
+        middleware = self.middleware(lambda request: HttpResponse(status=201))
+        form = {'name': 'Ann', 'email': 'ann@example.com', 'message': 'top secret'}
+        secrets = {'HTTP_COOKIE': 'sessionid=s3ss10n', 'HTTP_AUTHORIZATION': 'Bearer t0ken', 'HTTP_USER_AGENT': 'curl/8'}
+        factory = RequestFactory()
+        for request in (
+            factory.post('/api/contact/?x=1', form, **secrets),  # multipart
+            factory.post('/api/contact/?x=1', urlencode(form), 'application/x-www-form-urlencoded', **secrets),
+        ):
+            self.assertEqual(middleware(request).status_code, 201)
+        for record in self.records():
+            self.assertEqual((record['m'], record['p'], record['s']), ('POST', '/api/contact/?x=1', 201))
+            self.assertEqual(set(record['h']), {'Content-Type', 'User-Agent'})
+            self.assertEqual(record['form'], {'name': 3, 'email': 15, 'message': 10})
+        self.assertEqual(len(self.records()), 2)
+        with open(self.path, encoding='utf-8') as f:
+            raw = f.read()
+        for secret in ('s3ss10n', 't0ken', 'top secret', 'ann@example.com'):
+            self.assertNotIn(secret, raw)
+
+    def test_samples_at_the_configured_rate(self):
+        middleware = self.middleware(lambda request: HttpResponse(), rate=0.25)
+        with mock.patch('portfolio.capture.random.random', side_effect=[0.1, 0.3, 0.9, 0.2]):
+            for i in range(4):
+                middleware(RequestFactory().get(f'/api/home/?n={i}'))
+        self.assertEqual([r['p'] for r in self.records()], ['/api/home/?n=0', '/api/home/?n=3'])
+
+    def test_streaming_responses_pass_through_unread(self):
+        consumed = []
+
+        def events():
+            consumed.append(True)
+            yield b'data: 1\n\n'
+
+        middleware = self.middleware(lambda request: StreamingHttpResponse(events()))
+        response = middleware(RequestFactory().get('/api/changes/?stream=1'))
+        self.assertEqual((consumed, self.records()[0]['s']), ([], 200))
+        self.assertEqual(b''.join(response.streaming_content), b'data: 1\n\n')
+
+
+class ReplayTrafficTests(CaptureFileMixin, LiveServerTestCase):
+    serialized_rollback = True  # keep the default tenant for the other tests
+
+    @mock.patch('portfolio.api_views.send_telegram_message')
+    def test_replay_reproduces_captured_status_codes(self, send):
+        with override_settings(TRAFFIC_CAPTURE_FILE=self.path, TRAFFIC_CAPTURE_SAMPLE_RATE=1.0):
+            self.client.get('/api/skills/')
+            self.client.get('/api/changes/', {'limit': 'x'})
+            self.client.get('/no-such-page/')
+            self.client.post('/api/contact/', {'name': 'Ann', 'email': 'ann@example.com', 'message': 'Hi'})
+            self.client.post('/api/contact/', {'name': 'Ann'})
+        captured = sorted(str(r['s']) for r in self.records())
+        self.assertEqual(captured, ['200', '200', '400', '400', '404'])
+
+        out = io.StringIO()
+        call_command('replay_traffic', self.path, target=self.live_server_url, speed=100, stdout=out)
+        self.assertIn('status: 200=2, 400=2, 404=1', out.getvalue())
+        self.assertEqual(Contact.objects.filter(email__endswith='@example.com').count(), 2)
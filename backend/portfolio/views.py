@@ -1,6 +1,8 @@
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from .models import *
+from .tenancy import tenant_cached
+from .surrogate import keys_for, tag
 import requests
 
 TELEGRAM_BOT_TOKEN = 'TELEGRAM_BOT_TOKEN'
@@ -19,12 +21,16 @@ def send_telegram_message(name, email, message):
     except requests.exceptions.RequestException:
         pass  # You can log this if needed
 
+def _index_content(tenant):
+    return {
+        'home_content': Home.objects.filter(tenant=tenant).first(),
+        'about_content': About.objects.filter(tenant=tenant).first(),
+        'skills': list(Skill.objects.filter(tenant=tenant)),
+        'skilled': Skilled.objects.filter(tenant=tenant).first(),
+        'works': list(Work.objects.filter(tenant=tenant)),
+    }
+
 def index(request):
-    home_content = Home.objects.first()
-    about_content = About.objects.first()
-    skills = Skill.objects.all()
-    skilled = Skilled.objects.first()
-    works = Work.objects.all()
 
     if request.method == 'POST':
         name = request.POST.get('flname')
@@ -32,15 +38,16 @@ def index(request):
         message = request.POST.get('message')
 
         if name and email and message:
-            Contact.objects.create(name=name, email=email, message=message)
+            Contact.objects.create(tenant=request.tenant, name=name, email=email, message=message)
             send_telegram_message(name, email, message)
             messages.success(request, 'Your message has been sent successfully!')
             return redirect('index')
 
-    return render(request, 'portfolio/index.html', {
-        'home_content': home_content,
-        'about_content': about_content,
-        'skills': skills,
-        'skilled': skilled,
-        'works': works,
-    })
+    # Only the model rows are cached; the page itself carries the CSRF token
+    # and flash messages, so it is rendered per request.
+    content = tenant_cached(request, 'index', lambda: _index_content(request.tenant))
+    tenant_id = request.tenant.pk
+    tag(request, keys_for(tenant_id, Home, [content['home_content']]) + keys_for(tenant_id, About, [content['about_content']])
+        + keys_for(tenant_id, Skill, content['skills']) + keys_for(tenant_id, Skilled, [content['skilled']])
+        + keys_for(tenant_id, Work, content['works']))
+    return render(request, 'portfolio/index.html', content)
@@ -73,8 +73,12 @@ JAZZMIN_SETTINGS = {
 }
 
 MIDDLEWARE = [
+    'portfolio.capture.TrafficCaptureMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    # Above the session/CSRF middleware so it sees their cookies and Vary.
+    'portfolio.surrogate.SurrogateKeyMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
+    'portfolio.tenancy.TenantMiddleware',
     'django.middleware.common.CommonMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -83,6 +87,33 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Sampled request capture for `manage.py replay_traffic` (off unless a file is set).
+TRAFFIC_CAPTURE_FILE = os.environ.get('TRAFFIC_CAPTURE_FILE', '')
+TRAFFIC_CAPTURE_SAMPLE_RATE = float(os.environ.get('TRAFFIC_CAPTURE_SAMPLE_RATE', '0.1'))
+
+# Caching proxy / CDN: responses carry Surrogate-Key and s-maxage; content
+# changes POST {"surrogate_keys": [...]} batches to CACHE_PURGE_URL (e.g. the
+# stand-in `manage.py cache_proxy` at http://127.0.0.1:8080/__purge).
+CACHE_S_MAXAGE = int(os.environ.get('CACHE_S_MAXAGE', '86400'))
+CACHE_MAX_AGE = int(os.environ.get('CACHE_MAX_AGE', '60'))
+CACHE_PURGE_URL = os.environ.get('CACHE_PURGE_URL', '')
+CACHE_PURGE_HEADERS = {'Authorization': f"Bearer {os.environ['CACHE_PURGE_TOKEN']}"} if os.environ.get('CACHE_PURGE_TOKEN') else {}
+
+# Multi-tenant hosting: portfolios are served at <slug>.TENANT_BASE_DOMAIN
+# (add '.<domain>' to ALLOWED_HOSTS), at their own Tenant.domain, or under
+# /t/<slug>/. Everything else is the default tenant.
+TENANT_BASE_DOMAIN = os.environ.get('TENANT_BASE_DOMAIN', '')
+
+# Contact retention (`manage.py archive_contacts`, run from cron): messages
+# older than CONTACT_RETENTION_DAYS move to the ContactArchive table or to
+# gzipped NDJSON files in CONTACT_ARCHIVE_DIR ('table' | 'ndjson').
+CONTACT_RETENTION_DAYS = int(os.environ.get('CONTACT_RETENTION_DAYS', '365'))
+CONTACT_ARCHIVE_TARGET = os.environ.get('CONTACT_ARCHIVE_TARGET', 'table')
+CONTACT_ARCHIVE_DIR = os.environ.get('CONTACT_ARCHIVE_DIR', os.path.join(BASE_DIR, 'archive'))
+# Migration 0010 spreads pre-existing contacts (which have no date) by id from
+# this ISO date (default: twice the retention period ago) up to the migration.
+CONTACT_BACKFILL_SINCE = os.environ.get('CONTACT_BACKFILL_SINCE', '')
+
 CORS_ALLOWED_ORIGINS = [
     "https://portfolio.imvickykumar999.online",       # your actual deployed frontend
     "https://drfapi-five.vercel.app",
@@ -172,6 +203,15 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')  # Add this line
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Tenant-scoped content caching (portfolio/tenancy.py) keeps a few entries per
+# tenant; size the cache for the number of hosted portfolios.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'OPTIONS': {'MAX_ENTRIES': 100000},
+    }
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 